@@ -0,0 +1,142 @@
+"""Outils en ligne de commande pour les analytics du portfolio.
+
+Usage :
+    python analytics_cli.py import-json [--json portfolio_analytics.json] [--db portfolio_analytics.db]
+    python analytics_cli.py migrate [--json portfolio_analytics.json] [--db portfolio_analytics.db]
+    python analytics_cli.py archive [--json ...] [--db ...] [--retention-days 90]
+    python analytics_cli.py report [--json ...] [--events FICHIER ...] [--since AAAA-MM-JJ] [--until AAAA-MM-JJ]
+                                   [--format text|json]
+    python analytics_cli.py export visitors|sessions|page_views [--backend json|sqlite] [--json ...] [--db ...]
+                                   [--format parquet|csv] [--output FICHIER] [--include-archives]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+from analytics_store import (ANALYTICS_DB_FILE, ANALYTICS_FILE, RETENTION_DAYS, SCHEMA_VERSION,
+                             JsonAnalyticsStore)
+from analytics_export import EXPORT_COLUMNS, EXPORT_FORMATS, export_table
+from analytics_report import AnalyticsReport, format_report
+from analytics_sqlite import SqliteAnalyticsStore
+
+
+def import_json(args):
+    """Importer en une fois l'historique JSON (snapshot + journal) dans SQLite"""
+    analytics = JsonAnalyticsStore(args.json).load()
+    SqliteAnalyticsStore(args.db).save(analytics)
+    print(f"✅ {len(analytics['visitors'])} visiteurs et {len(analytics['sessions'])} sessions "
+          f"importés dans {args.db}")
+    return 0
+
+
+def migrate(args):
+    """Migrer sur place le snapshot JSON et, si elle existe, la base SQLite"""
+    if JsonAnalyticsStore(args.json).migrate():
+        print(f"✅ {args.json} migré vers le schéma v{SCHEMA_VERSION}")
+    else:
+        print(f"ℹ️ {args.json} est déjà au schéma v{SCHEMA_VERSION}")
+    if os.path.exists(args.db):
+        # L'ouverture du store migre la base si nécessaire
+        SqliteAnalyticsStore(args.db)
+        print(f"✅ {args.db} au schéma v{SCHEMA_VERSION}")
+    return 0
+
+
+def archive(args):
+    """Appliquer la rétention : archiver sessions et visiteurs expirés"""
+    stores = [JsonAnalyticsStore(args.json, retention_days=args.retention_days)]
+    if os.path.exists(args.db):
+        stores.append(SqliteAnalyticsStore(args.db, retention_days=args.retention_days))
+    for store in stores:
+        store.archive_expired()
+        months = store.archive_months()
+        print(f"✅ {len(months)} mois archivés ({', '.join(months) or '-'}), "
+              f"{store.session_stats()['total_sessions']} sessions au total")
+    return 0
+
+
+def report(args):
+    """Rapport hors ligne en streaming, sans charger l'historique en mémoire"""
+    analytics_report = AnalyticsReport(args.since, args.until)
+    if args.events:
+        analytics_report.read_log(args.events)
+    else:
+        analytics_report.read_store(args.json)
+    results = analytics_report.results()
+    if args.format == "json":
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(results))
+    return 0
+
+
+def export(args):
+    """Exporter une table (visiteurs, sessions, pages vues) en streaming"""
+    if args.backend == "sqlite":
+        store = SqliteAnalyticsStore(args.db)
+    else:
+        store = JsonAnalyticsStore(args.json)
+    output = args.output or f"{args.table}.{args.format}"
+    count = export_table(store, args.table, output, args.format, args.include_archives)
+    print(f"✅ {count} lignes exportées dans {output}")
+    return 0
+
+
+def _iso_day(value):
+    """Type argparse : date "AAAA-MM-JJ" validée"""
+    try:
+        return str(date.fromisoformat(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"date invalide : {value} (format AAAA-MM-JJ)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Outils analytics du portfolio")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-json", help="Importer portfolio_analytics.json dans SQLite")
+    import_parser.add_argument("--json", default=ANALYTICS_FILE, help="Fichier JSON source")
+    import_parser.add_argument("--db", default=ANALYTICS_DB_FILE, help="Base SQLite cible")
+    import_parser.set_defaults(func=import_json)
+
+    migrate_parser = commands.add_parser("migrate", help="Migrer les analytics vers le dernier schéma")
+    migrate_parser.add_argument("--json", default=ANALYTICS_FILE, help="Snapshot JSON à migrer")
+    migrate_parser.add_argument("--db", default=ANALYTICS_DB_FILE, help="Base SQLite à migrer")
+    migrate_parser.set_defaults(func=migrate)
+
+    archive_parser = commands.add_parser("archive", help="Archiver les sessions et visiteurs expirés")
+    archive_parser.add_argument("--json", default=ANALYTICS_FILE, help="Snapshot JSON")
+    archive_parser.add_argument("--db", default=ANALYTICS_DB_FILE, help="Base SQLite")
+    archive_parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                                help="Âge au-delà duquel les données sont archivées")
+    archive_parser.set_defaults(func=archive)
+
+    report_parser = commands.add_parser("report", help="Rapport analytics hors ligne (streaming)")
+    report_parser.add_argument("--json", default=ANALYTICS_FILE, help="Snapshot JSON (avec archives et journal)")
+    report_parser.add_argument("--events", nargs="+", help="Lire seulement ces fichiers d'événements (.jsonl[.gz])")
+    report_parser.add_argument("--since", type=_iso_day, help="Premier jour inclus (AAAA-MM-JJ)")
+    report_parser.add_argument("--until", type=_iso_day, help="Dernier jour inclus (AAAA-MM-JJ)")
+    report_parser.add_argument("--format", choices=("text", "json"), default="text", help="Format de sortie")
+    report_parser.set_defaults(func=report)
+
+    export_parser = commands.add_parser("export", help="Exporter une table en Parquet ou CSV (streaming)")
+    export_parser.add_argument("table", choices=list(EXPORT_COLUMNS), help="Table à exporter")
+    export_parser.add_argument("--backend", choices=("json", "sqlite"),
+                               default="sqlite" if os.getenv("ANALYTICS_BACKEND") == "sqlite" else "json",
+                               help="Store source (défaut : ANALYTICS_BACKEND)")
+    export_parser.add_argument("--json", default=ANALYTICS_FILE, help="Snapshot JSON source")
+    export_parser.add_argument("--db", default=ANALYTICS_DB_FILE, help="Base SQLite source")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet", help="Format de sortie")
+    export_parser.add_argument("--output", help="Fichier de sortie (défaut : <table>.<format>)")
+    export_parser.add_argument("--include-archives", action="store_true",
+                               help="Ajouter les enregistrements des archives mensuelles")
+    export_parser.set_defaults(func=export)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
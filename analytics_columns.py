@@ -0,0 +1,126 @@
+"""Sessions en colonnes pour les statistiques de l'onglet Sessions.
+
+Chaque champ numérique d'une session est une colonne ``array('q')``
+(début, fin, durée, pages vues, index du visiteur) ; une valeur absente vaut
+``MISSING``. Les colonnes sont tenues à jour session par session et les
+statistiques (totaux, percentiles p50/p90/p99, histogramme des durées) sont
+calculées de façon vectorisée avec NumPy, qui lit les colonnes sans copie
+(``numpy.frombuffer``). Sans NumPy, un calcul en Python pur prend le relais.
+"""
+import bisect
+import math
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MISSING = -1
+PERCENTILES = (50, 90, 99)
+
+# Bornes (secondes) et libellés de l'histogramme des durées de session
+HISTOGRAM_EDGES = (10, 30, 60, 120, 300, 600, 1800, 3600)
+HISTOGRAM_LABELS = ("< 10s", "10-30s", "30s-1m", "1-2m", "2-5m", "5-10m", "10-30m", "30m-1h", "> 1h")
+
+
+def percentile_index(count, percentile):
+    """Rang (0-indexé) du percentile dans count valeurs triées (méthode du rang le plus proche)"""
+    return max(0, math.ceil(percentile / 100 * count) - 1)
+
+
+class SessionColumns:
+    """Colonnes des sessions, mises à jour en place par identifiant"""
+
+    FIELDS = ("start", "end", "duration", "pages", "visitor")
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, array("q"))
+        self.row_of = {}
+        self.visitor_index = {}
+        # Une vue NumPy bloque le redimensionnement des colonnes : calculs et
+        # ajouts se sérialisent sur ce verrou
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sessions(cls, sessions):
+        """Construire toutes les colonnes en une passe par champ"""
+        columns = cls()
+        values = list(sessions.values())
+        for field, key in (("start", "start_time"), ("end", "end_time"), ("duration", "duration_seconds")):
+            column = [session.get(key) for session in values]
+            setattr(columns, field, array("q", [MISSING if value is None else value for value in column]))
+        columns.pages = array("q", [session.get("total_page_views", 0) for session in values])
+        visitor_index = columns.visitor_index
+        columns.visitor = array("q", [visitor_index.setdefault(session["visitor_id"], len(visitor_index))
+                                      for session in values])
+        columns.row_of = dict(zip(sessions, range(len(values))))
+        return columns
+
+    def __len__(self):
+        return len(self.start)
+
+    def upsert(self, session_id, session):
+        """Ajouter une session ou remplacer sa ligne si elle est déjà présente"""
+        visitor = self.visitor_index.setdefault(session["visitor_id"], len(self.visitor_index))
+        values = (
+            session.get("start_time"), session.get("end_time"), session.get("duration_seconds"),
+            session.get("total_page_views", 0), visitor
+        )
+        values = [MISSING if value is None else value for value in values]
+        with self._lock:
+            row = self.row_of.get(session_id)
+            if row is None:
+                self.row_of[session_id] = len(self.start)
+                for field, value in zip(self.FIELDS, values):
+                    getattr(self, field).append(value)
+            else:
+                for field, value in zip(self.FIELDS, values):
+                    getattr(self, field)[row] = value
+
+    def stats(self):
+        """Mêmes totaux que session_stats : sessions, sessions chronométrées, durée et pages cumulées"""
+        with self._lock:
+            if numpy is not None:
+                durations = numpy.frombuffer(self.duration, dtype=numpy.int64)
+                timed = durations[durations != MISSING]
+                return {
+                    "total_sessions": len(self.start),
+                    "timed_sessions": int(timed.size),
+                    "total_seconds": int(timed.sum()),
+                    "total_page_views": int(numpy.frombuffer(self.pages, dtype=numpy.int64).sum())
+                }
+            timed = [duration for duration in self.duration if duration != MISSING]
+            return {
+                "total_sessions": len(self.start),
+                "timed_sessions": len(timed),
+                "total_seconds": sum(timed),
+                "total_page_views": sum(self.pages)
+            }
+
+    def distribution(self):
+        """Percentiles des durées ({50: s, 90: s, 99: s}) et histogramme [(libellé, sessions)]"""
+        with self._lock:
+            if numpy is not None:
+                durations = numpy.frombuffer(self.duration, dtype=numpy.int64)
+                timed = durations[durations != MISSING]
+                if not timed.size:
+                    return {}, list(zip(HISTOGRAM_LABELS, [0] * len(HISTOGRAM_LABELS)))
+                ranks = [percentile_index(timed.size, p) for p in PERCENTILES]
+                # Sélection partielle : O(n) au lieu d'un tri complet
+                selected = numpy.partition(timed, ranks)
+                percentiles = {p: int(selected[rank]) for p, rank in zip(PERCENTILES, ranks)}
+                buckets = numpy.searchsorted(numpy.array(HISTOGRAM_EDGES), timed, side="right")
+                counts = numpy.bincount(buckets, minlength=len(HISTOGRAM_LABELS)).tolist()
+                return percentiles, list(zip(HISTOGRAM_LABELS, counts))
+
+            timed = sorted(duration for duration in self.duration if duration != MISSING)
+            counts = [0] * len(HISTOGRAM_LABELS)
+            for duration in timed:
+                counts[bisect.bisect_right(HISTOGRAM_EDGES, duration)] += 1
+            if not timed:
+                return {}, list(zip(HISTOGRAM_LABELS, counts))
+            percentiles = {p: timed[percentile_index(len(timed), p)] for p in PERCENTILES}
+            return percentiles, list(zip(HISTOGRAM_LABELS, counts))
@@ -0,0 +1,202 @@
+"""Export des analytics en Parquet ou CSV, en streaming.
+
+Trois tables à plat : ``visitors``, ``sessions`` et ``page_views`` (une ligne
+par page vue d'une session). Les lignes sont produites une à une et écrites
+par lots de ``EXPORT_CHUNK_ROWS`` : rien n'est chargé en entier.
+
+- Store JSON : le snapshot est parcouru entrée par entrée
+  (``analytics_report.stream_snapshot``). Seuls les enregistrements modifiés
+  par la fin du journal non encore compactée sont gardés en mémoire, le
+  temps d'y rejouer ces événements.
+- Store SQLite : les lignes sont lues directement depuis un curseur.
+
+Avec ``include_archives``, les enregistrements des archives mensuelles sont
+ajoutés (colonne ``archived``). Le Parquet (compression zstd) nécessite
+``pyarrow`` ; le CSV n'a aucune dépendance.
+
+    python analytics_cli.py export sessions --format parquet --output sessions.parquet
+"""
+import csv
+import glob
+import os
+
+from analytics_report import iter_records, log_generation, stream_snapshot
+from analytics_store import (JsonAnalyticsStore, apply_event, archive_path, empty_analytics, migrate_session,
+                             migrate_visitor)
+from storage import file_lock
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_FORMATS = ("parquet", "csv")
+
+# Colonnes exportées et leur type Parquet
+EXPORT_COLUMNS = {
+    "visitors": (
+        ("visitor_id", "string"), ("first_visit", "int64"), ("last_visit", "int64"),
+        ("total_visits", "int64"), ("total_seconds", "int64"), ("session_count", "int64"),
+        ("pages_visited", "string"), ("archived", "bool")
+    ),
+    "sessions": (
+        ("session_id", "string"), ("visitor_id", "string"), ("start_time", "int64"), ("end_time", "int64"),
+        ("duration_seconds", "int64"), ("total_page_views", "int64"), ("archived", "bool")
+    ),
+    "page_views": (
+        ("session_id", "string"), ("visitor_id", "string"), ("position", "int64"), ("page", "string"),
+        ("project_key", "string"), ("timestamp", "int64"), ("archived", "bool")
+    )
+}
+# Section du store d'où vient chaque table
+EXPORT_SECTIONS = {"visitors": "visitors", "sessions": "sessions", "page_views": "sessions"}
+
+
+def available_formats():
+    """Formats utilisables ici (Parquet seulement si pyarrow est installé)"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or pyarrow is not None]
+
+
+def visitor_row(visitor_id, visitor, archived=False):
+    visitor = migrate_visitor(visitor)
+    return (
+        visitor_id, visitor["first_visit"], visitor.get("last_visit", visitor["first_visit"]),
+        visitor.get("total_visits", 0), visitor.get("total_seconds", 0), visitor.get("session_count", 0),
+        ",".join(visitor.get("pages_visited", [])), archived
+    )
+
+
+def session_row(session_id, session, archived=False):
+    session = migrate_session(session)
+    return (
+        session_id, session["visitor_id"], session.get("start_time"), session.get("end_time"),
+        session.get("duration_seconds"), session.get("total_page_views", 0), archived
+    )
+
+
+def page_view_rows(session_id, session, archived=False):
+    session = migrate_session(session)
+    for position, view in enumerate(session.get("page_views", [])):
+        yield (session_id, session["visitor_id"], position, view["page"], view.get("project_key"),
+               view.get("timestamp"), archived)
+
+
+def _rows(kind, records, archived=False):
+    """Lignes de la table kind à partir de couples (identifiant, enregistrement)"""
+    for record_id, record in records:
+        if kind == "visitors":
+            yield visitor_row(record_id, record, archived)
+        elif kind == "sessions":
+            yield session_row(record_id, record, archived)
+        else:
+            yield from page_view_rows(record_id, record, archived)
+
+
+def json_records(store, section):
+    """Couples (identifiant, enregistrement) d'une section du store JSON,
+    journal non compacté compris"""
+    with file_lock(store.snapshot_lock_path, shared=True):
+        exists = os.path.exists(store.snapshot_path)
+        first_generation = log_generation(store.snapshot_path) if exists else 0
+        tail = []
+        for path in sorted(glob.glob(glob.escape(store.events_prefix) + "*.jsonl")):
+            try:
+                generation = int(path[len(store.events_prefix):-len(".jsonl")])
+            except ValueError:
+                continue
+            if generation >= first_generation:
+                tail.extend(iter_records(path))
+
+        # Enregistrements modifiés par le journal : mis de côté (sessions
+        # comprises, pour que les totaux des visiteurs ne comptent pas deux
+        # fois une session déjà présente) puis mis à jour
+        touched = {
+            "visitors": {event["visitor_id"] if event.get("type") == "visit" else event["session"]["visitor_id"]
+                         for event in tail},
+            "sessions": {event["session_id"] for event in tail if event.get("type") == "session"}
+        }
+        pending = empty_analytics()
+        if exists:
+            for key, record_id, record in stream_snapshot(store.snapshot_path):
+                if key not in touched:
+                    continue
+                if record_id in touched[key]:
+                    pending[key][record_id] = record
+                elif key == section:
+                    yield record_id, record
+        for visitor in pending["visitors"].values():
+            migrate_visitor(visitor)
+        for session in pending["sessions"].values():
+            migrate_session(session)
+        for event in tail:
+            apply_event(pending, event)
+        yield from pending[section].items()
+
+
+def store_rows(store, kind, include_archives=False):
+    """Lignes (tuples dans l'ordre de EXPORT_COLUMNS[kind]) d'une table du store"""
+    if kind not in EXPORT_COLUMNS:
+        raise ValueError(f"Table d'export inconnue : {kind}")
+    if isinstance(store, JsonAnalyticsStore):
+        yield from _rows(kind, json_records(store, EXPORT_SECTIONS[kind]))
+    else:
+        for row in store.export_rows(kind):
+            yield tuple(row) + (False,)
+    if include_archives:
+        record_type = EXPORT_SECTIONS[kind][:-1]
+        for month in store.archive_months():
+            records = (
+                (record[f"{record_type}_id"], record[record_type])
+                for record in iter_records(archive_path(store.archive_prefix, month))
+                if record.get("type") == record_type
+            )
+            yield from _rows(kind, records, archived=True)
+
+
+def write_csv(rows, path, kind):
+    """Écrire les lignes en CSV (en-tête compris) ; retourne le nombre de lignes"""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in EXPORT_COLUMNS[kind]])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(rows, path, kind, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Écrire les lignes en Parquet, un groupe de lignes par lot ; retourne le nombre de lignes"""
+    if pyarrow is None:
+        raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+    columns = EXPORT_COLUMNS[kind]
+    schema = pyarrow.schema([(name, pyarrow.type_for_alias(type_name)) for name, type_name in columns])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                writer.write_batch(_record_batch(chunk, schema))
+                count += len(chunk)
+                chunk = []
+        if chunk or not count:
+            writer.write_batch(_record_batch(chunk, schema))
+            count += len(chunk)
+    return count
+
+
+def _record_batch(chunk, schema):
+    return pyarrow.record_batch([list(column) for column in zip(*chunk)] or [[] for _ in schema], schema=schema)
+
+
+def export_table(store, kind, path, fmt="parquet", include_archives=False):
+    """Exporter une table du store dans path ; retourne le nombre de lignes écrites"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    rows = store_rows(store, kind, include_archives)
+    if fmt == "csv":
+        return write_csv(rows, path, kind)
+    return write_parquet(rows, path, kind)
@@ -0,0 +1,120 @@
+"""Index ordonnés et pagination par curseur pour les tableaux d'administration.
+
+Chaque index est une liste triée de couples ``(clé de tri, identifiant)``
+maintenue par ``bisect`` au fil des événements. Une page est lue à partir d'un
+curseur (le dernier couple de la page précédente) : O(log n + taille de page),
+quelle que soit la longueur de l'historique. Quand le snapshot change
+(compaction), ``sync`` ne déplace que les enregistrements qui diffèrent de la
+vue précédente au lieu de tout re-trier. Les deux backends acceptent les
+mêmes colonnes de tri et renvoient les mêmes curseurs.
+"""
+import bisect
+
+# Colonnes de tri proposées : champ de l'enregistrement -> valeur si absent
+SESSION_SORTS = {"start_time": -1, "visitor_id": "", "total_page_views": 0, "duration_seconds": -1}
+VISITOR_SORTS = {"last_visit": -1, "first_visit": -1, "total_visits": 0, "total_seconds": 0}
+# Au-delà d'un enregistrement modifié sur SYNC_REBUILD_RATIO, sync re-trie tout
+SYNC_REBUILD_RATIO = 16
+
+
+def sort_value(record, field, sorts):
+    value = record.get(field)
+    return sorts[field] if value is None else value
+
+
+class OrderedIndex:
+    """Liste triée (clé, identifiant) avec mise à jour et pagination par curseur"""
+
+    def __init__(self, entries=()):
+        self.entries = sorted(entries)
+        self.key_of = {record_id: key for key, record_id in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, record_id, key):
+        """Insérer ou déplacer un identifiant (O(log n) + décalage mémoire)"""
+        if record_id in self.key_of:
+            if self.key_of[record_id] == key:
+                return
+            self.remove(record_id)
+        self.key_of[record_id] = key
+        bisect.insort(self.entries, (key, record_id))
+
+    def remove(self, record_id):
+        key = self.key_of.pop(record_id, None)
+        if key is None:
+            return
+        position = bisect.bisect_left(self.entries, (key, record_id))
+        if position < len(self.entries) and self.entries[position] == (key, record_id):
+            del self.entries[position]
+
+    def remove_many(self, record_ids):
+        """Retirer plusieurs identifiants en un seul parcours de la liste (O(n))"""
+        removed = {record_id for record_id in record_ids if self.key_of.pop(record_id, None) is not None}
+        if removed:
+            self.entries = [entry for entry in self.entries if entry[1] not in removed]
+
+    def page(self, cursor=None, limit=20, descending=True):
+        """Identifiants de la page qui suit cursor et curseur de la page suivante (None en fin)"""
+        if descending:
+            end = len(self.entries) if cursor is None else bisect.bisect_left(self.entries, tuple(cursor))
+            start = max(0, end - limit)
+            page = self.entries[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = 0 if cursor is None else bisect.bisect_right(self.entries, tuple(cursor))
+            page = self.entries[start:start + limit]
+            has_more = start + limit < len(self.entries)
+        return [record_id for _, record_id in page], (page[-1] if page and has_more else None)
+
+
+class BrowseIndexes:
+    """Index de tri des sessions et des visiteurs d'un dictionnaire d'analytics"""
+
+    def __init__(self, analytics):
+        self.sessions = self._build(analytics["sessions"], SESSION_SORTS)
+        self.visitors = self._build(analytics["visitors"], VISITOR_SORTS)
+
+    @staticmethod
+    def _build(records, sorts):
+        return {
+            field: OrderedIndex((sort_value(record, field, sorts), record_id) for record_id, record in records.items())
+            for field in sorts
+        }
+
+    def sync(self, previous, analytics):
+        """Passer des index de previous à ceux de analytics (nouveau snapshot) en ne
+        déplaçant que les enregistrements ajoutés, modifiés ou supprimés"""
+        for kind, indexes, sorts in (("sessions", self.sessions, SESSION_SORTS),
+                                     ("visitors", self.visitors, VISITOR_SORTS)):
+            old_records, records = previous[kind], analytics[kind]
+            removed = old_records.keys() - records.keys()
+            changed = [(record_id, record) for record_id, record in records.items()
+                       if old_records.get(record_id) != record]
+            if len(changed) > len(records) // SYNC_REBUILD_RATIO:
+                # Beaucoup de changements (réinitialisation, migration) : re-trier coûte moins
+                indexes.update(self._build(records, sorts))
+                continue
+            for index in indexes.values():
+                index.remove_many(removed)
+            for record_id, record in changed:
+                self._update(indexes, sorts, record_id, record)
+
+    def apply(self, analytics, event):
+        """Reporter un événement déjà appliqué à analytics sur les index"""
+        if event.get("type") == "visit":
+            visitor_id = event["visitor_id"]
+            self._update(self.visitors, VISITOR_SORTS, visitor_id, analytics["visitors"][visitor_id])
+        elif event.get("type") == "session":
+            session = analytics["sessions"][event["session_id"]]
+            self._update(self.sessions, SESSION_SORTS, event["session_id"], session)
+            # Les agrégats du visiteur (temps total) ont pu changer
+            visitor = analytics["visitors"].get(session["visitor_id"])
+            if visitor is not None:
+                self._update(self.visitors, VISITOR_SORTS, session["visitor_id"], visitor)
+
+    @staticmethod
+    def _update(indexes, sorts, record_id, record):
+        for field, index in indexes.items():
+            index.update(record_id, sort_value(record, field, sorts))
@@ -0,0 +1,362 @@
+"""Rapport d'analytics hors ligne, en streaming.
+
+Le snapshot JSON est parcouru entrée par entrée (``stream_snapshot``) sans
+jamais être chargé en entier ; archives mensuelles et segments du journal
+sont lus ligne par ligne. Les métriques sont accumulées en mémoire constante :
+compteurs par jour de la période, visiteurs uniques estimés par HyperLogLog,
+dernières sessions et derniers visiteurs gardés dans des tas bornés. Un
+historique de plusieurs Go peut donc être analysé depuis cron sur une petite
+machine, sans démarrer Streamlit :
+
+    python analytics_cli.py report --since 2025-08-01 --until 2025-08-31
+"""
+import glob
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+from datetime import datetime
+
+from analytics_store import ANALYTICS_FILE, format_duration, format_timestamp, migrate_session, migrate_visitor
+from sketches import HyperLogLog
+
+CHUNK_SIZE = 1 << 16
+RECENT_LIMIT = 10
+
+_decoder = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Lecteur JSON incrémental : objets parcourus clé par clé, valeurs
+    décodées une à une depuis un tampon rempli par blocs de CHUNK_SIZE"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Prochain caractère significatif (espaces ignorés)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("JSON tronqué")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"'{char}' attendu à la position {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Décoder la valeur suivante (complétée bloc par bloc si nécessaire)"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre en fin de tampon peut se poursuivre dans le bloc suivant
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def keys(self):
+        """Parcourir les clés d'un objet ; l'appelant lit chaque valeur avant de continuer"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"',' ou '}}' attendu à la position {self.pos}")
+
+
+def stream_snapshot(path, nested=("visitors", "sessions")):
+    """Parcourir un snapshot sans le charger : (section, clé, valeur) pour chaque
+    entrée des sections nested, (clé, None, valeur) pour les autres clés"""
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f)
+        for key in stream.keys():
+            if key in nested:
+                for entry_key in stream.keys():
+                    yield key, entry_key, stream.value()
+            else:
+                yield key, None, stream.value()
+
+
+def iter_records(path):
+    """Lire un fichier d'événements ou une archive (.jsonl ou .jsonl.gz) ligne à ligne"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Dernière ligne tronquée d'un segment en cours d'écriture
+                continue
+
+
+def log_generation(snapshot_path):
+    """Première génération du journal non intégrée au snapshot. La clé est
+    écrite en dernier (snapshot_data) : elle est lue en fin de fichier, sans
+    tout parcourir ; les snapshots écrits autrement sont parcourus en entier."""
+    with open(snapshot_path, "rb") as f:
+        f.seek(max(0, os.path.getsize(snapshot_path) - 4096))
+        tail = f.read().decode("utf-8", "ignore")
+    match = re.search(r'"event_log_generation"\s*:\s*(\d+)\s*}\s*$', tail)
+    if match:
+        return int(match.group(1))
+    for section, _, value in stream_snapshot(snapshot_path):
+        if section == "event_log_generation":
+            return value
+    return 0
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+class AnalyticsReport:
+    """Accumulateur des métriques du tableau de bord sur une période [since, until]"""
+
+    def __init__(self, since=None, until=None):
+        self.since = since
+        self.until = until
+        self.daily_visits = {}
+        self.hourly_visits = [0] * 24
+        self.page_views = {}
+        self.project_views = {}
+        self.visitors = HyperLogLog()
+        self.session_stats = {"total_sessions": 0, "timed_sessions": 0, "total_seconds": 0, "total_page_views": 0}
+        self.recent_sessions = []
+        self.recent_visitors = []
+
+    def in_range(self, day):
+        return (self.since is None or day >= self.since) and (self.until is None or day <= self.until)
+
+    def overlaps(self, first_ts, last_ts):
+        return ((self.since is None or _day(last_ts) >= self.since)
+                and (self.until is None or _day(first_ts) <= self.until))
+
+    @staticmethod
+    def _keep_recent(heap, item):
+        if len(heap) < RECENT_LIMIT:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+
+    # -- Sources ---------------------------------------------------------------
+
+    def add_rollups(self, key, value):
+        """Agrégats quotidiens et horaires du snapshot (visites déjà compactées)"""
+        if key == "daily_visits":
+            for day, visits in value.items():
+                if self.in_range(day):
+                    self.daily_visits[day] = self.daily_visits.get(day, 0) + visits
+        elif key == "hourly_visits":
+            for hour, visits in value.items():
+                if self.in_range(hour[:10]):
+                    self.hourly_visits[int(hour[11:13])] += visits
+        elif key in ("page_views", "project_views", "daily_page_views", "daily_project_views"):
+            totals = self.page_views if "page" in key else self.project_views
+            unfiltered = self.since is None and self.until is None
+            if not key.startswith("daily_"):
+                # Sans filtre, les totaux couvrent aussi l'historique antérieur aux agrégats quotidiens
+                counts = value if unfiltered else {}
+            else:
+                counts = {}
+                if not unfiltered:
+                    for day, day_counts in value.items():
+                        if self.in_range(day):
+                            for name, views in day_counts.items():
+                                counts[name] = counts.get(name, 0) + views
+            for name, views in counts.items():
+                totals[name] = totals.get(name, 0) + views
+
+    def add_visit(self, event):
+        """Visite encore dans le journal (pas encore compactée)"""
+        ts = event["ts"]
+        day = _day(ts)
+        if not self.in_range(day):
+            return
+        self.daily_visits[day] = self.daily_visits.get(day, 0) + 1
+        self.hourly_visits[datetime.fromtimestamp(ts).hour] += 1
+        self.page_views[event["page"]] = self.page_views.get(event["page"], 0) + 1
+        if event.get("project_key"):
+            self.project_views[event["project_key"]] = self.project_views.get(event["project_key"], 0) + 1
+        self.visitors.add(event["visitor_id"])
+
+    def add_visitor(self, visitor_id, visitor):
+        visitor = migrate_visitor(visitor)
+        first_visit = visitor["first_visit"]
+        last_visit = visitor.get("last_visit", first_visit)
+        if self.overlaps(first_visit, last_visit):
+            self.visitors.add(visitor_id)
+            self._keep_recent(self.recent_visitors, (last_visit, visitor_id, visitor.get("total_visits", 0),
+                                                     visitor.get("total_seconds", 0)))
+
+    def add_session(self, session_id, session):
+        session = migrate_session(session)
+        start_time = session.get("start_time")
+        if start_time is None or not self.in_range(_day(start_time)):
+            return
+        seconds = session.get("duration_seconds")
+        self.session_stats["total_sessions"] += 1
+        if seconds is not None:
+            self.session_stats["timed_sessions"] += 1
+            self.session_stats["total_seconds"] += seconds
+        self.session_stats["total_page_views"] += session.get("total_page_views", 0)
+        self._keep_recent(self.recent_sessions, (start_time, session_id, session["visitor_id"], seconds,
+                                                 session.get("total_page_views", 0)))
+
+    def add_record(self, record):
+        """Événement du journal ou enregistrement d'archive"""
+        kind = record.get("type")
+        if kind == "visit":
+            self.add_visit(record)
+        elif kind == "session":
+            self.add_session(record["session_id"], record["session"])
+        elif kind == "visitor":
+            self.add_visitor(record["visitor_id"], record["visitor"])
+
+    def read_store(self, snapshot_path=ANALYTICS_FILE):
+        """Parcourir le store JSON : journal non compacté, snapshot puis archives mensuelles.
+
+        Une session présente dans le journal y a sa version la plus récente :
+        elle est ignorée dans le snapshot et les archives, comme apply_event
+        la remplace à la compaction."""
+        prefix = os.path.splitext(snapshot_path)[0] + "."
+        exists = os.path.exists(snapshot_path)
+        first_generation = log_generation(snapshot_path) if exists else 0
+        log_paths = []
+        for path in sorted(glob.glob(glob.escape(prefix) + "events.*.jsonl")):
+            try:
+                generation = int(path[len(prefix) + len("events."):-len(".jsonl")])
+            except ValueError:
+                continue
+            if generation >= first_generation:
+                log_paths.append(path)
+        logged_sessions = self.read_log(log_paths)
+
+        if exists:
+            for section, key, value in stream_snapshot(snapshot_path):
+                if section == "visitors":
+                    self.add_visitor(key, value)
+                elif section == "sessions":
+                    if key not in logged_sessions:
+                        self.add_session(key, value)
+                elif section != "event_log_generation":
+                    self.add_rollups(section, value)
+        for path in sorted(glob.glob(glob.escape(prefix) + "archive.*.jsonl.gz")):
+            self.read_events(path, logged_sessions)
+        return self
+
+    def read_log(self, paths):
+        """Segments du journal, dans l'ordre : une session y est réémise à chaque
+        mise à jour, seul son dernier enregistrement compte. Retourne les
+        identifiants des sessions lues."""
+        sessions = {}
+        for path in paths:
+            for record in iter_records(path):
+                if record.get("type") == "session":
+                    sessions[record["session_id"]] = record["session"]
+                else:
+                    self.add_record(record)
+        for session_id, session in sessions.items():
+            self.add_session(session_id, session)
+        return sessions.keys()
+
+    def read_events(self, path, skip_sessions=()):
+        for record in iter_records(path):
+            if record.get("type") == "session" and record["session_id"] in skip_sessions:
+                continue
+            self.add_record(record)
+        return self
+
+    # -- Résultats -------------------------------------------------------------
+
+    def results(self):
+        """Métriques du tableau de bord, sérialisables en JSON"""
+        unique_visitors = self.visitors.count()
+        return {
+            "since": self.since,
+            "until": self.until,
+            "total_visits": sum(self.daily_visits.values()),
+            # Marge à ~95 % (deux erreurs types)
+            "unique_visitors": {"estimate": unique_visitors,
+                                "margin": int(math.ceil(2 * self.visitors.relative_error * unique_visitors))},
+            "page_views": dict(self.page_views),
+            "daily_visits": dict(sorted(self.daily_visits.items())),
+            "hourly_visits": self.hourly_visits,
+            "top_projects": heapq.nlargest(10, self.project_views.items(), key=lambda item: item[1]),
+            "session_stats": dict(self.session_stats),
+            "recent_sessions": [
+                {"session_id": session_id, "visitor_id": visitor_id, "start_time": start_time,
+                 "duration_seconds": seconds, "total_page_views": page_views}
+                for start_time, session_id, visitor_id, seconds, page_views in sorted(self.recent_sessions)
+            ],
+            "recent_visitors": [
+                {"visitor_id": visitor_id, "last_visit": last_visit, "total_visits": total_visits,
+                 "total_seconds": total_seconds}
+                for last_visit, visitor_id, total_visits, total_seconds in sorted(self.recent_visitors)
+            ]
+        }
+
+
+def format_report(results):
+    """Rendu texte du rapport (mêmes rubriques que les onglets d'administration)"""
+    period = f"{results['since'] or 'début'} → {results['until'] or 'aujourd’hui'}"
+    stats = results["session_stats"]
+    unique = results["unique_visitors"]
+    lines = [
+        f"📈 Rapport analytics ({period})",
+        "",
+        f"🌍 Visites totales : {results['total_visits']}",
+        f"👥 Visiteurs uniques : ≈ {unique['estimate']} (± {unique['margin']})",
+    ]
+    lines += [f"📄 Vues {page} : {views}" for page, views in sorted(results["page_views"].items())]
+    lines += ["", "📅 Visites par jour"]
+    lines += [f"  {day}  {visits}" for day, visits in results["daily_visits"].items()]
+    lines += ["", "🕐 Visites par heure de la journée"]
+    lines += [f"  {hour:02d}h  {visits}" for hour, visits in enumerate(results["hourly_visits"]) if visits]
+    lines += ["", "📊 Projets les plus vus"]
+    lines += [f"  {project}  {views}" for project, views in results["top_projects"]]
+    lines += ["", f"⏱️ Sessions : {stats['total_sessions']}"]
+    if stats["timed_sessions"]:
+        lines.append(f"  Durée moyenne : {format_duration(stats['total_seconds'] // stats['timed_sessions'])}")
+    if stats["total_sessions"]:
+        lines.append(f"  Pages/session : {stats['total_page_views'] / stats['total_sessions']:.1f}")
+    lines += ["", "🔍 Dernières sessions"]
+    lines += [f"  {format_timestamp(s['start_time'])}  {s['visitor_id']}  "
+              f"{format_duration(s['duration_seconds'])}  {s['total_page_views']} pages"
+              for s in results["recent_sessions"]]
+    lines += ["", "👤 Derniers visiteurs"]
+    lines += [f"  {format_timestamp(v['last_visit'])}  {v['visitor_id']}  {v['total_visits']} visites  "
+              f"{format_duration(v['total_seconds'])}"
+              for v in results["recent_visitors"]]
+    return "\n".join(lines)
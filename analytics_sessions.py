@@ -0,0 +1,158 @@
+"""Cycle de vie des sessions de visite.
+
+Les sessions actives vivent dans une table en mémoire partagée par toutes les
+sessions Streamlit du processus. Chaque visite fait office de battement de
+cœur (``heartbeat``) et repousse l'échéance d'inactivité de la session. Un
+thread de balayage dort jusqu'à la prochaine échéance (tas ``heapq`` à
+suppression paresseuse) et clôt les sessions inactives depuis
+``SESSION_IDLE_TIMEOUT`` secondes : la durée va du début à la dernière activité
+et la session est remise une seule fois à la file d'écriture différée, qui
+l'écrit par lots avec les visites.
+
+Les sessions encore ouvertes sont clôturées à l'arrêt du processus.
+"""
+import atexit
+import heapq
+import os
+import threading
+import time
+
+from analytics_store import format_timestamp, get_writer
+
+# Une session sans activité depuis ce délai (secondes) est clôturée
+SESSION_IDLE_TIMEOUT = int(os.getenv("ANALYTICS_SESSION_TIMEOUT", "1800"))
+# Réveil maximal du balayeur, même sans échéance connue
+SWEEP_INTERVAL = 60
+
+
+class SessionTracker:
+    """Table des sessions actives avec expiration par inactivité"""
+
+    def __init__(self, writer, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        # visitor_id -> session en cours (start_time, last_activity, page_views)
+        self._active = {}
+        # (échéance, visitor_id) ; une entrée périmée est ignorée au dépilement
+        self._deadlines = []
+        self._condition = threading.Condition()
+        self._sweeper = None
+        self._closed = False
+
+    def heartbeat(self, visitor_id, page=None, project_key=None, ts=None):
+        """Signaler une activité (et la page vue) ; ouvre la session si besoin"""
+        ts = int(ts if ts is not None else time.time())
+        with self._condition:
+            session = self._active.get(visitor_id)
+            if session is None:
+                session = self._active[visitor_id] = {
+                    "visitor_id": visitor_id,
+                    "start_time": ts,
+                    "last_activity": ts,
+                    "page_views": []
+                }
+            session["last_activity"] = max(session["last_activity"], ts)
+            if page is not None:
+                session["page_views"].append({"page": page, "timestamp": ts, "project_key": project_key})
+            deadline = session["last_activity"] + self.idle_timeout
+            if len(self._deadlines) > 2 * len(self._active) + 64:
+                # Trop d'entrées périmées : reconstruire le tas depuis la table active
+                self._deadlines = [(active["last_activity"] + self.idle_timeout, active_id)
+                                   for active_id, active in self._active.items() if active_id != visitor_id]
+                heapq.heapify(self._deadlines)
+            heapq.heappush(self._deadlines, (deadline, visitor_id))
+            if self._deadlines[0] == (deadline, visitor_id):
+                # Nouvelle échéance la plus proche : réveiller le balayeur
+                self._condition.notify()
+        self._ensure_sweeper()
+        return session
+
+    def close(self, visitor_id, end_time=None):
+        """Clôturer immédiatement la session d'un visiteur ; None si aucune n'est ouverte"""
+        with self._condition:
+            session = self._active.pop(visitor_id, None)
+        if session is None:
+            return None
+        return self._persist(session, end_time)
+
+    def expire(self, now=None):
+        """Clôturer les sessions dont l'échéance est passée ; retourne leur nombre"""
+        now = now if now is not None else time.time()
+        expired = []
+        with self._condition:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, visitor_id = heapq.heappop(self._deadlines)
+                session = self._active.get(visitor_id)
+                # Entrée périmée : la session a eu une activité depuis, ou est close
+                if session is not None and session["last_activity"] + self.idle_timeout == deadline:
+                    expired.append(self._active.pop(visitor_id))
+        for session in expired:
+            self._persist(session)
+        return len(expired)
+
+    def _persist(self, session, end_time=None):
+        """Remettre une session close à la file d'écriture (une seule fois : elle
+        a été retirée de la table active sous verrou)"""
+        end_time = end_time if end_time is not None else session["last_activity"]
+        session_id = f"{session['visitor_id']}_{format_timestamp(session['start_time'])}"
+        self.writer.record_session(session_id, {
+            "visitor_id": session["visitor_id"],
+            "start_time": session["start_time"],
+            "end_time": end_time,
+            "duration_seconds": end_time - session["start_time"],
+            "page_views": session["page_views"],
+            "total_page_views": len(session["page_views"])
+        })
+        return session_id
+
+    def active_sessions(self):
+        """Nombre de sessions actuellement ouvertes"""
+        with self._condition:
+            return len(self._active)
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None:
+            with self._condition:
+                if self._sweeper is None and not self._closed:
+                    self._sweeper = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+                    self._sweeper.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                timeout = SWEEP_INTERVAL
+                if self._deadlines:
+                    timeout = min(timeout, max(0, self._deadlines[0][0] - time.time()))
+                self._condition.wait(timeout)
+                if self._closed:
+                    return
+            self.expire()
+
+    def close_all(self):
+        """Arrêter le balayeur et clôturer toutes les sessions ouvertes (arrêt du processus)"""
+        with self._condition:
+            self._closed = True
+            sessions, self._active = list(self._active.values()), {}
+            self._deadlines = []
+            self._condition.notify_all()
+        for session in sessions:
+            self._persist(session)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker():
+    """Retourner la table des sessions actives du processus"""
+    global _tracker
+    if _tracker is None:
+        writer = get_writer()
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = SessionTracker(writer)
+                # Enregistré après la file d'écriture : exécuté avant elle à l'arrêt
+                atexit.register(_tracker.close_all)
+    return _tracker
@@ -0,0 +1,729 @@
+"""Backend SQLite pour les analytics du portfolio.
+
+Visiteurs, sessions, pages vues et compteurs quotidiens sont stockés dans une
+base SQLite embarquée, indexée sur ``visitor_id``, ``start_time`` et le jour.
+Les onglets d'administration interrogent directement ces index au lieu de
+charger et parcourir tout le dictionnaire JSON.
+
+Activation : ``ANALYTICS_BACKEND=sqlite`` (fichier ``ANALYTICS_DB_FILE``,
+``portfolio_analytics.db`` par défaut). Import de l'historique JSON existant :
+``python analytics_cli.py import-json``.
+
+Le schéma suit la version des analytics JSON (``PRAGMA user_version``) : en
+v2, horodatages en entiers epoch et durées en secondes. Une base v1 (colonnes
+texte) est migrée sur place à l'ouverture.
+
+Rétention : au plus une fois par ``ARCHIVE_INTERVAL`` secondes, les sessions et
+visiteurs expirés sont écrits dans les mêmes archives mensuelles compressées
+que le backend JSON puis supprimés des tables.
+
+Mode sketch : chaque sketch (uniques de tout l'historique, uniques d'un jour,
+top projets) est une ligne JSON de la table ``sketches``, relue et réécrite une
+fois par lot d'événements, dans la transaction qui applique les visites.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from analytics_columns import HISTOGRAM_EDGES, HISTOGRAM_LABELS, PERCENTILES, percentile_index
+from analytics_index import SESSION_SORTS, VISITOR_SORTS
+from analytics_store import (ARCHIVE_INTERVAL, RETENTION_DAYS, SCHEMA_VERSION, SKETCH_DAYS, SKETCHES_ENABLED, add_session_stats,
+                             archive_month, archive_months, archive_path, day_keys, empty_analytics,
+                             empty_session_stats, find_archived, format_timestamp, hour_keys, migrate_analytics,
+                             migrate_session, new_sketches, parse_duration, read_archive, retention_cutoff,
+                             session_event, sketches_from_json, sketches_to_json, unique_estimates,
+                             update_sketches, visit_event, write_archives)
+from analytics_timeseries import days_between, hour_bounds, weekday_hour_heatmap
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS visitors (
+    visitor_id TEXT PRIMARY KEY,
+    first_visit INTEGER NOT NULL,
+    last_visit INTEGER NOT NULL,
+    total_visits INTEGER NOT NULL DEFAULT 0,
+    total_seconds INTEGER NOT NULL DEFAULT 0,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    last_seen INTEGER
+);
+CREATE TABLE IF NOT EXISTS visitor_pages (
+    visitor_id TEXT NOT NULL,
+    page TEXT NOT NULL,
+    PRIMARY KEY (visitor_id, page)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    visitor_id TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER,
+    duration_seconds INTEGER,
+    total_page_views INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS session_page_views (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    page TEXT NOT NULL,
+    project_key TEXT,
+    timestamp INTEGER,
+    PRIMARY KEY (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS daily_visits (
+    day TEXT PRIMARY KEY,
+    visits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS page_views (
+    page TEXT PRIMARY KEY,
+    views INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS project_views (
+    project_key TEXT PRIMARY KEY,
+    views INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS hourly_visits (
+    hour TEXT PRIMARY KEY,
+    visits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS daily_page_views (
+    day TEXT NOT NULL,
+    page TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, page)
+);
+CREATE TABLE IF NOT EXISTS daily_project_views (
+    day TEXT NOT NULL,
+    project_key TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, project_key)
+);
+CREATE TABLE IF NOT EXISTS archived_visitors (
+    visitor_id TEXT PRIMARY KEY,
+    month TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sketches (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_duration ON sessions (duration_seconds);
+-- Pagination par curseur (colonne de tri, identifiant) des tableaux d'administration ;
+-- ces index composites remplacent ceux sur la seule colonne de tri
+DROP INDEX IF EXISTS idx_visitors_first_visit;
+DROP INDEX IF EXISTS idx_sessions_visitor_id;
+DROP INDEX IF EXISTS idx_sessions_start_time;
+CREATE INDEX IF NOT EXISTS idx_visitors_first_visit_id ON visitors (first_visit, visitor_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_visitor_id_id ON sessions (visitor_id, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_start_time_id ON sessions (start_time, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_page_views_id ON sessions (total_page_views, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_duration_id ON sessions (COALESCE(duration_seconds, -1), session_id);
+CREATE INDEX IF NOT EXISTS idx_visitors_last_visit_id ON visitors (last_visit, visitor_id);
+CREATE INDEX IF NOT EXISTS idx_visitors_total_visits_id ON visitors (total_visits, visitor_id);
+CREATE INDEX IF NOT EXISTS idx_visitors_total_seconds_id ON visitors (total_seconds, visitor_id);
+"""
+
+# Migration v1 -> v2 : les tables à horodatages texte sont reconstruites, les
+# chaînes (heure locale) converties en epoch et les durées "3m 12s" en secondes
+MIGRATE_V1_TO_V2 = """
+ALTER TABLE visitors RENAME TO visitors_v1;
+ALTER TABLE sessions RENAME TO sessions_v1;
+ALTER TABLE session_page_views RENAME TO session_page_views_v1;
+{schema}
+INSERT INTO visitors (visitor_id, first_visit, last_visit, total_visits)
+    SELECT visitor_id, CAST(strftime('%s', first_visit, 'utc') AS INTEGER),
+           CAST(strftime('%s', last_visit, 'utc') AS INTEGER), total_visits
+    FROM visitors_v1;
+INSERT INTO sessions (session_id, visitor_id, start_time, end_time, duration_seconds, total_page_views)
+    SELECT session_id, visitor_id, CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+           CAST(strftime('%s', end_time, 'utc') AS INTEGER), duration_seconds, total_page_views
+    FROM sessions_v1;
+INSERT INTO session_page_views (session_id, position, page, project_key, timestamp)
+    SELECT session_id, position, page, project_key, CAST(strftime('%s', timestamp, 'utc') AS INTEGER)
+    FROM session_page_views_v1;
+DROP TABLE visitors_v1;
+DROP TABLE sessions_v1;
+DROP TABLE session_page_views_v1;
+"""
+
+# Agrégats par visiteur recalculés depuis les sessions (import, migration)
+REFRESH_VISITOR_TOTALS = """
+UPDATE visitors SET
+    total_seconds = (SELECT COALESCE(SUM(duration_seconds), 0) FROM sessions s
+                     WHERE s.visitor_id = visitors.visitor_id),
+    session_count = (SELECT COUNT(*) FROM sessions s WHERE s.visitor_id = visitors.visitor_id),
+    last_seen = (SELECT MAX(end_time) FROM sessions s WHERE s.visitor_id = visitors.visitor_id)
+"""
+
+TABLES = ("counters", "visitors", "visitor_pages", "sessions", "session_page_views",
+          "daily_visits", "page_views", "project_views", "hourly_visits", "daily_page_views",
+          "daily_project_views", "archived_visitors", "sketches")
+
+# Totaux des sessions archivées, rangés dans counters sous ce préfixe
+ARCHIVED_STATS_PREFIX = "archived_sessions."
+
+# Colonnes de tri pouvant être NULL (triées via COALESCE et un index d'expression)
+NULLABLE_SORTS = {"duration_seconds"}
+
+# Lignes de la table sketches : un sketch quotidien par jour "uniques_daily:AAAA-MM-JJ"
+DAILY_SKETCH_PREFIX = "uniques_daily:"
+
+
+class SqliteAnalyticsStore:
+    """Store d'analytics SQLite, même interface que JsonAnalyticsStore"""
+
+    def __init__(self, db_path, retention_days=RETENTION_DAYS, sketches=SKETCHES_ENABLED):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.sketches = sketches
+        self.archive_prefix = os.path.splitext(db_path)[0] + "."
+        self._local = threading.local()
+        self._next_archive = 0
+        self._migrate(self._connect())
+
+    @staticmethod
+    def _migrate(conn):
+        """Créer le schéma ou migrer une base existante vers SCHEMA_VERSION"""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            # Tables ajoutées depuis (CREATE ... IF NOT EXISTS)
+            conn.executescript(SCHEMA)
+            return
+        visitor_columns = {row["name"] for row in conn.execute("PRAGMA table_info(visitors)")}
+        if "total_time_spent" in visitor_columns:
+            # Base v1 : durées texte converties avant la reconstruction des tables
+            if "duration_seconds" not in {row["name"] for row in conn.execute("PRAGMA table_info(sessions)")}:
+                conn.execute("ALTER TABLE sessions ADD COLUMN duration_seconds INTEGER")
+            conn.executemany(
+                "UPDATE sessions SET duration_seconds = ? WHERE session_id = ?",
+                [(parse_duration(duration), session_id)
+                 for session_id, duration in conn.execute("SELECT session_id, duration FROM sessions").fetchall()]
+            )
+            conn.executescript(MIGRATE_V1_TO_V2.format(schema=SCHEMA))
+            conn.execute(REFRESH_VISITOR_TOTALS)
+        else:
+            conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+    def _connect(self):
+        """Connexion propre au thread courant (un thread par session Streamlit)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- Écriture -----------------------------------------------------------
+
+    @staticmethod
+    def _increment(conn, table, key_column, key, value_column, amount=1):
+        conn.execute(
+            f"INSERT INTO {table} ({key_column}, {value_column}) VALUES (?, ?) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET {value_column} = {value_column} + excluded.{value_column}",
+            (key, amount)
+        )
+
+    @staticmethod
+    def _increment_daily(conn, table, key_column, day, key, amount=1):
+        conn.execute(
+            f"INSERT INTO {table} (day, {key_column}, views) VALUES (?, ?, ?) "
+            f"ON CONFLICT (day, {key_column}) DO UPDATE SET views = views + excluded.views",
+            (day, key, amount)
+        )
+
+    def _apply_visit(self, conn, event):
+        """Appliquer une visite : visiteur, compteurs, jour, page et projet"""
+        ts = event["ts"]
+        timestamp = format_timestamp(ts)
+        visitor_id = event["visitor_id"]
+        page = event["page"]
+        project_key = event.get("project_key")
+        is_new_visitor = conn.execute(
+            "INSERT OR IGNORE INTO visitors (visitor_id, first_visit, last_visit) VALUES (?, ?, ?)",
+            (visitor_id, ts, ts)
+        ).rowcount == 1
+        # Un visiteur archivé qui revient a déjà été compté
+        if is_new_visitor and conn.execute(
+            "SELECT 1 FROM archived_visitors WHERE visitor_id = ?", (visitor_id,)
+        ).fetchone() is None:
+            self._increment(conn, "counters", "name", "unique_visitors", "value")
+        self._increment(conn, "counters", "name", "total_visits", "value")
+        conn.execute(
+            "UPDATE visitors SET total_visits = total_visits + 1, first_visit = MIN(first_visit, ?), "
+            "last_visit = MAX(last_visit, ?) WHERE visitor_id = ?",
+            (ts, ts, visitor_id)
+        )
+        conn.execute("INSERT OR IGNORE INTO visitor_pages (visitor_id, page) VALUES (?, ?)", (visitor_id, page))
+        self._increment(conn, "daily_visits", "day", timestamp[:10], "visits")
+        self._increment(conn, "hourly_visits", "hour", timestamp[:13], "visits")
+        self._increment(conn, "page_views", "page", page, "views")
+        self._increment_daily(conn, "daily_page_views", "page", timestamp[:10], page)
+        if project_key:
+            self._increment(conn, "project_views", "project_key", project_key, "views")
+            self._increment_daily(conn, "daily_project_views", "project_key", timestamp[:10], project_key)
+
+    def _insert_session(self, conn, session_id, session, update_visitor=True):
+        session = migrate_session(session)
+        seconds = session.get("duration_seconds")
+        if update_visitor:
+            # Agrégats du visiteur mis à jour à la clôture : une session déjà
+            # enregistrée n'applique que sa différence de durée
+            previous = conn.execute(
+                "SELECT duration_seconds FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            conn.execute(
+                "UPDATE visitors SET total_seconds = total_seconds + ?, session_count = session_count + ?, "
+                "last_seen = MAX(COALESCE(last_seen, 0), COALESCE(?, 0)) WHERE visitor_id = ?",
+                ((seconds or 0) - ((previous[0] or 0) if previous else 0), 0 if previous else 1,
+                 session.get("end_time"), session["visitor_id"])
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, visitor_id, start_time, end_time, "
+            "duration_seconds, total_page_views) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, session["visitor_id"], session["start_time"], session.get("end_time"),
+             seconds, session.get("total_page_views", 0))
+        )
+        conn.execute("DELETE FROM session_page_views WHERE session_id = ?", (session_id,))
+        conn.executemany(
+            "INSERT INTO session_page_views (session_id, position, page, project_key, timestamp) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(session_id, position, view["page"], view.get("project_key"), view.get("timestamp"))
+             for position, view in enumerate(session.get("page_views", []))]
+        )
+
+    def record_events(self, events):
+        """Appliquer un lot d'événements dans une seule transaction"""
+        with self._connect() as conn:
+            for event in events:
+                if event.get("type") == "visit":
+                    self._apply_visit(conn, event)
+                elif event.get("type") == "session":
+                    self._insert_session(conn, event["session_id"], event["session"])
+            visits = [event for event in events if event.get("type") == "visit"]
+            if self.sketches and visits:
+                self._update_sketches(conn, visits)
+        if time.monotonic() >= self._next_archive:
+            self._next_archive = time.monotonic() + ARCHIVE_INTERVAL
+            self.archive_expired()
+
+    # -- Sketches -------------------------------------------------------------
+
+    @staticmethod
+    def _load_sketches(conn):
+        """Sketches enregistrés (quelques lignes), neufs si la table est vide"""
+        data = {"uniques_daily": {}}
+        for name, value in conn.execute("SELECT name, data FROM sketches"):
+            if name.startswith(DAILY_SKETCH_PREFIX):
+                data["uniques_daily"][name[len(DAILY_SKETCH_PREFIX):]] = json.loads(value)
+            else:
+                data[name] = json.loads(value)
+        return sketches_from_json(data) if "uniques_all" in data else new_sketches()
+
+    @staticmethod
+    def _store_sketches(conn, sketches):
+        data = sketches_to_json(sketches)
+        rows = [("uniques_all", data["uniques_all"]), ("top_projects", data["top_projects"])]
+        rows += [(DAILY_SKETCH_PREFIX + day, sketch) for day, sketch in data["uniques_daily"].items()]
+        conn.executemany("INSERT OR REPLACE INTO sketches (name, data) VALUES (?, ?)",
+                         [(name, json.dumps(sketch)) for name, sketch in rows])
+        # Seuls les SKETCH_DAYS derniers jours sont conservés
+        conn.execute("DELETE FROM sketches WHERE name LIKE ? AND name < ?",
+                     (DAILY_SKETCH_PREFIX + "%", DAILY_SKETCH_PREFIX + day_keys(SKETCH_DAYS)[0]))
+
+    def _update_sketches(self, conn, visits):
+        sketches = self._load_sketches(conn)
+        for event in visits:
+            update_sketches(sketches, event["visitor_id"], format_timestamp(event["ts"])[:10],
+                            event.get("project_key"))
+        self._store_sketches(conn, sketches)
+
+    def archive_expired(self):
+        """Déplacer sessions et visiteurs expirés vers les archives mensuelles.
+
+        Les archives sont écrites avant la suppression des lignes ; seules les
+        lignes effectivement supprimées alimentent les totaux archivés, si bien
+        que deux processus qui archivent en même temps ne comptent rien deux fois.
+        """
+        cutoff = retention_cutoff(self.retention_days)
+        if cutoff is None:
+            return False
+        conn = self._connect()
+        sessions = [(row["session_id"], self._session_dict(conn, row))
+                    for row in conn.execute("SELECT * FROM sessions WHERE start_time < ?", (cutoff,)).fetchall()]
+        visitors = [(row["visitor_id"], self._visitor_dict(conn, row)) for row in conn.execute(
+            "SELECT * FROM visitors WHERE MAX(last_visit, COALESCE(last_seen, 0)) < ?", (cutoff,)
+        ).fetchall()]
+        if not sessions and not visitors:
+            return False
+
+        by_month = {}
+        for session_id, session in sessions:
+            by_month.setdefault(archive_month(session["start_time"]), []).append(session_event(session_id, session))
+        visitor_months = {}
+        for visitor_id, visitor in visitors:
+            month = visitor_months[visitor_id] = archive_month(max(visitor["last_visit"], visitor.get("last_seen", 0)))
+            by_month.setdefault(month, []).append({"type": "visitor", "visitor_id": visitor_id, "visitor": visitor})
+        write_archives(self.archive_prefix, by_month)
+
+        with conn:
+            stats = empty_session_stats()
+            for session_id, session in sessions:
+                if conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount:
+                    conn.execute("DELETE FROM session_page_views WHERE session_id = ?", (session_id,))
+                    add_session_stats(stats, session)
+            for name, value in stats.items():
+                self._increment(conn, "counters", "name", ARCHIVED_STATS_PREFIX + name, "value", value)
+            for visitor_id, month in visitor_months.items():
+                conn.execute("DELETE FROM visitors WHERE visitor_id = ?", (visitor_id,))
+                conn.execute("DELETE FROM visitor_pages WHERE visitor_id = ?", (visitor_id,))
+                conn.execute("INSERT OR REPLACE INTO archived_visitors (visitor_id, month) VALUES (?, ?)",
+                             (visitor_id, month))
+        return True
+
+    def record_visit(self, visitor_id, page="portfolio", project_key=None, ts=None):
+        """Enregistrer une visite de page"""
+        event = visit_event(visitor_id, page, project_key, ts)
+        self.record_events([event])
+        return event
+
+    def record_session(self, session_id, session):
+        """Enregistrer une session terminée et son parcours"""
+        event = session_event(session_id, session)
+        self.record_events([event])
+        return event
+
+    def save(self, analytics):
+        """Remplacer toutes les analytics par le contenu d'un dictionnaire JSON"""
+        analytics = migrate_analytics(dict(analytics, schema_version=analytics.get("schema_version", 1)))
+        with self._connect() as conn:
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?)",
+                [("total_visits", analytics.get("total_visits", 0)),
+                 ("unique_visitors", analytics.get("unique_visitors", 0))]
+                + [(ARCHIVED_STATS_PREFIX + name, value)
+                   for name, value in analytics.get("archived_sessions", {}).items()]
+            )
+            conn.executemany("INSERT INTO archived_visitors (visitor_id, month) VALUES (?, ?)",
+                             analytics.get("archived_visitors", {}).items())
+            conn.executemany("INSERT INTO daily_visits (day, visits) VALUES (?, ?)",
+                             analytics.get("daily_visits", {}).items())
+            conn.executemany("INSERT INTO page_views (page, views) VALUES (?, ?)",
+                             analytics.get("page_views", {}).items())
+            conn.executemany("INSERT INTO project_views (project_key, views) VALUES (?, ?)",
+                             analytics.get("project_views", {}).items())
+            conn.executemany("INSERT INTO hourly_visits (hour, visits) VALUES (?, ?)",
+                             analytics.get("hourly_visits", {}).items())
+            conn.executemany("INSERT INTO daily_page_views (day, page, views) VALUES (?, ?, ?)",
+                             [(day, page, views) for day, pages in analytics.get("daily_page_views", {}).items()
+                              for page, views in pages.items()])
+            conn.executemany("INSERT INTO daily_project_views (day, project_key, views) VALUES (?, ?, ?)",
+                             [(day, key, views) for day, projects in analytics.get("daily_project_views", {}).items()
+                              for key, views in projects.items()])
+            for visitor_id, visitor in analytics.get("visitors", {}).items():
+                conn.execute(
+                    "INSERT INTO visitors (visitor_id, first_visit, last_visit, total_visits) VALUES (?, ?, ?, ?)",
+                    (visitor_id, visitor["first_visit"], visitor.get("last_visit", visitor["first_visit"]),
+                     visitor.get("total_visits", 0))
+                )
+                conn.executemany("INSERT OR IGNORE INTO visitor_pages (visitor_id, page) VALUES (?, ?)",
+                                 [(visitor_id, page) for page in visitor.get("pages_visited", [])])
+            for session_id, session in analytics.get("sessions", {}).items():
+                self._insert_session(conn, session_id, session, update_visitor=False)
+            conn.execute(REFRESH_VISITOR_TOTALS)
+            if "sketches" in analytics:
+                self._store_sketches(conn, analytics["sketches"])
+
+    # -- Lecture ------------------------------------------------------------
+
+    def _session_dict(self, conn, row, with_page_views=True):
+        session = {
+            "visitor_id": row["visitor_id"],
+            "start_time": row["start_time"],
+            "end_time": row["end_time"],
+            "duration_seconds": row["duration_seconds"],
+            "total_page_views": row["total_page_views"]
+        }
+        if with_page_views:
+            session["page_views"] = [
+                {"page": view["page"], "timestamp": view["timestamp"], "project_key": view["project_key"]}
+                for view in conn.execute(
+                    "SELECT page, project_key, timestamp FROM session_page_views "
+                    "WHERE session_id = ? ORDER BY position",
+                    (row["session_id"],)
+                )
+            ]
+        return session
+
+    def _visitor_dict(self, conn, row):
+        visitor = {
+            "first_visit": row["first_visit"],
+            "last_visit": row["last_visit"],
+            "total_visits": row["total_visits"],
+            "pages_visited": [page for (page,) in conn.execute(
+                "SELECT page FROM visitor_pages WHERE visitor_id = ?", (row["visitor_id"],)
+            )],
+            "total_seconds": row["total_seconds"],
+            "session_count": row["session_count"],
+            "sessions": [session_id for (session_id,) in conn.execute(
+                "SELECT session_id FROM sessions WHERE visitor_id = ? ORDER BY start_time", (row["visitor_id"],)
+            )]
+        }
+        if row["last_seen"]:
+            visitor["last_seen"] = row["last_seen"]
+        return visitor
+
+    def load(self):
+        """Reconstruire le dictionnaire complet au format JSON (schéma v2)"""
+        conn = self._connect()
+        analytics = empty_analytics()
+        for name, value in conn.execute("SELECT name, value FROM counters"):
+            if name.startswith(ARCHIVED_STATS_PREFIX):
+                analytics["archived_sessions"][name[len(ARCHIVED_STATS_PREFIX):]] = value
+            else:
+                analytics[name] = value
+        analytics["archived_visitors"] = dict(conn.execute("SELECT visitor_id, month FROM archived_visitors"))
+        analytics["daily_visits"] = dict(conn.execute("SELECT day, visits FROM daily_visits ORDER BY day"))
+        analytics["page_views"].update(conn.execute("SELECT page, views FROM page_views"))
+        analytics["project_views"] = dict(conn.execute("SELECT project_key, views FROM project_views"))
+        analytics["hourly_visits"] = dict(conn.execute("SELECT hour, visits FROM hourly_visits ORDER BY hour"))
+        for day, page, views in conn.execute("SELECT day, page, views FROM daily_page_views ORDER BY day"):
+            analytics["daily_page_views"].setdefault(day, {})[page] = views
+        for day, key, views in conn.execute("SELECT day, project_key, views FROM daily_project_views ORDER BY day"):
+            analytics["daily_project_views"].setdefault(day, {})[key] = views
+        for row in conn.execute("SELECT * FROM visitors ORDER BY first_visit"):
+            analytics["visitors"][row["visitor_id"]] = self._visitor_dict(conn, row)
+        for row in conn.execute("SELECT * FROM sessions ORDER BY start_time"):
+            analytics["sessions"][row["session_id"]] = self._session_dict(conn, row)
+        if self.sketches:
+            analytics["sketches"] = self._load_sketches(conn)
+        return analytics
+
+    # -- Requêtes du tableau de bord -----------------------------------------
+
+    def summary(self):
+        """Compteurs principaux : visites, visiteurs uniques, pages vues"""
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        today = conn.execute("SELECT visits FROM daily_visits WHERE day = ?", (str(date.today()),)).fetchone()
+        page_views = {"portfolio": 0, "project_details": 0}
+        page_views.update(conn.execute("SELECT page, views FROM page_views"))
+        return {
+            "total_visits": counters.get("total_visits", 0),
+            "unique_visitors": counters.get("unique_visitors", 0),
+            "today_visits": today["visits"] if today else 0,
+            "page_views": page_views
+        }
+
+    def daily_visits(self, days=7):
+        """Visites des `days` derniers jours (jours sans visite à 0) : liste de (jour, visites)"""
+        today = date.today()
+        return self.visits_by_day(today - timedelta(days=days - 1), today)
+
+    def visits_by_day(self, start, end):
+        """Visites par jour de start à end inclus (dates), jours sans visite à 0"""
+        daily = dict(self._connect().execute(
+            "SELECT day, visits FROM daily_visits WHERE day BETWEEN ? AND ?", (str(start), str(end))
+        ))
+        return [(day, daily.get(day, 0)) for day in days_between(start, end)]
+
+    def visit_heatmap(self, start, end):
+        """Visites de start à end inclus par jour de semaine (lundi d'abord) et heure : 7 × 24"""
+        return weekday_hour_heatmap(self._connect().execute(
+            "SELECT hour, visits FROM hourly_visits WHERE hour BETWEEN ? AND ?", hour_bounds(start, end)
+        ))
+
+    def hourly_visits(self, hours=24):
+        """Visites des `hours` dernières heures : liste de (heure, visites)"""
+        keys = hour_keys(hours)
+        hourly = dict(self._connect().execute(
+            "SELECT hour, visits FROM hourly_visits WHERE hour BETWEEN ? AND ?", (keys[0], keys[-1])
+        ))
+        return [(hour, hourly.get(hour, 0)) for hour in keys]
+
+    def project_views(self):
+        """Nombre de vues par projet"""
+        return dict(self._connect().execute("SELECT project_key, views FROM project_views"))
+
+    def top_projects(self, limit=10, days=None):
+        """Projets les plus vus, sur tout l'historique ou sur les `days` derniers jours"""
+        conn = self._connect()
+        if days is None:
+            rows = conn.execute(
+                "SELECT project_key, views FROM project_views ORDER BY views DESC LIMIT ?", (limit,)
+            )
+        else:
+            keys = day_keys(days)
+            rows = conn.execute(
+                "SELECT project_key, SUM(views) AS views FROM daily_project_views WHERE day BETWEEN ? AND ? "
+                "GROUP BY project_key ORDER BY views DESC LIMIT ?",
+                (keys[0], keys[-1], limit)
+            )
+        return [(row["project_key"], row["views"]) for row in rows]
+
+    def sketch_uniques(self):
+        """Visiteurs uniques estimés (voir unique_estimates), None hors mode sketch"""
+        return unique_estimates(self._load_sketches(self._connect())) if self.sketches else None
+
+    def sketch_top_projects(self, limit=10):
+        """Top projets estimés : liste de (projet, vues, erreur max), None hors mode sketch"""
+        return self._load_sketches(self._connect())["top_projects"].top(limit) if self.sketches else None
+
+    def page_views_by_day(self, days=7):
+        """Pages vues par jour sur les `days` derniers jours : liste de (jour, {page: vues})"""
+        keys = day_keys(days)
+        daily = {day: {} for day in keys}
+        for row in self._connect().execute(
+            "SELECT day, page, views FROM daily_page_views WHERE day BETWEEN ? AND ?", (keys[0], keys[-1])
+        ):
+            daily[row["day"]][row["page"]] = row["views"]
+        return list(daily.items())
+
+    def _browse(self, table, id_column, sorts, sort, descending, cursor, limit):
+        """Page triée par (sort, identifiant) à partir d'un curseur (clé, identifiant) : les
+        index composites rendent chaque page O(taille de page)"""
+        if sort not in sorts:
+            raise ValueError(f"Tri inconnu : {sort}")
+        order, comparison = ("DESC", "<") if descending else ("ASC", ">")
+        # Colonne nullable : même expression que l'index (valeur par défaut littérale)
+        sort_expression = f"COALESCE({sort}, {sorts[sort]})" if sort in NULLABLE_SORTS else sort
+        where, parameters = "", []
+        if cursor is not None:
+            where = f"WHERE ({sort_expression}, {id_column}) {comparison} (?, ?)"
+            parameters = list(cursor)
+        rows = self._connect().execute(
+            f"SELECT * FROM {table} {where} ORDER BY {sort_expression} {order}, {id_column} {order} LIMIT ?",
+            parameters + [limit + 1]
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = (sorts[sort] if last[sort] is None else last[sort], last[id_column])
+        return rows, next_cursor
+
+    def browse_sessions(self, sort="start_time", descending=True, cursor=None, limit=20):
+        """Page de sessions triées (voir SESSION_SORTS) à partir d'un curseur"""
+        conn = self._connect()
+        rows, next_cursor = self._browse("sessions", "session_id", SESSION_SORTS, sort, descending, cursor, limit)
+        return [(row["session_id"], self._session_dict(conn, row, with_page_views=False)) for row in rows], next_cursor
+
+    def browse_visitors(self, sort="last_visit", descending=True, cursor=None, limit=15):
+        """Page de visiteurs triés (voir VISITOR_SORTS) à partir d'un curseur"""
+        conn = self._connect()
+        rows, next_cursor = self._browse("visitors", "visitor_id", VISITOR_SORTS, sort, descending, cursor, limit)
+        return [(row["visitor_id"], self._visitor_dict(conn, row)) for row in rows], next_cursor
+
+    def get_visitor(self, visitor_id):
+        """Données d'un visiteur par identifiant exact, None si inconnu"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM visitors WHERE visitor_id = ?", (visitor_id,)).fetchone()
+        return self._visitor_dict(conn, row) if row else None
+
+    def recent_visitors(self, limit=15):
+        """Derniers visiteurs : liste de (visitor_id, données)"""
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM visitors ORDER BY first_visit DESC LIMIT ?", (limit,)).fetchall()
+        return [(row["visitor_id"], self._visitor_dict(conn, row)) for row in reversed(rows)]
+
+    def recent_sessions(self, limit=20):
+        """Dernières sessions : liste de (session_id, données)"""
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM sessions ORDER BY start_time DESC LIMIT ?", (limit,)).fetchall()
+        return [(row["session_id"], self._session_dict(conn, row, with_page_views=False))
+                for row in reversed(rows)]
+
+    def get_session(self, session_id):
+        """Détails d'une session, cherchée dans les archives si besoin ; None si inconnue"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return find_archived(self.archive_prefix, "session", session_id)
+        return self._session_dict(conn, row)
+
+    def archived_visitor(self, visitor_id):
+        """Dernier enregistrement archivé d'un visiteur, None s'il n'a jamais été archivé"""
+        row = self._connect().execute(
+            "SELECT month FROM archived_visitors WHERE visitor_id = ?", (visitor_id,)
+        ).fetchone()
+        return find_archived(self.archive_prefix, "visitor", visitor_id, [row[0]]) if row else None
+
+    def archive_months(self):
+        """Mois disponibles dans les archives ("AAAA-MM")"""
+        return archive_months(self.archive_prefix)
+
+    def archived_records(self, month):
+        """Enregistrements (visiteurs et sessions) archivés pour un mois"""
+        return read_archive(archive_path(self.archive_prefix, month))
+
+    def export_rows(self, kind):
+        """Lignes d'une table d'export lues depuis un curseur, dans l'ordre des
+        colonnes de analytics_export.EXPORT_COLUMNS (sans la colonne archived)"""
+        queries = {
+            "visitors": "SELECT visitor_id, first_visit, last_visit, total_visits, total_seconds, session_count, "
+                        "(SELECT GROUP_CONCAT(page, ',') FROM visitor_pages p WHERE p.visitor_id = v.visitor_id) "
+                        "FROM visitors v ORDER BY visitor_id",
+            "sessions": "SELECT session_id, visitor_id, start_time, end_time, duration_seconds, total_page_views "
+                        "FROM sessions ORDER BY session_id",
+            "page_views": "SELECT p.session_id, s.visitor_id, p.position, p.page, p.project_key, p.timestamp "
+                          "FROM session_page_views p JOIN sessions s ON s.session_id = p.session_id "
+                          "ORDER BY p.session_id, p.position"
+        }
+        # Connexion dédiée : le curseur reste ouvert pendant toute l'écriture
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield from conn.execute(queries[kind])
+        finally:
+            conn.close()
+
+    def session_stats(self):
+        """Nombre de sessions, durée cumulée et pages vues cumulées (archives comprises)"""
+        conn = self._connect()
+        stats = dict(conn.execute(
+            "SELECT COUNT(*) AS total_sessions, COUNT(duration_seconds) AS timed_sessions, "
+            "COALESCE(SUM(duration_seconds), 0) AS total_seconds, "
+            "COALESCE(SUM(total_page_views), 0) AS total_page_views FROM sessions"
+        ).fetchone())
+        for name, value in conn.execute(
+            "SELECT name, value FROM counters WHERE name LIKE ?", (ARCHIVED_STATS_PREFIX + "%",)
+        ):
+            stats[name[len(ARCHIVED_STATS_PREFIX):]] += value
+        return stats
+
+    def session_distribution(self):
+        """Percentiles p50/p90/p99 et histogramme des durées des sessions non archivées.
+
+        Percentiles lus par rang dans l'index sur duration_seconds, histogramme
+        par comptages d'intervalles sur ce même index.
+        """
+        conn = self._connect()
+        timed = conn.execute("SELECT COUNT(duration_seconds) FROM sessions").fetchone()[0]
+        percentiles = {}
+        if timed:
+            for percentile in PERCENTILES:
+                percentiles[percentile] = conn.execute(
+                    "SELECT duration_seconds FROM sessions WHERE duration_seconds IS NOT NULL "
+                    "ORDER BY duration_seconds LIMIT 1 OFFSET ?", (percentile_index(timed, percentile),)
+                ).fetchone()[0]
+        bounds = [None, *HISTOGRAM_EDGES, None]
+        histogram = []
+        for label, low, high in zip(HISTOGRAM_LABELS, bounds, bounds[1:]):
+            histogram.append((label, conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE duration_seconds >= ? AND duration_seconds < ?",
+                (low if low is not None else 0, high if high is not None else 2 ** 62)
+            ).fetchone()[0]))
+        return percentiles, histogram
+
+    def visitor_total_seconds(self, visitor_id):
+        """Temps total passé par un visiteur sur toutes ses sessions (lecture par clé primaire)"""
+        row = self._connect().execute(
+            "SELECT total_seconds FROM visitors WHERE visitor_id = ?", (visitor_id,)
+        ).fetchone()
+        return row[0] if row else 0
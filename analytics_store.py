@@ -0,0 +1,1060 @@
+"""Stockage des analytics du portfolio.
+
+Chaque visite ou fin de session est ajoutée sous forme d'un petit événement
+JSON dans un journal append-only (``*.events.<génération>.jsonl``). Un thread
+de compaction replie périodiquement les segments terminés dans le snapshot
+agrégé ``portfolio_analytics.json``. Le coût d'écriture d'une visite reste
+donc constant quelle que soit la taille de l'historique.
+
+Schéma v2 (``schema_version``) : tous les horodatages sont des entiers epoch
+et les durées des secondes entières (``duration_seconds``, ``total_seconds``).
+Le formatage n'a lieu qu'à l'affichage ; les snapshots v1 (chaînes
+``"%Y-%m-%d %H:%M:%S"`` et durées ``"3m 12s"``) sont convertis au chargement
+et peuvent être réécrits sur place avec ``python analytics_cli.py migrate``.
+
+Rétention : les sessions commencées et les visiteurs inactifs depuis plus de
+``ANALYTICS_RETENTION_DAYS`` jours sont déplacés dans des archives mensuelles
+compressées (``*.archive.AAAA-MM.jsonl.gz``). Les compteurs et agrégats
+quotidiens restent dans le snapshot, qui garde ainsi une taille bornée ;
+``get_session`` et ``archived_visitor`` retrouvent l'historique archivé.
+La rétention parcourt tout le snapshot : le compacteur ne l'applique qu'une
+fois par ``ARCHIVE_INTERVAL`` secondes, pas à chaque compaction.
+
+Mode sketch (``ANALYTICS_SKETCHES=1``) : en plus des compteurs exacts, des
+sketches de taille fixe (``sketches.py``) estiment les visiteurs uniques du
+jour, des 7 derniers jours et de tout l'historique (HyperLogLog) ainsi que le
+top des projets (Space-Saving), avec leurs marges d'erreur.
+
+Le backend SQLite (``analytics_sqlite``) expose les mêmes méthodes ; il est
+sélectionné avec la variable d'environnement ``ANALYTICS_BACKEND=sqlite``.
+"""
+import atexit
+import glob
+import gzip
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from analytics_columns import SessionColumns
+from analytics_index import SESSION_SORTS, VISITOR_SORTS, BrowseIndexes
+from analytics_timeseries import VisitSeries
+from perf import count_read
+from sketches import HyperLogLog, SpaceSaving
+from storage import append_durable, atomic_write_bytes, atomic_write_json, file_lock
+
+ANALYTICS_FILE = "portfolio_analytics.json"
+ANALYTICS_DB_FILE = "portfolio_analytics.db"
+
+# Compaction : dès que le segment actif dépasse ce nombre d'événements,
+# ou au plus tard toutes les COMPACT_INTERVAL secondes
+COMPACT_MAX_EVENTS = 500
+COMPACT_INTERVAL = 60
+
+# Écriture différée : les événements sont regroupés en mémoire et écrits
+# toutes les FLUSH_INTERVAL_MS millisecondes ou dès FLUSH_MAX_EVENTS événements
+FLUSH_INTERVAL_MS = 500
+FLUSH_MAX_EVENTS = 100
+
+# Rétention : au-delà de ce nombre de jours, sessions et visiteurs inactifs
+# sont archivés (0 = tout garder dans le snapshot), au plus une fois par
+# ARCHIVE_INTERVAL secondes
+RETENTION_DAYS = int(os.getenv("ANALYTICS_RETENTION_DAYS", "90"))
+ARCHIVE_INTERVAL = 3600
+
+# Mode sketch : estimations en mémoire fixe des uniques et du top projets ;
+# SKETCH_DAYS sketches quotidiens sont conservés (uniques sur 7 jours)
+SKETCHES_ENABLED = os.getenv("ANALYTICS_SKETCHES", "0") == "1"
+SKETCH_DAYS = 7
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SCHEMA_VERSION = 2
+
+
+def empty_analytics():
+    """Retourner une structure d'analytics vide"""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "total_visits": 0,
+        "unique_visitors": 0,
+        "daily_visits": {},
+        "page_views": {
+            "portfolio": 0,
+            "project_details": 0
+        },
+        "project_views": {},
+        "visitors": {},
+        "sessions": {},
+        # Agrégats maintenus à l'ingestion pour le tableau de bord
+        "hourly_visits": {},
+        "daily_page_views": {},
+        "daily_project_views": {},
+        # Rétention : mois d'archive de chaque visiteur archivé et totaux des
+        # sessions archivées (les statistiques couvrent tout l'historique)
+        "archived_visitors": {},
+        "archived_sessions": empty_session_stats()
+    }
+
+
+def empty_session_stats():
+    """Totaux de sessions à zéro (voir session_stats)"""
+    return {"total_sessions": 0, "timed_sessions": 0, "total_seconds": 0, "total_page_views": 0}
+
+
+def add_session_stats(stats, session):
+    """Ajouter une session aux totaux stats"""
+    seconds = session.get("duration_seconds")
+    stats["total_sessions"] += 1
+    if seconds is not None:
+        stats["timed_sessions"] += 1
+        stats["total_seconds"] += seconds
+    stats["total_page_views"] += session.get("total_page_views", 0)
+    return stats
+
+
+def day_keys(days, end=None):
+    """Clés "AAAA-MM-JJ" des `days` derniers jours, jusqu'à end inclus"""
+    end = end or date.today()
+    return [str(end - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+
+def hour_keys(hours, end=None):
+    """Clés "AAAA-MM-JJ HH" des `hours` dernières heures, jusqu'à end incluse"""
+    end = (end or datetime.now()).replace(minute=0, second=0, microsecond=0)
+    return [(end - timedelta(hours=offset)).strftime("%Y-%m-%d %H") for offset in range(hours - 1, -1, -1)]
+
+
+def format_timestamp(ts):
+    """Formater un timestamp epoch pour l'affichage ("-" si absent)"""
+    if ts is None:
+        return "-"
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(timestamp_str):
+    """Convertir un horodatage v1 "%Y-%m-%d %H:%M:%S" (heure locale) en epoch"""
+    return int(datetime.strptime(timestamp_str, TIMESTAMP_FORMAT).timestamp())
+
+
+def format_duration(total_seconds):
+    """Formater une durée en secondes ("1h 2m 3s", "2m 3s" ou "3s")"""
+    if total_seconds is None:
+        return "N/A"
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+
+    if hours > 0:
+        return f"{hours}h {minutes}m {seconds}s"
+    elif minutes > 0:
+        return f"{minutes}m {seconds}s"
+    else:
+        return f"{seconds}s"
+
+
+def parse_duration(duration_str):
+    """Convertir une durée v1 ("1h 2m 3s") en secondes, None si illisible"""
+    units = {"h": 3600, "m": 60, "s": 1}
+    total_seconds = 0
+    try:
+        for part in duration_str.split():
+            total_seconds += int(part[:-1]) * units[part[-1]]
+    except (AttributeError, KeyError, ValueError, IndexError):
+        return None
+    return total_seconds
+
+
+def visit_event(visitor_id, page="portfolio", project_key=None, ts=None):
+    """Construire l'événement d'une visite de page"""
+    return {
+        "type": "visit",
+        "ts": int(ts if ts is not None else time.time()),
+        "visitor_id": visitor_id,
+        "page": page,
+        "project_key": project_key
+    }
+
+
+def session_event(session_id, session):
+    """Construire l'événement d'une session (terminée ou mise à jour)"""
+    return {"type": "session", "session_id": session_id, "session": session}
+
+
+def merge_events(events):
+    """Fusionner un lot : seule la dernière version de chaque session est gardée"""
+    last_session_index = {}
+    for index, event in enumerate(events):
+        if event.get("type") == "session":
+            last_session_index[event["session_id"]] = index
+    return [
+        event for index, event in enumerate(events)
+        if event.get("type") != "session" or last_session_index[event["session_id"]] == index
+    ]
+
+
+def _epoch(value):
+    """Horodatage v1 (chaîne) ou v2 (entier) vers epoch, None si illisible"""
+    if isinstance(value, str):
+        try:
+            return parse_timestamp(value)
+        except ValueError:
+            return None
+    return value
+
+
+def migrate_session(session):
+    """Convertir une session v1 (chaînes, "duration") au format v2"""
+    if "duration" not in session and not isinstance(session.get("start_time"), str):
+        return session
+    migrated = dict(session)
+    migrated["start_time"] = _epoch(session.get("start_time"))
+    migrated["end_time"] = _epoch(session.get("end_time"))
+    duration = parse_duration(migrated.pop("duration", None))
+    if duration is None and migrated["start_time"] is not None and migrated["end_time"] is not None:
+        duration = migrated["end_time"] - migrated["start_time"]
+    migrated["duration_seconds"] = duration
+    migrated["page_views"] = [
+        dict(view, timestamp=_epoch(view.get("timestamp"))) for view in session.get("page_views", [])
+    ]
+    return migrated
+
+
+def migrate_visitor(visitor):
+    """Convertir en place un visiteur v1 (horodatages texte) au format v2"""
+    for field in ("first_visit", "last_visit", "last_seen"):
+        if field in visitor:
+            visitor[field] = _epoch(visitor[field])
+    visitor.pop("total_time_spent", None)
+    return visitor
+
+
+def migrate_analytics(analytics):
+    """Migrer en place un dictionnaire d'analytics v1 vers le schéma v2"""
+    if analytics.get("schema_version", 1) >= SCHEMA_VERSION:
+        return analytics
+    for visitor in analytics["visitors"].values():
+        migrate_visitor(visitor)
+    analytics["sessions"] = {
+        session_id: migrate_session(session) for session_id, session in analytics["sessions"].items()
+    }
+    analytics["schema_version"] = SCHEMA_VERSION
+    return analytics
+
+
+def apply_event(analytics, event):
+    """Appliquer un événement du journal sur la structure agrégée"""
+    kind = event.get("type")
+
+    if kind == "visit":
+        ts = event["ts"]
+        bucket = datetime.fromtimestamp(ts)
+        today = bucket.strftime("%Y-%m-%d")
+        hour = bucket.strftime("%Y-%m-%d %H")
+        visitor_id = event["visitor_id"]
+        page = event["page"]
+        project_key = event.get("project_key")
+
+        visitor = analytics["visitors"].get(visitor_id)
+        if visitor is None:
+            # Un visiteur archivé qui revient a déjà été compté
+            if visitor_id not in analytics["archived_visitors"]:
+                analytics["unique_visitors"] += 1
+            visitor = analytics["visitors"][visitor_id] = {
+                "first_visit": ts,
+                "total_visits": 0,
+                "pages_visited": [],
+                "total_seconds": 0,
+                "session_count": 0,
+                "sessions": []
+            }
+
+        analytics["total_visits"] += 1
+        visitor["total_visits"] += 1
+        # Les événements de plusieurs processus peuvent arriver dans le désordre
+        visitor["first_visit"] = min(visitor["first_visit"], ts)
+        visitor["last_visit"] = max(visitor.get("last_visit", ts), ts)
+
+        analytics["daily_visits"][today] = analytics["daily_visits"].get(today, 0) + 1
+        analytics["hourly_visits"][hour] = analytics["hourly_visits"].get(hour, 0) + 1
+        analytics["page_views"][page] = analytics["page_views"].get(page, 0) + 1
+        day_pages = analytics["daily_page_views"].setdefault(today, {})
+        day_pages[page] = day_pages.get(page, 0) + 1
+
+        if project_key:
+            analytics["project_views"][project_key] = analytics["project_views"].get(project_key, 0) + 1
+            day_projects = analytics["daily_project_views"].setdefault(today, {})
+            day_projects[project_key] = day_projects.get(project_key, 0) + 1
+
+        if page not in visitor["pages_visited"]:
+            visitor["pages_visited"].append(page)
+
+        if "sketches" in analytics:
+            update_sketches(analytics["sketches"], visitor_id, today, project_key)
+
+    elif kind == "session":
+        session_id = event["session_id"]
+        session = migrate_session(event["session"])
+        previous = analytics["sessions"].get(session_id)
+        analytics["sessions"][session_id] = session
+        update_visitor_totals(analytics["visitors"].get(session["visitor_id"]), session_id, session, previous)
+
+
+def update_visitor_totals(visitor, session_id, session, previous=None):
+    """Reporter une session close sur les agrégats du visiteur (temps total,
+    nombre de sessions, dernière activité). Une session déjà comptée n'est
+    comptée qu'une fois : seule la différence de durée est appliquée."""
+    if visitor is None:
+        return
+    seconds = session.get("duration_seconds") or 0
+    if previous is None:
+        visitor["session_count"] = visitor.get("session_count", 0) + 1
+        visitor.setdefault("sessions", []).append(session_id)
+    else:
+        seconds -= previous.get("duration_seconds") or 0
+    visitor["total_seconds"] = visitor.get("total_seconds", 0) + seconds
+    end_time = session.get("end_time")
+    if end_time and end_time > (visitor.get("last_seen") or 0):
+        visitor["last_seen"] = end_time
+
+
+def backfill_visitor_totals(analytics):
+    """Calculer une fois les agrégats des visiteurs d'un snapshot antérieur"""
+    if all("total_seconds" in visitor for visitor in analytics["visitors"].values()):
+        return
+    for visitor in analytics["visitors"].values():
+        visitor.update(total_seconds=0, session_count=0, sessions=[])
+    for session_id, session in analytics["sessions"].items():
+        update_visitor_totals(analytics["visitors"].get(session.get("visitor_id")), session_id, session)
+
+
+def new_sketches():
+    """Sketches vides : uniques (tout l'historique et par jour) et top projets"""
+    return {"uniques_all": HyperLogLog(), "uniques_daily": {}, "top_projects": SpaceSaving()}
+
+
+def update_sketches(sketches, visitor_id, day, project_key=None):
+    """Reporter une visite sur les sketches (seuls SKETCH_DAYS jours sont gardés)"""
+    sketches["uniques_all"].add(visitor_id)
+    daily = sketches["uniques_daily"]
+    if day not in daily:
+        if len(daily) >= SKETCH_DAYS and day < min(daily):
+            # Visite plus ancienne que les jours conservés : seul le total compte
+            day = None
+        else:
+            daily[day] = HyperLogLog()
+            for old_day in sorted(daily)[:-SKETCH_DAYS]:
+                del daily[old_day]
+    if day is not None:
+        daily[day].add(visitor_id)
+    if project_key:
+        sketches["top_projects"].add(project_key)
+
+
+def sketches_to_json(sketches):
+    return {
+        "uniques_all": sketches["uniques_all"].to_json(),
+        "uniques_daily": {day: sketch.to_json() for day, sketch in sketches["uniques_daily"].items()},
+        "top_projects": sketches["top_projects"].to_json()
+    }
+
+
+def sketches_from_json(data):
+    return {
+        "uniques_all": HyperLogLog.from_json(data["uniques_all"]),
+        "uniques_daily": {day: HyperLogLog.from_json(sketch) for day, sketch in data["uniques_daily"].items()},
+        "top_projects": SpaceSaving.from_json(data["top_projects"])
+    }
+
+
+def snapshot_data(analytics, generation=None):
+    """Copie des analytics sérialisable en JSON (sketches encodés).
+
+    ``event_log_generation`` (generation si fournie) est toujours la dernière
+    clé : analytics_export la lit en fin de fichier."""
+    data = {key: value for key, value in analytics.items() if key != "event_log_generation"}
+    if "sketches" in data:
+        data["sketches"] = sketches_to_json(data["sketches"])
+    data["event_log_generation"] = analytics.get("event_log_generation", 0) if generation is None else generation
+    return data
+
+
+def unique_estimates(sketches):
+    """Visiteurs uniques estimés : {"today"|"week"|"all": (estimation, marge)}.
+
+    La marge vaut deux erreurs types (intervalle à ~95 %).
+    """
+    daily = sketches["uniques_daily"]
+    keys = day_keys(SKETCH_DAYS)
+    today = daily.get(keys[-1], HyperLogLog())
+    week = HyperLogLog()
+    for day in keys:
+        if day in daily:
+            week.merge(daily[day])
+
+    def estimate(sketch):
+        count = sketch.count()
+        return count, int(math.ceil(2 * sketch.relative_error * count))
+
+    return {"today": estimate(today), "week": estimate(week), "all": estimate(sketches["uniques_all"])}
+
+
+def archive_month(ts):
+    """Mois d'archive "AAAA-MM" d'un timestamp epoch"""
+    return datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+
+def archive_path(prefix, month):
+    return f"{prefix}archive.{month}.jsonl.gz"
+
+
+def archive_months(prefix):
+    """Mois disponibles dans les archives de prefix, du plus ancien au plus récent"""
+    start, end = len(prefix) + len("archive."), -len(".jsonl.gz")
+    return sorted(path[start:end] for path in glob.glob(glob.escape(prefix) + "archive.*.jsonl.gz"))
+
+
+def read_archive(path):
+    """Lire les enregistrements d'une archive mensuelle (aucun si absente)"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+
+def _archive_key(record):
+    return record["type"], record.get("session_id") or record.get("visitor_id")
+
+
+def write_archive(path, records):
+    """Fusionner des enregistrements dans une archive mensuelle (réécriture atomique).
+
+    Un enregistrement déjà présent (même type et identifiant) est remplacé :
+    rejouer un archivage interrompu ne crée donc pas de doublon.
+    """
+    with file_lock(path + ".lock"):
+        merged = {_archive_key(record): record for record in read_archive(path)}
+        merged.update((_archive_key(record), record) for record in records)
+        data = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+                       for record in merged.values())
+        atomic_write_bytes(path, gzip.compress(data.encode("utf-8")))
+
+
+def find_archived(prefix, kind, key, months=None):
+    """Chercher un enregistrement archivé, du mois le plus récent au plus ancien"""
+    id_field = "session_id" if kind == "session" else "visitor_id"
+    for month in months or reversed(archive_months(prefix)):
+        for record in read_archive(archive_path(prefix, month)):
+            if record["type"] == kind and record[id_field] == key:
+                return record[kind]
+    return None
+
+
+def write_archives(prefix, by_month):
+    for month, records in by_month.items():
+        write_archive(archive_path(prefix, month), records)
+
+
+def retention_cutoff(retention_days):
+    """Timestamp epoch avant lequel les données sont archivées, None si désactivé"""
+    if not retention_days:
+        return None
+    return int(time.time()) - retention_days * 86400
+
+
+def expire_analytics(analytics, cutoff):
+    """Retirer les sessions commencées et les visiteurs inactifs avant cutoff.
+
+    Les totaux des sessions retirées passent dans ``archived_sessions`` et les
+    visiteurs dans l'index ``archived_visitors``. Retourne les enregistrements
+    à archiver, groupés par mois.
+    """
+    by_month = {}
+    for session_id, session in list(analytics["sessions"].items()):
+        start_time = session.get("start_time")
+        if start_time is not None and start_time < cutoff:
+            del analytics["sessions"][session_id]
+            add_session_stats(analytics["archived_sessions"], session)
+            by_month.setdefault(archive_month(start_time), []).append(session_event(session_id, session))
+    for visitor_id, visitor in list(analytics["visitors"].items()):
+        last_active = max(visitor.get("last_visit") or 0, visitor.get("last_seen") or 0)
+        if last_active < cutoff:
+            del analytics["visitors"][visitor_id]
+            month = archive_month(last_active)
+            analytics["archived_visitors"][visitor_id] = month
+            by_month.setdefault(month, []).append({"type": "visitor", "visitor_id": visitor_id, "visitor": visitor})
+    return by_month
+
+
+class JsonAnalyticsStore:
+    """Snapshot JSON + journal d'événements append-only segmenté par génération.
+
+    Le snapshot mémorise dans ``event_log_generation`` la première génération
+    qu'il n'intègre pas encore : un lecteur rejoue uniquement les segments à
+    partir de celle-ci, ce qui rend la compaction sûre même si elle est
+    interrompue entre l'écriture du snapshot et la suppression des segments.
+
+    Le segment actif est toujours celui de plus haute génération présent sur
+    disque. Les ajouts se font sous ``<base>.events.lock`` et la compaction
+    ouvre la génération suivante sous ce même verrou : aucun processus ne peut
+    donc écrire dans un segment en cours de repli. Lectures cohérentes,
+    compactions et réinitialisations se sérialisent sur ``<snapshot>.lock``.
+
+    La compaction applique aussi la rétention : les archives mensuelles sont
+    écrites avant le snapshot qui ne contient plus les données archivées.
+    """
+
+    def __init__(self, snapshot_path=ANALYTICS_FILE, retention_days=RETENTION_DAYS, sketches=SKETCHES_ENABLED):
+        self.snapshot_path = snapshot_path
+        self.retention_days = retention_days
+        self.sketches = sketches
+        self.archive_prefix = os.path.splitext(snapshot_path)[0] + "."
+        self.events_prefix = self.archive_prefix + "events."
+        self.log_lock_path = self.events_prefix + "lock"
+        self.snapshot_lock_path = snapshot_path + ".lock"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._compactor = None
+        self._pending_events = 0
+        self._view_lock = threading.Lock()
+        self._view_state = None
+        with file_lock(self.log_lock_path):
+            if not self._segment_generations():
+                self._touch_segment(self._snapshot_generation())
+
+    # -- Segments du journal ------------------------------------------------
+
+    def _segment_path(self, generation):
+        return f"{self.events_prefix}{generation:06d}.jsonl"
+
+    def _segment_generations(self):
+        generations = []
+        for path in glob.glob(glob.escape(self.events_prefix) + "*.jsonl"):
+            try:
+                generations.append(int(path[len(self.events_prefix):-len(".jsonl")]))
+            except ValueError:
+                continue
+        return sorted(generations)
+
+    def _snapshot_generation(self):
+        return self.load_snapshot().get("event_log_generation", 0)
+
+    def _active_generation(self):
+        """Génération du segment actif (à appeler sous le verrou du journal)"""
+        generations = self._segment_generations()
+        if generations:
+            return generations[-1]
+        generation = self._snapshot_generation()
+        self._touch_segment(generation)
+        return generation
+
+    def _touch_segment(self, generation):
+        open(self._segment_path(generation), "a").close()
+
+    @staticmethod
+    def _read_segment(path):
+        """Lire les événements d'un segment (une ligne tronquée est ignorée)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    # -- Écriture -----------------------------------------------------------
+
+    def record_events(self, events):
+        """Ajouter un lot d'événements à la fin du segment actif en une écriture"""
+        data = "".join(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in events)
+        with file_lock(self.log_lock_path):
+            append_durable(self._segment_path(self._active_generation()), data.encode("utf-8"))
+        with self._lock:
+            self._pending_events += len(events)
+            if self._pending_events >= COMPACT_MAX_EVENTS:
+                self._wakeup.set()
+        self._ensure_compactor()
+
+    def record_visit(self, visitor_id, page="portfolio", project_key=None, ts=None):
+        """Enregistrer une visite de page"""
+        event = visit_event(visitor_id, page, project_key, ts)
+        self.record_events([event])
+        return event
+
+    def record_session(self, session_id, session):
+        """Enregistrer une session terminée"""
+        event = session_event(session_id, session)
+        self.record_events([event])
+        return event
+
+    # -- Lecture ------------------------------------------------------------
+
+    def load_snapshot(self):
+        """Charger le snapshot agrégé, sans rejouer le journal.
+
+        Un snapshot illisible lève une exception au lieu d'être remplacé par
+        des analytics vides : une compaction ne peut donc jamais l'écraser.
+        """
+        analytics = empty_analytics()
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                data = f.read()
+            count_read(len(data))
+            snapshot = json.loads(data)
+            # Un snapshot sans numéro de version date du schéma v1
+            analytics.update(snapshot, schema_version=snapshot.get("schema_version", 1))
+        except FileNotFoundError:
+            pass
+        migrate_analytics(analytics)
+        backfill_visitor_totals(analytics)
+        # Sketches absents (mode activé après coup) : estimation à partir de maintenant
+        sketches = analytics.pop("sketches", None)
+        if self.sketches:
+            analytics["sketches"] = sketches_from_json(sketches) if sketches else new_sketches()
+        return analytics
+
+    def migrate(self):
+        """Réécrire sur place un snapshot v1 au format courant"""
+        with file_lock(self.snapshot_lock_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    version = json.load(f).get("schema_version", 1)
+            except FileNotFoundError:
+                return False
+            if version >= SCHEMA_VERSION:
+                return False
+            atomic_write_json(self.snapshot_path, snapshot_data(self.load_snapshot()))
+            return True
+
+    def load(self):
+        """Charger les analytics : snapshot + événements non encore compactés"""
+        with file_lock(self.snapshot_lock_path, shared=True):
+            analytics = self.load_snapshot()
+            first_generation = analytics.get("event_log_generation", 0)
+            for generation in self._segment_generations():
+                if generation >= first_generation:
+                    for event in self._read_segment(self._segment_path(generation)):
+                        apply_event(analytics, event)
+        return analytics
+
+    @staticmethod
+    def _apply_segment_tail(analytics, path, offset, on_event=None):
+        """Appliquer les lignes complètes ajoutées à un segment depuis offset
+        (on_event(analytics, événement) est appelé après chacune)"""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return offset
+        count_read(len(data))
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            apply_event(analytics, event)
+            if on_event is not None:
+                on_event(analytics, event)
+        return offset + end
+
+    def _view(self):
+        """Vue agrégée partagée, rafraîchie en ne lisant que la fin du journal.
+
+        Le snapshot n'est relu que s'il a changé (compaction, réinitialisation) ;
+        sinon seuls les octets ajoutés aux segments depuis le dernier appel sont
+        rejoués. Les colonnes des sessions, les index de tri des tableaux et
+        les séries temporelles des visites suivent la même vue. La structure retournée est partagée : ne pas la
+        modifier.
+        """
+        with self._view_lock, file_lock(self.snapshot_lock_path, shared=True):
+            try:
+                stat = os.stat(self.snapshot_path)
+                snapshot_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                snapshot_key = None
+
+            if self._view_state is None or self._view_state["snapshot_key"] != snapshot_key:
+                analytics = self.load_snapshot()
+                previous = self._view_state
+                if previous is None:
+                    indexes = BrowseIndexes(analytics)
+                else:
+                    # Le nouveau snapshot reprend surtout ce que la vue avait déjà rejoué :
+                    # seuls les enregistrements qui diffèrent sont déplacés dans les index
+                    indexes = previous["indexes"]
+                    indexes.sync(previous["analytics"], analytics)
+                self._view_state = {
+                    "snapshot_key": snapshot_key,
+                    "analytics": analytics,
+                    "offsets": {},
+                    "columns": SessionColumns.from_sessions(analytics["sessions"]),
+                    "indexes": indexes,
+                    "series": VisitSeries(analytics)
+                }
+            state = self._view_state
+            analytics, offsets = state["analytics"], state["offsets"]
+
+            def on_event(analytics, event):
+                state["indexes"].apply(analytics, event)
+                state["series"].apply(analytics, event)
+                if event.get("type") == "session":
+                    state["columns"].upsert(event["session_id"], analytics["sessions"][event["session_id"]])
+
+            first_generation = analytics.get("event_log_generation", 0)
+            for generation in self._segment_generations():
+                if generation >= first_generation:
+                    offsets[generation] = self._apply_segment_tail(
+                        analytics, self._segment_path(generation), offsets.get(generation, 0), on_event
+                    )
+            return analytics
+
+    def _open_next_generation(self):
+        """Ouvrir un nouveau segment actif ; les précédents deviennent immuables"""
+        with file_lock(self.log_lock_path):
+            next_generation = self._active_generation() + 1
+            self._touch_segment(next_generation)
+        with self._lock:
+            self._pending_events = 0
+        return next_generation
+
+    def save(self, analytics):
+        """Remplacer toutes les analytics (ex. réinitialisation depuis l'admin)"""
+        with file_lock(self.snapshot_lock_path):
+            next_generation = self._open_next_generation()
+            atomic_write_json(self.snapshot_path, snapshot_data(analytics, next_generation))
+            self._remove_segments_before(next_generation)
+
+    # -- Requêtes du tableau de bord -----------------------------------------
+
+    def summary(self):
+        """Compteurs principaux : visites, visiteurs uniques, pages vues"""
+        analytics = self._view()
+        return {
+            "total_visits": analytics["total_visits"],
+            "unique_visitors": analytics["unique_visitors"],
+            "today_visits": analytics["daily_visits"].get(str(date.today()), 0),
+            "page_views": dict(analytics["page_views"])
+        }
+
+    def daily_visits(self, days=7):
+        """Visites des `days` derniers jours (jours sans visite à 0) : liste de (jour, visites)"""
+        today = date.today()
+        return self.visits_by_day(today - timedelta(days=days - 1), today)
+
+    def visits_by_day(self, start, end):
+        """Visites par jour de start à end inclus (dates), jours sans visite à 0"""
+        self._view()
+        with self._view_lock:
+            return self._view_state["series"].by_day(start, end)
+
+    def visit_heatmap(self, start, end):
+        """Visites de start à end inclus par jour de semaine (lundi d'abord) et heure : 7 × 24"""
+        self._view()
+        with self._view_lock:
+            return self._view_state["series"].heatmap(start, end)
+
+    def hourly_visits(self, hours=24):
+        """Visites des `hours` dernières heures : liste de (heure, visites)"""
+        hourly = self._view()["hourly_visits"]
+        return [(hour, hourly.get(hour, 0)) for hour in hour_keys(hours)]
+
+    def project_views(self):
+        """Nombre de vues par projet"""
+        return dict(self._view()["project_views"])
+
+    def top_projects(self, limit=10, days=None):
+        """Projets les plus vus, sur tout l'historique ou sur les `days` derniers jours"""
+        analytics = self._view()
+        if days is None:
+            totals = analytics["project_views"]
+        else:
+            totals = {}
+            for day in day_keys(days):
+                for project_key, views in analytics["daily_project_views"].get(day, {}).items():
+                    totals[project_key] = totals.get(project_key, 0) + views
+        return heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+
+    def sketch_uniques(self):
+        """Visiteurs uniques estimés (voir unique_estimates), None hors mode sketch"""
+        sketches = self._view().get("sketches")
+        return unique_estimates(sketches) if sketches else None
+
+    def sketch_top_projects(self, limit=10):
+        """Top projets estimés : liste de (projet, vues, erreur max), None hors mode sketch"""
+        sketches = self._view().get("sketches")
+        return sketches["top_projects"].top(limit) if sketches else None
+
+    def page_views_by_day(self, days=7):
+        """Pages vues par jour sur les `days` derniers jours : liste de (jour, {page: vues})"""
+        daily = self._view()["daily_page_views"]
+        return [(day, dict(daily.get(day, {}))) for day in day_keys(days)]
+
+    def _browse(self, kind, sort, cursor, limit, descending):
+        """Page d'un index de tri de la vue : (liste de (identifiant, données), curseur suivant)"""
+        self._view()
+        with self._view_lock:
+            state = self._view_state
+            ids, next_cursor = getattr(state["indexes"], kind)[sort].page(cursor, limit, descending)
+            records = state["analytics"][kind]
+            return [(record_id, records[record_id]) for record_id in ids], next_cursor
+
+    def browse_sessions(self, sort="start_time", descending=True, cursor=None, limit=20):
+        """Page de sessions triées (voir SESSION_SORTS) à partir d'un curseur"""
+        if sort not in SESSION_SORTS:
+            raise ValueError(f"Tri de sessions inconnu : {sort}")
+        return self._browse("sessions", sort, cursor, limit, descending)
+
+    def browse_visitors(self, sort="last_visit", descending=True, cursor=None, limit=15):
+        """Page de visiteurs triés (voir VISITOR_SORTS) à partir d'un curseur"""
+        if sort not in VISITOR_SORTS:
+            raise ValueError(f"Tri de visiteurs inconnu : {sort}")
+        return self._browse("visitors", sort, cursor, limit, descending)
+
+    def recent_visitors(self, limit=15):
+        """Derniers visiteurs (par première visite) : liste de (visitor_id, données)"""
+        return self.browse_visitors("first_visit", limit=limit)[0][::-1]
+
+    def recent_sessions(self, limit=20):
+        """Dernières sessions (par début) : liste de (session_id, données)"""
+        return self.browse_sessions("start_time", limit=limit)[0][::-1]
+
+    def get_visitor(self, visitor_id):
+        """Données d'un visiteur par identifiant exact, None si inconnu"""
+        return self._view()["visitors"].get(visitor_id)
+
+    def get_session(self, session_id):
+        """Détails d'une session, cherchée dans les archives si besoin ; None si inconnue"""
+        session = self._view()["sessions"].get(session_id)
+        if session is None:
+            session = find_archived(self.archive_prefix, "session", session_id)
+        return session
+
+    def archived_visitor(self, visitor_id):
+        """Dernier enregistrement archivé d'un visiteur, None s'il n'a jamais été archivé"""
+        month = self._view()["archived_visitors"].get(visitor_id)
+        if month is None:
+            return None
+        return find_archived(self.archive_prefix, "visitor", visitor_id, [month])
+
+    def archive_months(self):
+        """Mois disponibles dans les archives ("AAAA-MM")"""
+        return archive_months(self.archive_prefix)
+
+    def archived_records(self, month):
+        """Enregistrements (visiteurs et sessions) archivés pour un mois"""
+        return read_archive(archive_path(self.archive_prefix, month))
+
+    def session_stats(self):
+        """Nombre de sessions, durée cumulée et pages vues cumulées (archives comprises)"""
+        self._view()
+        # Sous le verrou : analytics et colonnes de la même vue, sans rejeu concurrent
+        with self._view_lock:
+            state = self._view_state
+            stats = dict(state["analytics"]["archived_sessions"])
+            for name, value in state["columns"].stats().items():
+                stats[name] += value
+        return stats
+
+    def session_distribution(self):
+        """Percentiles p50/p90/p99 et histogramme des durées des sessions non archivées"""
+        self._view()
+        with self._view_lock:
+            return self._view_state["columns"].distribution()
+
+    def visitor_total_seconds(self, visitor_id):
+        """Temps total passé par un visiteur sur toutes ses sessions (O(1))"""
+        return self._view()["visitors"].get(visitor_id, {}).get("total_seconds", 0)
+
+    # -- Compaction ---------------------------------------------------------
+
+    def _remove_segments_before(self, generation):
+        for old_generation in self._segment_generations():
+            if old_generation < generation:
+                try:
+                    os.remove(self._segment_path(old_generation))
+                except FileNotFoundError:
+                    pass
+
+    def compact(self, retention=False):
+        """Replier les segments terminés dans le snapshot ; avec retention, archiver aussi les expirés"""
+        with file_lock(self.snapshot_lock_path):
+            with file_lock(self.log_lock_path):
+                active_generation = self._active_generation()
+                has_new_events = os.path.getsize(self._segment_path(active_generation)) > 0
+            if has_new_events:
+                active_generation = self._open_next_generation()
+            elif not retention and not any(g < active_generation for g in self._segment_generations()):
+                # Rien à replier : pas de lecture du snapshot (site inactif)
+                return False
+
+            analytics = self.load_snapshot()
+            first_generation = analytics.get("event_log_generation", 0)
+            generations = [g for g in self._segment_generations() if first_generation <= g < active_generation]
+            for generation in generations:
+                for event in self._read_segment(self._segment_path(generation)):
+                    apply_event(analytics, event)
+
+            archived = False
+            cutoff = retention_cutoff(self.retention_days) if retention else None
+            if cutoff is not None:
+                by_month = expire_analytics(analytics, cutoff)
+                write_archives(self.archive_prefix, by_month)
+                archived = bool(by_month)
+            if not generations and not archived:
+                # Segments déjà repliés (arrêt entre l'écriture du snapshot et leur suppression)
+                self._remove_segments_before(first_generation)
+                return False
+
+            analytics["event_log_generation"] = active_generation
+            atomic_write_json(self.snapshot_path, snapshot_data(analytics))
+            self._remove_segments_before(active_generation)
+            return True
+
+    def archive_expired(self):
+        """Appliquer la rétention immédiatement (via une compaction)"""
+        return self.compact(retention=True)
+
+    def _ensure_compactor(self):
+        if self._compactor is None:
+            with self._lock:
+                if self._compactor is None:
+                    self._compactor = threading.Thread(
+                        target=self._compaction_loop, name="analytics-compactor", daemon=True
+                    )
+                    self._compactor.start()
+
+    def _compaction_loop(self):
+        next_archive = 0
+        while True:
+            self._wakeup.wait(COMPACT_INTERVAL)
+            self._wakeup.clear()
+            try:
+                # Rétention au plus une fois par ARCHIVE_INTERVAL : elle parcourt tout le snapshot
+                retention = time.monotonic() >= next_archive
+                self.compact(retention)
+                if retention:
+                    next_archive = time.monotonic() + ARCHIVE_INTERVAL
+            except (OSError, ValueError):
+                # Nouvel essai au prochain cycle, le journal reste intact
+                continue
+
+
+class WriteBehindBuffer:
+    """File d'écriture différée partagée par toutes les sessions du processus.
+
+    Chaque session Streamlit tourne dans son propre thread : ``record_visit``
+    et ``record_session`` se contentent d'ajouter l'événement en mémoire sous
+    verrou, et un thread de fond écrit les lots dans le store. Le rendu d'une
+    page ne fait donc plus aucune entrée/sortie disque pour les analytics.
+    """
+
+    def __init__(self, store, flush_interval_ms=FLUSH_INTERVAL_MS, max_events=FLUSH_MAX_EVENTS):
+        self.store = store
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+    def add(self, event):
+        """Mettre un événement en file (aucune entrée/sortie)"""
+        with self._condition:
+            self._pending.append(event)
+            if len(self._pending) >= self.max_events:
+                self._condition.notify()
+        self._ensure_worker()
+        return event
+
+    def record_visit(self, visitor_id, page="portfolio", project_key=None, ts=None):
+        """Mettre en file une visite de page"""
+        return self.add(visit_event(visitor_id, page, project_key, ts))
+
+    def record_session(self, session_id, session):
+        """Mettre en file une session (la dernière version d'un lot l'emporte)"""
+        return self.add(session_event(session_id, session))
+
+    def flush(self):
+        """Écrire immédiatement les événements en attente"""
+        with self._flush_lock:
+            with self._condition:
+                events, self._pending = self._pending, []
+            if not events:
+                return 0
+            try:
+                self.store.record_events(merge_events(events))
+            except Exception:
+                # Remettre le lot en tête de file pour le prochain essai
+                with self._condition:
+                    self._pending[:0] = events
+                raise
+            return len(events)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._condition:
+                if self._worker is None and not self._closed:
+                    self._worker = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.max_events,
+                    timeout=self.flush_interval
+                )
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Le lot est conservé en mémoire, nouvel essai au prochain cycle
+                continue
+
+    def close(self):
+        """Arrêter le thread d'écriture et vider la file (appelé à l'arrêt)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+
+_store = None
+_writer = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Retourner le store d'analytics partagé par toutes les sessions du processus"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.getenv("ANALYTICS_BACKEND", "json") == "sqlite":
+                    from analytics_sqlite import SqliteAnalyticsStore
+                    _store = SqliteAnalyticsStore(os.getenv("ANALYTICS_DB_FILE", ANALYTICS_DB_FILE))
+                else:
+                    _store = JsonAnalyticsStore(ANALYTICS_FILE)
+    return _store
+
+
+def get_writer():
+    """Retourner la file d'écriture différée du processus (vidée à l'arrêt)"""
+    global _writer
+    if _writer is None:
+        store = get_store()
+        with _store_lock:
+            if _writer is None:
+                _writer = WriteBehindBuffer(store)
+                atexit.register(_writer.close)
+    return _writer
@@ -0,0 +1,87 @@
+"""Séries temporelles des visites, par jour et par heure.
+
+Chaque série garde ses clés ("AAAA-MM-JJ" ou "AAAA-MM-JJ HH", qui se trient
+comme les dates) dans une liste triée par ``bisect`` : une plage de dates se
+lit en O(log n + taille de la plage), quelle que soit la longueur de
+l'historique. Les séries retournées au tableau de bord sont complétées par
+des zéros pour les jours ou heures sans visite.
+"""
+import bisect
+from datetime import datetime, timedelta
+
+WEEKDAY_LABELS = ("Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim")
+
+
+def days_between(start, end):
+    """Clés "AAAA-MM-JJ" de start à end inclus (dates)"""
+    return [str(start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+
+
+def hour_bounds(start, end):
+    """Première et dernière clés horaires des jours start à end inclus"""
+    return f"{start} 00", f"{end} 23"
+
+
+def day_key(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+def hour_key(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H")
+
+
+def weekday_hour_heatmap(hourly):
+    """Visites par jour de semaine et heure : 7 lignes (lundi d'abord) de 24 comptes,
+    à partir de couples ("AAAA-MM-JJ HH", visites)"""
+    grid = [[0] * 24 for _ in WEEKDAY_LABELS]
+    for hour, visits in hourly:
+        moment = datetime.strptime(hour, "%Y-%m-%d %H")
+        grid[moment.weekday()][moment.hour] += visits
+    return grid
+
+
+class TimeSeries:
+    """Comptes par clé temporelle, clés maintenues triées"""
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.keys = sorted(self.counts)
+
+    def add(self, key, count=1):
+        if key not in self.counts:
+            self.counts[key] = 0
+            # Cas courant : la clé la plus récente s'ajoute en fin de liste
+            if not self.keys or key > self.keys[-1]:
+                self.keys.append(key)
+            else:
+                bisect.insort(self.keys, key)
+        self.counts[key] += count
+
+    def range(self, start, end):
+        """Couples (clé, compte) des clés présentes entre start et end inclus"""
+        low = bisect.bisect_left(self.keys, start)
+        high = bisect.bisect_right(self.keys, end)
+        return [(key, self.counts[key]) for key in self.keys[low:high]]
+
+
+class VisitSeries:
+    """Séries quotidienne et horaire des visites d'un dictionnaire d'analytics"""
+
+    def __init__(self, analytics):
+        self.days = TimeSeries(analytics["daily_visits"])
+        self.hours = TimeSeries(analytics["hourly_visits"])
+
+    def apply(self, analytics, event):
+        """Reporter un événement de visite sur les séries"""
+        if event.get("type") == "visit":
+            self.days.add(day_key(event["ts"]))
+            self.hours.add(hour_key(event["ts"]))
+
+    def by_day(self, start, end):
+        """Visites par jour de start à end inclus, jours sans visite à 0"""
+        counts = dict(self.days.range(str(start), str(end)))
+        return [(day, counts.get(day, 0)) for day in days_between(start, end)]
+
+    def heatmap(self, start, end):
+        """Grille jour de semaine × heure des visites de start à end inclus"""
+        return weekday_hour_heatmap(self.hours.range(*hour_bounds(start, end)))
@@ -0,0 +1,312 @@
+"""Micro-benchmarks des chemins chauds du portfolio.
+
+Les jeux de données synthétiques (voir ``synthetic_data``) sont générés une
+fois dans ``--dir`` puis réutilisés : analytics de 1k, 100k ou 1M visiteurs et
+sessions (JSON, et base SQLite importée pour ``--backends sqlite``),
+configurations de 3, 100 ou 1000 projets avec images intégrées.
+
+``portfolio.py`` lance l'application Streamlit à l'import : les benchmarks
+mesurent donc les appels que font ses fonctions (``track_visit`` = battement
+de cœur de session + mise en file de la visite, ``load_analytics`` =
+``store.load()``, ``load_config`` = lecture et parsing complets,
+``load_config_cached`` = appel servi par le cache de ``config_store``, etc.).
+
+Chaque benchmark est répété jusqu'à ``--min-time`` secondes (au moins
+``--min-rounds`` tours) ; les résultats (médiane, p95, min... en ms par appel)
+sont écrits en JSON. Avec ``--baseline``, les médianes sont comparées à un
+résultat précédent et le code de sortie vaut 1 si l'une régresse de plus de
+``--threshold``.
+
+    python benchmark.py generate --size 100k --projects 100
+    python benchmark.py run --sizes 1k,100k --projects 3,100 --output bench.json
+    python benchmark.py run --sizes 1k --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from analytics_sessions import SessionTracker
+from analytics_store import JsonAnalyticsStore, WriteBehindBuffer, format_duration
+from config_store import ConfigCache
+from analytics_sqlite import SqliteAnalyticsStore
+from synthetic_data import PROJECT_COUNTS, SIZES, generate_analytics, generate_config
+
+BENCH_DIR = "bench_data"
+BATCH = 1000
+# Durée minimale d'un tour de mesure (ms)
+ROUND_MS = 5
+
+
+def analytics_path(directory, size):
+    return os.path.join(directory, f"analytics_{size}.json")
+
+
+def config_path(directory, projects):
+    return os.path.join(directory, f"config_{projects}.json")
+
+
+def ensure_analytics(directory, size, backend):
+    """Chemin du jeu d'analytics de cette taille pour ce backend (généré si absent)"""
+    os.makedirs(directory, exist_ok=True)
+    path = analytics_path(directory, size)
+    if not os.path.exists(path):
+        print(f"… génération de {path}", file=sys.stderr)
+        generate_analytics(path, SIZES[size])
+    if backend == "json":
+        return path
+    db_path = os.path.splitext(path)[0] + ".db"
+    if not os.path.exists(db_path):
+        print(f"… import de {path} dans {db_path}", file=sys.stderr)
+        SqliteAnalyticsStore(db_path, retention_days=0).save(JsonAnalyticsStore(path, retention_days=0).load())
+    return db_path
+
+
+def ensure_config(directory, projects):
+    os.makedirs(directory, exist_ok=True)
+    path = config_path(directory, projects)
+    if not os.path.exists(path):
+        print(f"… génération de {path}", file=sys.stderr)
+        generate_config(path, projects)
+    return path
+
+
+def open_store(backend, path):
+    # Pas de rétention : les jeux de données ne doivent pas être archivés pendant la mesure
+    if backend == "sqlite":
+        return SqliteAnalyticsStore(path, retention_days=0)
+    return JsonAnalyticsStore(path, retention_days=0)
+
+
+def measure(fn, min_time=1.0, min_rounds=3, batch=1):
+    """Répéter fn jusqu'à min_time secondes et min_rounds tours ; ms par appel
+    (fn exécute batch appels par tour)"""
+    # Premier appel hors mesure (caches, vue agrégée) ; il sert aussi à
+    # regrouper les appels très rapides en tours d'au moins ROUND_MS
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    calls = max(1, int(ROUND_MS / 1000 / first)) if first > 0 else 1
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_rounds or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append((time.perf_counter() - start) * 1000 / (batch * calls))
+        # Un tour plus long que min_time suffit à lui seul : ne pas multiplier les minutes
+        if timings[0] * batch * calls > min_time * 1000:
+            break
+    timings.sort()
+    return {
+        "rounds": len(timings),
+        "calls_per_round": calls * batch,
+        "min_ms": timings[0],
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(0.95 * len(timings)))],
+        "max_ms": timings[-1],
+        "stdev_ms": statistics.stdev(timings) if len(timings) > 1 else 0.0
+    }
+
+
+def analytics_benchmarks(store_factory, store, visitor_ids):
+    """Benchmarks (nom, fonction, batch) sur un jeu d'analytics"""
+    today = date.today()
+    month_ago = today - timedelta(days=29)
+    sample = [random.choice(visitor_ids) for _ in range(BATCH)]
+
+    def total_time_for_visitors():
+        for visitor_id in sample:
+            format_duration(store.visitor_total_seconds(visitor_id))
+
+    return [
+        ("load_analytics", lambda: store_factory().load(), 1),
+        ("dashboard_cold_view", lambda: store_factory().summary(), 1),
+        ("calculate_total_time_for_visitor", total_time_for_visitors, BATCH),
+        ("summary", store.summary, 1),
+        ("daily_visits_7d", lambda: store.daily_visits(7), 1),
+        ("hourly_visits_24h", lambda: store.hourly_visits(24), 1),
+        ("visits_by_day_30d", lambda: store.visits_by_day(month_ago, today), 1),
+        ("visit_heatmap_30d", lambda: store.visit_heatmap(month_ago, today), 1),
+        ("top_projects", lambda: store.top_projects(10), 1),
+        ("top_projects_7d", lambda: store.top_projects(10, days=7), 1),
+        ("page_views_by_day_7d", lambda: store.page_views_by_day(7), 1),
+        ("session_stats", store.session_stats, 1),
+        ("session_distribution", store.session_distribution, 1),
+        ("browse_sessions", lambda: store.browse_sessions(), 1),
+        ("browse_visitors", lambda: store.browse_visitors(), 1)
+    ]
+
+
+def bench_track_visit(backend, min_time, min_rounds):
+    """track_visit sur un store vierge : battement de cœur + mise en file (thread d'écriture réel)"""
+    directory = tempfile.mkdtemp(prefix="bench_track_")
+    try:
+        path = os.path.join(directory, "analytics.db" if backend == "sqlite" else "analytics.json")
+        writer = WriteBehindBuffer(open_store(backend, path))
+        tracker = SessionTracker(writer)
+        counter = iter(range(sys.maxsize))
+
+        def track_visits():
+            for _ in range(BATCH):
+                visitor_id = f"{next(counter) % 500:08x}"
+                tracker.heartbeat(visitor_id, "portfolio")
+                writer.record_visit(visitor_id, "portfolio")
+
+        result = measure(track_visits, min_time, min_rounds, BATCH)
+        tracker.close_all()
+        writer.close()
+        return result
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_load_config(path):
+    """Lecture et parsing complets, comme portfolio.load_config quand le fichier a changé"""
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = []
+
+    def record(name, backend, size, result):
+        entry = dict(benchmark=name, backend=backend, size=size, **result)
+        results.append(entry)
+        print(f"{name:<34} {backend or '-':<7} {size or '-':<6} "
+              f"médiane {entry['median_ms']:10.4f} ms  p95 {entry['p95_ms']:10.4f} ms  ({entry['rounds']} tours)",
+              file=sys.stderr)
+
+    for backend in args.backends:
+        for size in args.sizes:
+            path = ensure_analytics(args.dir, size, backend)
+            store = open_store(backend, path)
+            visitor_ids = [visitor_id for visitor_id, _ in store.browse_visitors(limit=BATCH)[0]]
+            for name, fn, batch in analytics_benchmarks(lambda: open_store(backend, path), store, visitor_ids):
+                record(name, backend, size, measure(fn, args.min_time, args.min_rounds, batch))
+        record("track_visit", backend, None, bench_track_visit(backend, args.min_time, args.min_rounds))
+
+    for projects in args.projects:
+        path = ensure_config(args.dir, projects)
+        record("load_config", None, f"{projects}p",
+               measure(lambda: bench_load_config(path), args.min_time, args.min_rounds))
+        cache = ConfigCache(path)
+        record("load_config_cached", None, f"{projects}p",
+               measure(cache.get, args.min_time, args.min_rounds))
+
+    output = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time
+        },
+        "results": results
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        return compare(args.baseline, results, args.threshold)
+    return 0
+
+
+def compare(baseline_path, results, threshold):
+    """Comparer les médianes à un résultat précédent ; 1 si une régression dépasse threshold"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(entry["benchmark"], entry["backend"], entry["size"]): entry
+                    for entry in json.load(f)["results"]}
+    regressions = 0
+    for entry in results:
+        previous = baseline.get((entry["benchmark"], entry["backend"], entry["size"]))
+        if previous is None or not previous["median_ms"]:
+            continue
+        ratio = entry["median_ms"] / previous["median_ms"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  ⚠️ régression"
+        print(f"{entry['benchmark']:<34} {entry['backend'] or '-':<7} {entry['size'] or '-':<6} "
+              f"x{ratio:6.2f}{flag}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def generate(args):
+    if args.size:
+        path = ensure_analytics(args.dir, args.size, "json")
+        print(f"✅ {path}")
+    if args.projects is not None:
+        path = ensure_config(args.dir, args.projects)
+        print(f"✅ {path}")
+    return 0
+
+
+def _choices(allowed):
+    """Type argparse : liste séparée par des virgules, valeurs dans allowed"""
+    def parse(value):
+        items = [item.strip() for item in value.split(",") if item.strip()]
+        invalid = [item for item in items if item not in allowed]
+        if invalid:
+            raise argparse.ArgumentTypeError(f"valeurs invalides : {', '.join(invalid)} "
+                                             f"(possibles : {', '.join(allowed)})")
+        return items
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du portfolio")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="Générer des jeux de données synthétiques")
+    generate_parser.add_argument("--size", choices=list(SIZES), help="Visiteurs et sessions")
+    generate_parser.add_argument("--projects", type=int, help="Projets de la configuration")
+    generate_parser.add_argument("--dir", default=BENCH_DIR, help="Dossier des jeux de données")
+    generate_parser.set_defaults(func=generate)
+
+    run_parser = commands.add_parser("run", help="Lancer les benchmarks")
+    run_parser.add_argument("--sizes", type=_choices(list(SIZES)), default=["1k", "100k"],
+                            help="Tailles d'analytics (1k,100k,1m)")
+    run_parser.add_argument("--projects", type=_choices([str(count) for count in PROJECT_COUNTS]),
+                            default=["3", "100"], help="Nombres de projets (3,100,1000)")
+    run_parser.add_argument("--backends", type=_choices(["json", "sqlite"]), default=["json"],
+                            help="Stores mesurés (json,sqlite)")
+    run_parser.add_argument("--dir", default=BENCH_DIR, help="Dossier des jeux de données")
+    run_parser.add_argument("--min-time", type=float, default=1.0, help="Durée minimale par benchmark (s)")
+    run_parser.add_argument("--min-rounds", type=int, default=3, help="Nombre minimal de tours")
+    run_parser.add_argument("--output", help="Fichier de résultats JSON (sortie standard sinon)")
+    run_parser.add_argument("--baseline", help="Résultats précédents à comparer")
+    run_parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Régression tolérée sur la médiane (0.2 = +20 %%)")
+    run_parser.set_defaults(func=run)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        args.projects = [int(count) for count in args.projects]
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
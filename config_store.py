@@ -0,0 +1,130 @@
+"""Cache de la configuration du portfolio, partagé par toutes les sessions.
+
+``portfolio_config.json`` peut peser plusieurs Mo (images intégrées en
+base64) : il n'est relu et re-parsé que si le fichier a changé. Chaque
+``get`` coûte un seul ``os.stat`` ; la clé (inode, mtime, taille) est celle du
+snapshot d'analytics. Si la clé change mais pas le contenu (fichier touché,
+réécrit à l'identique), l'empreinte BLAKE2 des octets évite le re-parsing.
+
+La configuration renvoyée par ``get`` est partagée entre sessions et ne doit
+pas être modifiée. Pour éditer (panel d'administration), ``editable`` renvoie
+une copie profonde : copie à l'écriture. Les chaînes, dont les images, ne sont
+pas dupliquées. ``save`` écrit atomiquement sous verrou et remplace l'entrée
+du cache par la version sauvegardée, sans relecture.
+
+``fragment`` garde le HTML rendu à partir de la configuration (en-tête,
+statistiques, sections) : il est attaché à la version en cache et disparaît
+avec elle, à la sauvegarde comme au changement du fichier. Tant que la
+configuration ne change pas, les reruns de tous les visiteurs réutilisent les
+mêmes chaînes.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from perf import count_read
+from storage import atomic_write_json, file_lock
+
+CONFIG_FILE = "portfolio_config.json"
+
+
+def file_key(path):
+    """Clé de validité de path : (inode, mtime en ns, taille), None si absent"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ConfigCache:
+    """Configuration parsée une fois par version du fichier"""
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+        # (clé du fichier, empreinte du contenu, configuration ou None si absente/illisible,
+        #  fragments rendus de cette version de la configuration)
+        self._state = (None, None, None, {})
+        self._loaded = False
+
+    def _reload(self, key):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return key, None, None, {}
+        count_read(len(data))
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        _, cached_digest, cached_config, fragments = self._state
+        if digest == cached_digest:
+            return key, digest, cached_config, fragments
+        try:
+            config = json.loads(data)
+        except ValueError:
+            config = None
+        return key, digest, config, {}
+
+    def get(self, default=None):
+        """Configuration courante (partagée, en lecture seule) ; default si absente ou illisible"""
+        key = file_key(self.path)
+        state = self._state
+        if not self._loaded or state[0] != key:
+            with self._lock:
+                state = self._state
+                if not self._loaded or state[0] != key:
+                    state = self._state = self._reload(key)
+                    self._loaded = True
+        config = state[2]
+        return default if config is None else config
+
+    def editable(self, default=None):
+        """Copie modifiable de la configuration courante"""
+        return copy.deepcopy(self.get(default))
+
+    def save(self, config):
+        """Écrire config atomiquement et en faire la version en cache"""
+        snapshot = copy.deepcopy(config)
+        with file_lock(self.lock_path):
+            atomic_write_json(self.path, snapshot)
+            key = file_key(self.path)
+        with self._lock:
+            # Empreinte inconnue : un fichier touché sans changement sera re-parsé une fois
+            self._state = (key, None, snapshot, {})
+            self._loaded = True
+
+    def fragment(self, config, name, build):
+        """Fragment name de config, construit par build(config) une fois par version de la configuration
+
+        Seule la configuration en cache (celle renvoyée par get) en profite ;
+        toute autre (copie en cours d'édition, configuration par défaut) est
+        rendue à chaque appel."""
+        _, _, cached_config, fragments = self._state
+        if config is not cached_config:
+            return build(config)
+        value = fragments.get(name)
+        if value is None:
+            value = fragments[name] = build(config)
+        return value
+
+    def invalidate(self):
+        """Forcer la relecture au prochain get"""
+        with self._lock:
+            self._loaded = False
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_config_cache(path=CONFIG_FILE):
+    """Retourner le cache de configuration de path, partagé par le processus"""
+    key = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ConfigCache(path)
+        return cache
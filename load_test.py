@@ -0,0 +1,273 @@
+"""Test de charge de bout en bout avec ``streamlit.testing.v1.AppTest``.
+
+Chaque visiteur simulé est une session AppTest de ``portfolio.py`` : il
+charge la page principale, ouvre quelques projets via « Voir Mon Travail »,
+fait défiler le carrousel puis revient au portfolio et part. AppTest repose
+sur un état global du processus (``Runtime._instance``, options de
+configuration) : chaque processus ne fait donc tourner qu'une AppTest à la
+fois. Les visiteurs sont répartis sur un pool de ``--processes`` processus
+partageant les mêmes fichiers, comme autant d'instances derrière un load
+balancer ; ``--processes`` est le nombre de visiteurs simultanés.
+
+Le rapport donne :
+- le débit (visiteurs et reruns par seconde) ;
+- la distribution des latences par rerun (chaque clic = un ``run()``) ;
+- les mises à jour d'analytics perdues : visites, visiteurs et sessions
+  attendus d'après les navigations effectuées, comparés au store relu après
+  vidage des files d'écriture ;
+- la croissance des fichiers d'analytics (octets par visite).
+
+Tout se passe dans un dossier de travail jetable (configuration copiée ou
+générée) ; ``ANALYTICS_BACKEND`` choisit le store comme pour l'application.
+
+    python load_test.py --visitors 50 --processes 4 --output load.json
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from analytics_columns import percentile_index
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(REPO_DIR, "portfolio.py")
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class Visitor:
+    """Parcours d'un visiteur simulé ; compte ses navigations et chronomètre chaque rerun"""
+
+    def __init__(self, rng, max_projects, max_carousel_clicks, think_time, timeout):
+        self.rng = rng
+        self.max_projects = max_projects
+        self.max_carousel_clicks = max_carousel_clicks
+        self.think_time = think_time
+        self.timeout = timeout
+        self.latencies = []
+        self.page_visits = {"portfolio": 0, "project_details": 0}
+        self.errors = 0
+
+    def _run(self, app):
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+        start = time.perf_counter()
+        app.run(timeout=self.timeout)
+        self.latencies.append(time.perf_counter() - start)
+        self.errors += len(app.exception)
+
+    @staticmethod
+    def _button(app, key=None, label=None):
+        for button in app.button:
+            if (key is None or button.key == key) and (label is None or button.label == label):
+                return button
+        return None
+
+    def browse(self):
+        from streamlit.testing.v1 import AppTest
+
+        app = AppTest.from_file(APP_FILE, default_timeout=self.timeout)
+        self._run(app)
+        self.page_visits["portfolio"] += 1
+
+        project_keys = [button.key for button in app.button if button.key and button.key.startswith("see_work_")]
+        opened = self.rng.sample(project_keys, min(len(project_keys), self.rng.randint(1, self.max_projects)))
+        for button_key in opened:
+            project_key = button_key[len("see_work_"):].rsplit("_", 1)[0]
+            self._button(app, key=button_key).click()
+            self._run(app)
+            self.page_visits["project_details"] += 1
+
+            # Défilement du carrousel : reruns sans nouvelle visite
+            for _ in range(self.rng.randint(0, self.max_carousel_clicks)):
+                button = self._button(app, key=self.rng.choice([f"next_{project_key}", f"prev_{project_key}"]))
+                if button is None:
+                    break
+                button.click()
+                self._run(app)
+
+            back = self._button(app, label="← Retour au portfolio")
+            if back is None:
+                break
+            back.click()
+            self._run(app)
+            self.page_visits["portfolio"] += 1
+        return self
+
+
+def run_visitor(seed, options):
+    """Parcours complet d'un visiteur dans le processus courant ; résultats du visiteur"""
+    visitor = Visitor(random.Random(seed), options["max_projects"], options["max_carousel_clicks"],
+                      options["think_time"], options["timeout"])
+    failures = []
+    try:
+        visitor.browse()
+    except Exception as exc:
+        failures.append(repr(exc))
+
+    # Clôturer la session du visiteur et vider la file d'écriture, comme à l'arrêt
+    from analytics_sessions import get_tracker
+    from analytics_store import get_writer
+    get_tracker().close_all()
+    get_writer().flush()
+    return {
+        "visitors": 1,
+        "latencies": visitor.latencies,
+        "page_visits": visitor.page_visits,
+        "errors": visitor.errors,
+        "failures": failures
+    }
+
+
+def _init_worker(workdir):
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+
+def analytics_files():
+    """Fichiers d'analytics du dossier courant et leur taille"""
+    files = {}
+    for pattern in ("portfolio_analytics.*",):
+        for path in glob.glob(pattern):
+            if not path.endswith(".lock"):
+                files[path] = os.path.getsize(path)
+    return files
+
+
+def reload_store():
+    """Nouvelle instance du store relue depuis le disque : tout ce que les instances ont écrit"""
+    from analytics_store import ANALYTICS_DB_FILE, ANALYTICS_FILE, JsonAnalyticsStore
+    if os.getenv("ANALYTICS_BACKEND", "json") == "sqlite":
+        from analytics_sqlite import SqliteAnalyticsStore
+        return SqliteAnalyticsStore(os.getenv("ANALYTICS_DB_FILE", ANALYTICS_DB_FILE))
+    return JsonAnalyticsStore(ANALYTICS_FILE)
+
+
+def prepare_workdir(workdir, config, projects):
+    os.makedirs(workdir, exist_ok=True)
+    target = os.path.join(workdir, "portfolio_config.json")
+    if projects:
+        from synthetic_data import generate_config
+        generate_config(target, projects)
+    elif config and os.path.exists(config):
+        shutil.copyfile(config, target)
+
+
+def summarize(results, elapsed, before, after, recorded):
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    visitors = sum(result["visitors"] for result in results)
+    page_visits = {page: sum(result["page_visits"][page] for result in results)
+                   for page in ("portfolio", "project_details")}
+    expected_visits = sum(page_visits.values())
+    growth = sum(after.values()) - sum(before.values())
+    return {
+        "visitors": visitors,
+        "reruns": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput": {"visitors_per_s": visitors / elapsed, "reruns_per_s": len(latencies) / elapsed},
+        "latency_ms": dict(
+            {f"p{p}": latencies[percentile_index(len(latencies), p)] * 1000 for p in LATENCY_PERCENTILES}
+            if latencies else {},
+            mean=sum(latencies) / len(latencies) * 1000 if latencies else None,
+            max=latencies[-1] * 1000 if latencies else None
+        ),
+        "analytics": {
+            "expected_visits": expected_visits,
+            "recorded_visits": recorded["total_visits"],
+            "lost_visits": expected_visits - recorded["total_visits"],
+            "expected_page_views": page_visits,
+            "recorded_page_views": recorded["page_views"],
+            "expected_visitors": visitors,
+            "recorded_visitors": recorded["unique_visitors"],
+            "expected_sessions": visitors,
+            "recorded_sessions": recorded["total_sessions"]
+        },
+        "files": {
+            "before": before,
+            "after": after,
+            "growth_bytes": growth,
+            "bytes_per_visit": growth / expected_visits if expected_visits else None
+        },
+        "errors": sum(result["errors"] for result in results),
+        "failures": [failure for result in results for failure in result["failures"]]
+    }
+
+
+def format_summary(summary):
+    analytics = summary["analytics"]
+    latency = summary["latency_ms"]
+    lines = [
+        f"Visiteurs : {summary['visitors']} — reruns : {summary['reruns']} en {summary['elapsed_s']:.1f} s",
+        f"Débit : {summary['throughput']['visitors_per_s']:.2f} visiteurs/s, "
+        f"{summary['throughput']['reruns_per_s']:.2f} reruns/s",
+        "Latence par rerun : " + ", ".join(f"{name} {value:.0f} ms" for name, value in latency.items()
+                                          if value is not None),
+        f"Visites : {analytics['recorded_visits']} / {analytics['expected_visits']} attendues "
+        f"({analytics['lost_visits']} perdues)",
+        f"Visiteurs : {analytics['recorded_visitors']} / {analytics['expected_visitors']} — "
+        f"sessions : {analytics['recorded_sessions']} / {analytics['expected_sessions']}",
+        f"Fichiers : +{summary['files']['growth_bytes']} octets"
+        + (f" ({summary['files']['bytes_per_visit']:.0f} octets/visite)"
+           if summary["files"]["bytes_per_visit"] is not None else ""),
+        f"Exceptions dans l'application : {summary['errors']} — échecs du harnais : {len(summary['failures'])}"
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du portfolio via AppTest")
+    parser.add_argument("--visitors", type=int, default=20, help="Nombre de visiteurs simulés")
+    parser.add_argument("--processes", type=int, default=4,
+                        help="Processus du pool : visiteurs simultanés, une AppTest à la fois par processus")
+    parser.add_argument("--max-projects", type=int, default=3, help="Projets ouverts au plus par visiteur")
+    parser.add_argument("--max-carousel-clicks", type=int, default=4, help="Clics de carrousel au plus par projet")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause moyenne entre deux clics (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Délai maximal d'un rerun (s)")
+    parser.add_argument("--workdir", help="Dossier de travail (jetable par défaut)")
+    parser.add_argument("--config", default=os.path.join(REPO_DIR, "portfolio_config.json"),
+                        help="Configuration copiée dans le dossier de travail")
+    parser.add_argument("--projects", type=int, help="Générer une configuration synthétique de N projets")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des parcours")
+    parser.add_argument("--output", help="Rapport JSON")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="portfolio_load_")
+    prepare_workdir(workdir, args.config, args.projects)
+    os.chdir(workdir)
+    options = {key: getattr(args, key) for key in ("max_projects", "max_carousel_clicks", "think_time", "timeout")}
+
+    before = analytics_files()
+    seeds = range(args.seed, args.seed + args.visitors)
+    started = time.perf_counter()
+    # AppTest remplace sys.modules["__main__"] par le script : les tâches sont donc
+    # transmises par référence au module load_test, pas à __main__
+    import load_test
+    with ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=load_test._init_worker, initargs=(workdir,)) as pool:
+        results = list(pool.map(load_test.run_visitor, seeds, repeat(options)))
+    elapsed = time.perf_counter() - started
+
+    store = reload_store()
+    summary = store.summary()
+    recorded = dict(summary, total_sessions=store.session_stats()["total_sessions"])
+    report = summarize(results, elapsed, before, analytics_files(), recorded)
+    report["workdir"] = workdir
+
+    print(format_summary(report))
+    if args.output:
+        with open(os.path.join(REPO_DIR, args.output) if not os.path.isabs(args.output) else args.output,
+                  "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["analytics"]["lost_visits"] or report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
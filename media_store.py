@@ -0,0 +1,441 @@
+"""Stockage des médias du portfolio adressé par contenu.
+
+Chaque fichier (photo de profil, icônes, captures de projets) est rangé une
+seule fois sous ``MEDIA_FOLDER/<2 premiers caractères>/<sha256><extension>`` ;
+la configuration ne garde qu'une référence ``media:<sha256><extension>`` au
+lieu d'une data URI base64 de plusieurs centaines de Ko. Deux uploads du même
+contenu donnent la même référence.
+
+Les fichiers sont servis par le serveur statique de Streamlit
+(``enableStaticServing``, voir ``.streamlit/config.toml``), qui ne sert que le
+dossier ``static/`` voisin du script : d'où ``static/media`` plutôt que
+``uploads/``. Le navigateur les charge par URL (``app/static/media/...``) et
+les met en cache ; plus rien n'est ré-envoyé dans le HTML à chaque rerun.
+
+À l'upload, ``put_image`` détecte le vrai type MIME d'après les premiers
+octets (l'extension du client n'est qu'un repli) et, avec Pillow, fabrique des
+déclinaisons ``<sha256>.w<largeur>.webp`` (JPEG ou PNG sans WebP) pour chaque
+largeur de ``RENDITION_WIDTHS`` inférieure à l'original, plus l'original
+ré-encodé (``.full``), chacune seulement si elle est plus légère. Chaque point
+d'affichage passe sa largeur CSS à ``media_url`` / ``media_source``, qui
+choisissent la plus petite déclinaison couvrant cette largeur en écran haute
+densité (``PIXEL_RATIO``). Les médias plus anciens sont déclinés à la première
+demande ; sans Pillow, l'original est servi.
+
+Les uploads sont ingérés par blocs (``put_stream``) : empreinte calculée au
+fil de l'écriture, pas de copie complète en mémoire, un doublon n'écrase ni
+n'ajoute rien. ``ingest_uploads`` traite un lot de fichiers dans un pool de
+threads.
+
+Les vidéos de projet sont lues par le navigateur directement à cette URL :
+le serveur statique répond aux requêtes ``Range`` (lecture progressive,
+navigation dans la vidéo) sans que le processus Python charge le fichier.
+Ses limites décident de ce qui peut y passer (``static_video_url``) :
+- il refuse (404) les fichiers de plus de 200 Mo (``STATIC_MAX_SIZE``) ;
+- le serveur Tornado des versions de Streamlit antérieures à Starlette
+  n'envoie le vrai type MIME que pour une liste d'extensions sans vidéos :
+  une ``.mp4`` part en ``text/plain`` avec ``nosniff`` et n'est pas lue
+  (avec ``Cache-Control: no-cache``) ;
+- le serveur Starlette (vérifié avec Streamlit 1.65) envoie ``video/mp4``,
+  répond ``206`` aux requêtes ``Range`` et fournit ``ETag`` /
+  ``Last-Modified`` pour la revalidation.
+Les autres vidéos (trop grosses, formats que les navigateurs ne lisent pas,
+ancien serveur) passent par ``st.video`` avec leur chemin local.
+
+``migrate_config`` extrait les data URIs d'une configuration existante (et,
+en ligne de commande, y range les vidéos désignées par un chemin local) :
+
+    python media_store.py migrate --config portfolio_config.json
+"""
+import argparse
+import base64
+import binascii
+import contextlib
+import copy
+import hashlib
+import io
+import math
+import mimetypes
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from perf import count_read, count_written
+from storage import atomic_write_bytes, fsync_directory
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+MEDIA_FOLDER = os.path.join("static", "media")
+MEDIA_URL = "app/static/media"
+REF_PREFIX = "media:"
+
+# Taille des blocs lus et hachés à l'ingestion, et threads pour un lot d'uploads
+CHUNK_SIZE = 1 << 20
+UPLOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Largeurs (px) des déclinaisons et densité d'écran visée
+RENDITION_WIDTHS = (40, 100, 200, 400, 800, 1600)
+PIXEL_RATIO = 2
+RENDITION_QUALITY = 80
+
+# Signatures (décalage, octets) -> type MIME, testées dans l'ordre
+MIME_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (0, b"%PDF-", "application/pdf"),
+    (4, b"ftypqt", "video/quicktime"),
+    (4, b"ftyp", "video/mp4"),
+    (8, b"AVI ", "video/x-msvideo"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "video/x-ms-wmv")
+)
+
+# Extensions retenues pour les types courants (mimetypes.guess_extension varie selon la plateforme)
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp",
+    "image/svg+xml": ".svg", "application/pdf": ".pdf", "video/mp4": ".mp4",
+    "video/quicktime": ".mov", "video/x-msvideo": ".avi", "video/x-ms-wmv": ".wmv"
+}
+
+# Extensions déclinées par Pillow (le SVG est vectoriel, les vidéos et PDF servis tels quels)
+# Formats lus nativement par les navigateurs dans une balise <video>
+STATIC_VIDEO_EXTENSIONS = {".mp4", ".m4v", ".webm", ".ogv", ".mov"}
+# Taille maximale d'un fichier servi par le serveur statique de Streamlit
+STATIC_MAX_SIZE = 200 * 1024 * 1024
+RASTER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Déclinaisons connues par média : nom -> {largeur: nom de fichier}
+_renditions = {}
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def is_image_source(value):
+    """Vrai si value désigne une image (URL, data URI ou média) plutôt qu'un émoji ou du texte"""
+    return isinstance(value, str) and value.startswith(("http", "data:", REF_PREFIX))
+
+
+def _name(ref):
+    name = ref[len(REF_PREFIX):]
+    if not name or "/" in name or "\\" in name or name.startswith("."):
+        raise ValueError(f"Référence de média invalide : {ref!r}")
+    return name
+
+
+def media_path(ref, root=MEDIA_FOLDER):
+    """Chemin local du média référencé"""
+    name = _name(ref)
+    return os.path.join(root, name[:2], name)
+
+
+def media_url(value, width=None):
+    """URL servie au navigateur pour value (déclinaison adaptée à width px CSS) ; les autres valeurs telles quelles"""
+    if not is_ref(value):
+        return value
+    name = _fitting_name(_name(value), width, MEDIA_FOLDER)
+    return f"{MEDIA_URL}/{name[:2]}/{name}"
+
+
+def media_source(value, width=None, root=MEDIA_FOLDER):
+    """Source pour st.image / st.video : chemin local d'un média (ou de sa déclinaison), value sinon"""
+    if not is_ref(value):
+        return value
+    name = _fitting_name(_name(value), width, root)
+    return os.path.join(root, name[:2], name)
+
+
+def _static_extensions():
+    """Extensions servies avec leur type MIME par le serveur statique ; None si toutes le sont"""
+    try:
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        # Serveur Starlette : type MIME deviné d'après l'extension
+        return None
+    return SAFE_APP_STATIC_FILE_EXTENSIONS
+
+
+def static_video_url(ref, root=MEDIA_FOLDER):
+    """URL de la vidéo ref si le serveur statique peut la servir au lecteur du navigateur, None sinon"""
+    if not is_ref(ref):
+        return None
+    extension = os.path.splitext(_name(ref))[1].lower()
+    if extension not in STATIC_VIDEO_EXTENSIONS:
+        return None
+    extensions = _static_extensions()
+    if extensions is not None and extension not in extensions:
+        return None
+    try:
+        if os.path.getsize(media_path(ref, root)) > STATIC_MAX_SIZE:
+            return None
+    except OSError:
+        return None
+    return media_url(ref)
+
+
+def detect_mime(data):
+    """Type MIME d'après les premiers octets ; None s'il n'est pas reconnu"""
+    for offset, signature, mime_type in MIME_SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            return mime_type
+    head = data[:1024].lstrip().lower()
+    if head.startswith((b"<svg", b"<?xml")) and b"<svg" in head:
+        return "image/svg+xml"
+    return None
+
+
+def extension_for(mime_type):
+    return MIME_EXTENSIONS.get(mime_type) or mimetypes.guess_extension(mime_type or "") or ""
+
+
+def _rendition_format(image):
+    """(format Pillow, extension, options) d'une déclinaison de image"""
+    if features.check("webp"):
+        return "WEBP", ".webp", {"quality": RENDITION_QUALITY, "method": 4}
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        return "PNG", ".png", {"optimize": True}
+    return "JPEG", ".jpg", {"quality": RENDITION_QUALITY, "optimize": True, "progressive": True}
+
+
+def _rendition_file(stem, width, extension):
+    return f"{stem}.{'full' if width == math.inf else f'w{width}'}{extension}"
+
+
+def build_renditions(name, root=MEDIA_FOLDER):
+    """Écrire les déclinaisons de l'image rangée sous name ; retourne {largeur: nom de fichier}
+
+    La déclinaison de largeur math.inf est l'original ré-encodé, servie quand
+    aucune déclinaison réduite ne couvre la largeur demandée."""
+    if Image is None or os.path.splitext(name)[1] not in RASTER_EXTENSIONS:
+        return {}
+    path = os.path.join(root, name[:2], name)
+    try:
+        original_size = os.path.getsize(path)
+        count_read(original_size)
+        with Image.open(path) as image:
+            if getattr(image, "is_animated", False):
+                return {}
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+            image_format, extension, options = _rendition_format(image)
+            if image_format == "JPEG" and image.mode == "RGBA":
+                image = image.convert("RGB")
+            stem = os.path.splitext(name)[0]
+            renditions = {}
+            # Largeurs inférieures à l'original, puis l'original ré-encodé (largeur infinie)
+            for width in [width for width in RENDITION_WIDTHS if width < image.width] + [math.inf]:
+                resized = image
+                if width != math.inf:
+                    resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+                output = io.BytesIO()
+                resized.save(output, image_format, **options)
+                # Inutile si la déclinaison ne pèse pas moins que l'original
+                if output.tell() >= original_size:
+                    continue
+                rendition = _rendition_file(stem, width, extension)
+                atomic_write_bytes(os.path.join(root, name[:2], rendition), output.getvalue())
+                renditions[width] = rendition
+            return renditions
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return {}
+
+
+def _load_renditions(name, root):
+    """Déclinaisons présentes sur disque ; construites à la demande pour les médias plus anciens"""
+    directory = os.path.join(root, name[:2])
+    stem = os.path.splitext(name)[0]
+    renditions = {}
+    for width in RENDITION_WIDTHS + (math.inf,):
+        for extension in (".webp", ".jpg", ".png"):
+            rendition = _rendition_file(stem, width, extension)
+            if os.path.exists(os.path.join(directory, rendition)):
+                renditions[width] = rendition
+                break
+    return renditions or build_renditions(name, root)
+
+
+def _fitting_name(name, width, root):
+    """Plus petite déclinaison couvrant width px CSS, sinon l'original ré-encodé ou l'original"""
+    if not width:
+        return name
+    key = (root, name)
+    renditions = _renditions.get(key)
+    if renditions is None:
+        renditions = _renditions[key] = _load_renditions(name, root)
+    needed = width * PIXEL_RATIO
+    for rendition_width in sorted(renditions):
+        if rendition_width >= needed:
+            return renditions[rendition_width]
+    return name
+
+
+def put_bytes(data, extension="", root=MEDIA_FOLDER):
+    """Ranger data (si absent) et retourner sa référence ; l'extension suit le type détecté"""
+    extension = extension_for(detect_mime(data)) or extension
+    name = hashlib.sha256(data).hexdigest() + extension.lower()
+    ref = REF_PREFIX + name
+    path = media_path(ref, root)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_bytes(path, data)
+    return ref
+
+
+def put_stream(stream, extension="", root=MEDIA_FOLDER):
+    """Ranger le contenu d'un flux binaire, lu et haché par blocs ; retourne sa référence
+
+    Le flux est écrit dans un fichier temporaire du stockage pendant le calcul
+    de l'empreinte, puis renommé sur son nom définitif, ou supprimé si ce
+    contenu est déjà rangé (doublon)."""
+    os.makedirs(root, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload.", suffix=".tmp", dir=root)
+    digest = hashlib.sha256()
+    mime_type = None
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if mime_type is None:
+                    mime_type = detect_mime(chunk) or ""
+                digest.update(chunk)
+                f.write(chunk)
+                count_written(len(chunk))
+            f.flush()
+            os.fsync(f.fileno())
+        name = digest.hexdigest() + (extension_for(mime_type) or extension).lower()
+        path = os.path.join(root, name[:2], name)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            fsync_directory(path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    return REF_PREFIX + name
+
+
+def ensure_renditions(ref, root=MEDIA_FOLDER):
+    """Fabriquer les déclinaisons d'un média rangé, une fois par processus"""
+    key = (root, _name(ref))
+    if key not in _renditions:
+        _renditions[key] = build_renditions(key[1], root)
+
+
+def put_image(data, extension="", root=MEDIA_FOLDER):
+    """Ranger une image et fabriquer ses déclinaisons ; retourne sa référence"""
+    ref = put_bytes(data, extension, root)
+    ensure_renditions(ref, root)
+    return ref
+
+
+def ingest_upload(uploaded_file, root=MEDIA_FOLDER):
+    """Ranger un fichier uploadé (objet fichier avec un attribut name) et les déclinaisons d'une image"""
+    uploaded_file.seek(0)
+    ref = put_stream(uploaded_file, os.path.splitext(uploaded_file.name)[1], root)
+    ensure_renditions(ref, root)
+    return ref
+
+
+def ingest_uploads(uploaded_files, root=MEDIA_FOLDER, workers=UPLOAD_WORKERS):
+    """Ranger un lot d'uploads en parallèle ; références dans l'ordre du lot, None pour un fichier en échec
+
+    Le hachage et Pillow libèrent le GIL sur les gros blocs : les threads
+    avancent réellement en parallèle."""
+    def ingest(uploaded_file):
+        try:
+            return ingest_upload(uploaded_file, root)
+        except (OSError, ValueError):
+            return None
+
+    if len(uploaded_files) <= 1:
+        return [ingest(uploaded_file) for uploaded_file in uploaded_files]
+    with ThreadPoolExecutor(max_workers=min(workers, len(uploaded_files))) as executor:
+        return list(executor.map(ingest, uploaded_files))
+
+
+def put_data_uri(uri, root=MEDIA_FOLDER):
+    """Ranger le contenu d'une data URI base64 ; None si elle n'est pas décodable"""
+    header, _, payload = uri.partition(",")
+    if not header.startswith("data:") or not header.endswith(";base64"):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return put_image(data, extension_for(header[len("data:"):-len(";base64")]), root)
+
+
+def _media_fields(config):
+    """(conteneur, clé) de chaque champ de la configuration pouvant contenir une image"""
+    profile = config.get("profile", {})
+    for key in ("profile_image", "linkedin_icon", "github_icon"):
+        if key in profile:
+            yield profile, key
+    for stat in config.get("stats", []):
+        if "icon" in stat:
+            yield stat, "icon"
+    for project in config.get("projects", {}).values():
+        images = project.get("presentation_images", [])
+        for index in range(len(images)):
+            yield images, index
+
+
+def migrate_config(config, root=MEDIA_FOLDER, local_files=False):
+    """Remplacer en place les data URIs base64 par des références ; retourne le nombre de champs migrés
+
+    Avec local_files, les vidéos de projet désignées par un chemin local
+    (uploads antérieurs au stockage de médias) y sont aussi rangées."""
+    migrated = 0
+    for container, key in _media_fields(config):
+        value = container[key]
+        if isinstance(value, str) and value.startswith("data:"):
+            ref = put_data_uri(value, root)
+            if ref:
+                container[key] = ref
+                migrated += 1
+    for project in config.get("projects", {}).values() if local_files else ():
+        path = project.get("local_video")
+        if path and not is_ref(path) and os.path.isfile(path):
+            with open(path, "rb") as f:
+                project["local_video"] = put_stream(f, os.path.splitext(path)[1], root)
+            migrated += 1
+    return migrated
+
+
+def main(argv=None):
+    from config_store import CONFIG_FILE, get_config_cache
+
+    parser = argparse.ArgumentParser(description="Stockage des médias du portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Ranger les images base64 et vidéos locales de la configuration")
+    migrate.add_argument("--config", default=CONFIG_FILE, help="Fichier de configuration")
+    migrate.add_argument("--root", default=MEDIA_FOLDER, help="Dossier du stockage de médias")
+    args = parser.parse_args(argv)
+
+    cache = get_config_cache(args.config)
+    config = cache.get()
+    if config is None:
+        parser.error(f"Configuration introuvable ou illisible : {args.config}")
+    before = os.path.getsize(args.config)
+    config = copy.deepcopy(config)
+    migrated = migrate_config(config, args.root, local_files=True)
+    if migrated:
+        cache.save(config)
+    print(f"{migrated} média(s) rangé(s) dans {args.root} ; "
+          f"configuration : {before} → {os.path.getsize(args.config)} octets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Chronométrage léger des chemins chauds du portfolio.
+
+``timed(nom)`` s'utilise en décorateur ou en bloc ``with`` : la durée de
+chaque appel est gardée dans un tampon circulaire (``deque``) de
+``RING_SIZE`` mesures par nom, d'où sont tirés les percentiles p50/p95/p99.
+Coût d'une mesure : deux ``perf_counter`` et un ajout sous verrou.
+
+``count_read`` / ``count_written`` comptent les octets lus et écrits sur
+disque. Ils sont attribués au rerun Streamlit en cours du thread (une session
+= un thread, voir ``rerun``) ; hors rerun (écriture différée, compaction), ils
+vont dans un total d'arrière-plan.
+"""
+import contextlib
+import math
+import threading
+import time
+from collections import deque
+
+RING_SIZE = 512
+TIMING_PERCENTILES = (50, 95, 99)
+
+_lock = threading.Lock()
+_timings = {}
+_calls = {}
+_reruns = deque(maxlen=RING_SIZE)
+_background = {"read": 0, "written": 0}
+_local = threading.local()
+
+
+def record(name, seconds):
+    """Ajouter une mesure (secondes) au tampon de name"""
+    with _lock:
+        ring = _timings.get(name)
+        if ring is None:
+            ring = _timings[name] = deque(maxlen=RING_SIZE)
+        ring.append(seconds)
+        _calls[name] = _calls.get(name, 0) + 1
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Chronométrer un bloc ou, en décorateur, chaque appel d'une fonction"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def _count(kind, size):
+    io = getattr(_local, "io", None)
+    if io is not None:
+        io[kind] += size
+    else:
+        with _lock:
+            _background[kind] += size
+
+
+def count_read(size):
+    _count("read", size)
+
+
+def count_written(size):
+    _count("written", size)
+
+
+@contextlib.contextmanager
+def rerun():
+    """Délimiter un rerun du script : durée totale et octets lus/écrits par le thread"""
+    _local.io = io = {"read": 0, "written": 0}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.io = None
+        with _lock:
+            _reruns.append((elapsed, io["read"], io["written"]))
+
+
+def _percentiles(values):
+    """Percentiles TIMING_PERCENTILES de values (méthode du rang le plus proche)"""
+    values = sorted(values)
+    return {p: values[max(0, math.ceil(p / 100 * len(values)) - 1)] for p in TIMING_PERCENTILES}
+
+
+def timing_stats():
+    """Par nom : appels, dernière mesure et percentiles en millisecondes, p95 décroissant"""
+    with _lock:
+        snapshot = [(name, list(ring), _calls[name]) for name, ring in _timings.items()]
+    stats = []
+    for name, values, calls in snapshot:
+        percentiles = _percentiles(values)
+        stats.append(dict(
+            {f"p{p}": value * 1000 for p, value in percentiles.items()},
+            name=name, calls=calls, last=values[-1] * 1000
+        ))
+    return sorted(stats, key=lambda entry: entry["p95"], reverse=True)
+
+
+def rerun_stats():
+    """Reruns mesurés : durée (ms) et octets lus/écrits, percentiles et dernier rerun"""
+    with _lock:
+        reruns = list(_reruns)
+        background = dict(_background)
+    if not reruns:
+        return None
+    durations, reads, writes = zip(*reruns)
+    return {
+        "reruns": len(reruns),
+        "duration": {p: value * 1000 for p, value in _percentiles(durations).items()},
+        "read": _percentiles(reads),
+        "written": _percentiles(writes),
+        "last": {"duration": durations[-1] * 1000, "read": reads[-1], "written": writes[-1]},
+        "background": background
+    }
+
+
+def reset():
+    """Vider toutes les mesures"""
+    with _lock:
+        _timings.clear()
+        _calls.clear()
+        _reruns.clear()
+        _background.update(read=0, written=0)
@@ -1,17 +1,26 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from PIL import Image
 import base64
-import json
+import copy
 import os
 import shutil
+import tempfile
 from pathlib import Path
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import hashlib
 import time
 import os
 from dotenv import load_dotenv
 
+from analytics_export import available_formats, export_table
+from analytics_sessions import get_tracker
+from analytics_store import empty_analytics, format_duration, format_timestamp, get_store, get_writer
+from analytics_timeseries import WEEKDAY_LABELS
+from config_store import CONFIG_FILE, get_config_cache
+from media_store import (ingest_upload, ingest_uploads, is_image_source, is_ref, media_path, media_source, media_url,
+                         migrate_config, static_video_url)
+from perf import count_read, rerun, rerun_stats, reset as reset_timings, timed, timing_stats
+
 # Configuration de la page
 st.set_page_config(
     page_title="Portfolio - Data Scientist",
@@ -25,16 +34,21 @@ load_dotenv()
 
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "changeme")
 
-# Fichiers et dossiers
-CONFIG_FILE = "portfolio_config.json"
-ANALYTICS_FILE = "portfolio_analytics.json"
-UPLOAD_FOLDER = "uploads"
-IMAGES_FOLDER = os.path.join(UPLOAD_FOLDER, "images")
-VIDEOS_FOLDER = os.path.join(UPLOAD_FOLDER, "videos")
+# Libellés des colonnes de tri des tableaux d'administration
+SESSION_SORT_LABELS = {
+    "start_time": "Début", "visitor_id": "Visiteur",
+    "total_page_views": "Pages vues", "duration_seconds": "Durée"
+}
+VISITOR_SORT_LABELS = {
+    "last_visit": "Dernière visite", "first_visit": "Première visite",
+    "total_visits": "Nb visites", "total_seconds": "Temps total"
+}
 
-# Créer les dossiers s'ils n'existent pas
-for folder in [UPLOAD_FOLDER, IMAGES_FOLDER, VIDEOS_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+# Largeur (px CSS) maximale d'une image du carrousel : demi-page en layout "wide"
+CAROUSEL_WIDTH = 800
+
+# Tables exportables depuis l'onglet Analytics
+EXPORT_LABELS = {"visitors": "Visiteurs", "sessions": "Sessions", "page_views": "Pages vues"}
 
 
 def get_visitor_id():
@@ -46,244 +60,146 @@ def get_visitor_id():
     return st.session_state.visitor_id
 
 
-def get_current_timestamp():
-    """Retourner le timestamp actuel avec date et heure exacte"""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
-def calculate_time_spent(start_time_str, end_time_str):
-    """Calculer le temps passé entre deux timestamps"""
-    try:
-        start_time = datetime.strptime(start_time_str, "%Y-%m-%d %H:%M:%S")
-        end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
-        time_diff = end_time - start_time
-
-        total_seconds = int(time_diff.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-
-        if hours > 0:
-            return f"{hours}h {minutes}m {seconds}s"
-        elif minutes > 0:
-            return f"{minutes}m {seconds}s"
-        else:
-            return f"{seconds}s"
-    except:
-        return "N/A"
-
-
+@timed("load_analytics")
 def load_analytics():
-    """Charger les données d'analytics"""
-    if os.path.exists(ANALYTICS_FILE):
-        try:
-            with open(ANALYTICS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {
-                "total_visits": 0,
-                "unique_visitors": 0,
-                "daily_visits": {},
-                "page_views": {
-                    "portfolio": 0,
-                    "project_details": 0
-                },
-                "project_views": {},
-                "visitors": {},
-                "sessions": {}  # Nouvelle section pour les sessions détaillées
-            }
-    return {
-        "total_visits": 0,
-        "unique_visitors": 0,
-        "daily_visits": {},
-        "page_views": {
-            "portfolio": 0,
-            "project_details": 0
-        },
-        "project_views": {},
-        "visitors": {},
-        "sessions": {}
-    }
+    """Charger les données d'analytics (snapshot + journal d'événements)"""
+    get_writer().flush()
+    return get_store().load()
 
 
+@timed("save_analytics")
 def save_analytics(analytics):
-    """Sauvegarder les données d'analytics"""
+    """Remplacer les données d'analytics"""
     try:
-        with open(ANALYTICS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(analytics, f, ensure_ascii=False, indent=2)
+        get_writer().flush()
+        get_store().save(analytics)
         return True
     except:
         return False
 
 
 def start_session():
-    """Démarrer une nouvelle session pour un visiteur"""
-    if 'session_start_time' not in st.session_state:
-        st.session_state.session_start_time = get_current_timestamp()
-        st.session_state.session_page_views = []
-        st.session_state.last_activity = get_current_timestamp()
+    """Démarrer (ou prolonger) la session du visiteur dans la table des sessions actives"""
+    get_tracker().heartbeat(get_visitor_id())
 
 
 def update_session_activity(page="portfolio", project_key=None):
-    """Mettre à jour l'activité de la session actuelle"""
-    current_time = get_current_timestamp()
-    st.session_state.last_activity = current_time
-
-    # Ajouter la page visitée avec timestamp
-    page_visit = {
-        "page": page,
-        "timestamp": current_time,
-        "project_key": project_key
-    }
-
-    if 'session_page_views' not in st.session_state:
-        st.session_state.session_page_views = []
-
-    st.session_state.session_page_views.append(page_visit)
+    """Signaler l'activité de la session actuelle et la page visitée"""
+    get_tracker().heartbeat(get_visitor_id(), page, project_key)
 
 
 def end_session():
-    """Terminer la session actuelle et sauvegarder les données"""
-    if 'session_start_time' in st.session_state:
-        analytics = load_analytics()
-        visitor_id = get_visitor_id()
-        session_end_time = get_current_timestamp()
-
-        # Calculer la durée de la session
-        session_duration = calculate_time_spent(
-            st.session_state.session_start_time,
-            session_end_time
-        )
+    """Terminer la session actuelle ; sans appel explicite, elle est close
+    automatiquement après SESSION_IDLE_TIMEOUT secondes d'inactivité"""
+    return get_tracker().close(get_visitor_id())
 
-        # Créer l'ID de session unique
-        session_id = f"{visitor_id}_{st.session_state.session_start_time}"
-
-        # Sauvegarder les détails de la session
-        analytics["sessions"][session_id] = {
-            "visitor_id": visitor_id,
-            "start_time": st.session_state.session_start_time,
-            "end_time": session_end_time,
-            "duration": session_duration,
-            "page_views": st.session_state.session_page_views,
-            "total_page_views": len(st.session_state.session_page_views)
-        }
 
-        save_analytics(analytics)
+def navigate(page, project_key=None):
+    """Changer de page : chaque navigation reçoit un nouveau numéro de séquence"""
+    st.session_state.current_page = page
+    if project_key is not None:
+        st.session_state.selected_project = project_key
+    st.session_state.nav_seq = st.session_state.get("nav_seq", 0) + 1
 
 
+@timed("track_visit")
 def track_visit(page="portfolio", project_key=None):
-    """Tracker une visite avec timestamps détaillés"""
-    analytics = load_analytics()
-    visitor_id = get_visitor_id()
-    current_timestamp = get_current_timestamp()
-    today = str(date.today())
+    """Tracker une visite de page.
 
-    # Démarrer la session si ce n'est pas fait
-    start_session()
+    Streamlit réexécute le script à chaque interaction (bouton du carrousel,
+    widget...) : seule une vraie navigation, identifiée par (visiteur, page,
+    projet, numéro de navigation), compte comme une visite. Un simple rerun
+    prolonge seulement la session.
+    """
+    visitor_id = get_visitor_id()
+    navigation = (visitor_id, page, project_key, st.session_state.get("nav_seq", 0))
+    if st.session_state.get("last_tracked_navigation") == navigation:
+        start_session()
+        return None
+    st.session_state.last_tracked_navigation = navigation
 
-    # Mettre à jour l'activité de la session
+    # Ouvrir la session si besoin et repousser son expiration
     update_session_activity(page, project_key)
 
-    # Nouveau visiteur ?
-    is_new_visitor = visitor_id not in analytics["visitors"]
-
-    if is_new_visitor:
-        analytics["unique_visitors"] += 1
-        analytics["visitors"][visitor_id] = {
-            "first_visit": current_timestamp,  # Timestamp complet au lieu de juste la date
-            "total_visits": 0,
-            "pages_visited": [],
-            "total_time_spent": "0s",
-            "sessions": []
-        }
-
-    # Incrémenter les compteurs
-    analytics["total_visits"] += 1
-    analytics["visitors"][visitor_id]["total_visits"] += 1
-    analytics["visitors"][visitor_id]["last_visit"] = current_timestamp  # Timestamp complet
-
-    # Visits quotidiennes
-    if today not in analytics["daily_visits"]:
-        analytics["daily_visits"][today] = 0
-    analytics["daily_visits"][today] += 1
+    # L'événement est seulement mis en file : le thread d'écriture différée
+    # l'ajoute au journal, hors du chemin de rendu de la page
+    return get_writer().record_visit(visitor_id, page, project_key)
 
-    # Pages vues
-    analytics["page_views"][page] = analytics["page_views"].get(page, 0) + 1
 
-    # Projets vus
-    if project_key:
-        analytics["project_views"][project_key] = analytics["project_views"].get(project_key, 0) + 1
+def calculate_total_time_for_visitor(visitor_id):
+    """Temps total passé par un visiteur sur toutes ses sessions, formaté pour l'affichage"""
+    return format_duration(get_store().visitor_total_seconds(visitor_id))
 
-    # Ajouter la page aux pages visitées
-    if page not in analytics["visitors"][visitor_id]["pages_visited"]:
-        analytics["visitors"][visitor_id]["pages_visited"].append(page)
 
-    save_analytics(analytics)
-    return analytics
+def paginated_browse(key, browse, sort_labels, limit):
+    """Tableau trié et paginé par curseur : sélecteurs de tri, boutons ◀/▶.
 
+    La pile des curseurs des pages déjà vues est gardée dans la session
+    Streamlit ; un changement de tri ou d'ordre revient à la première page.
+    """
+    col_sort, col_order = st.columns([3, 1])
+    with col_sort:
+        sort = st.selectbox("Trier par", list(sort_labels), format_func=sort_labels.get, key=f"{key}_sort")
+    with col_order:
+        descending = st.radio("Ordre", ["Décroissant", "Croissant"], horizontal=True,
+                              key=f"{key}_order") == "Décroissant"
+
+    state = st.session_state.setdefault(f"{key}_pages", {"query": None, "cursors": [None]})
+    if state["query"] != (sort, descending):
+        state["query"], state["cursors"] = (sort, descending), [None]
+
+    rows, next_cursor = browse(sort=sort, descending=descending, cursor=state["cursors"][-1], limit=limit)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ Précédent", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {len(state['cursors'])}")
+    with col_next:
+        if st.button("Suivant ▶", key=f"{key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor)
+            st.rerun()
+    return rows
 
-def calculate_total_time_for_visitor(visitor_id):
-    """Calculer le temps total passé par un visiteur sur toutes ses sessions"""
-    analytics = load_analytics()
-    total_seconds = 0
-
-    for session_id, session_data in analytics.get("sessions", {}).items():
-        if session_data.get("visitor_id") == visitor_id:
-            duration_str = session_data.get("duration", "0s")
-            # Convertir la durée en secondes
-            try:
-                if "h" in duration_str:
-                    parts = duration_str.replace("h", "").replace("m", "").replace("s", "").split()
-                    if len(parts) >= 3:
-                        total_seconds += int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                elif "m" in duration_str:
-                    parts = duration_str.replace("m", "").replace("s", "").split()
-                    if len(parts) >= 2:
-                        total_seconds += int(parts[0]) * 60 + int(parts[1])
-                elif "s" in duration_str:
-                    seconds = int(duration_str.replace("s", ""))
-                    total_seconds += seconds
-            except:
-                continue
 
-    # Convertir en format lisible
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
+def save_uploaded_file(uploaded_file):
+    """Ranger un fichier uploadé dans le stockage de médias (par blocs, sans doublon) ; retourne sa référence"""
+    if uploaded_file is not None:
+        try:
+            return ingest_upload(uploaded_file)
+        except:
+            return None
+    return None
 
-    if hours > 0:
-        return f"{hours}h {minutes}m {seconds}s"
-    elif minutes > 0:
-        return f"{minutes}m {seconds}s"
-    else:
-        return f"{seconds}s"
 
+def cached_fragment(config, name, build):
+    """Fragment HTML name construit par build(config), réutilisé jusqu'au prochain changement de la configuration"""
+    return get_config_cache(CONFIG_FILE).fragment(config, name, build)
 
-def save_uploaded_file(uploaded_file, folder):
-    """Sauvegarder un fichier uploadé et retourner le chemin"""
-    if uploaded_file is not None:
-        file_path = os.path.join(folder, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        # Retourner le chemin relatif pour l'accès web
-        return file_path.replace("\\", "/")
-    return None
 
+def video_player(video_ref):
+    """Lecteur HTML5 d'une vidéo du stockage de médias, servie par URL (requêtes Range, cache navigateur)
 
-def image_to_base64(image_path):
-    """Convertir une image en base64"""
-    try:
-        with open(image_path, "rb") as img_file:
-            return f"data:image/jpeg;base64,{base64.b64encode(img_file.read()).decode()}"
-    except:
-        return None
+    Les vidéos que le serveur statique ne sert pas (taille, format) passent par st.video."""
+    video_url = static_video_url(video_ref)
+    if video_url is None:
+        st.video(media_source(video_ref))
+        return
+    st.markdown(f"""
+    <video src="{video_url}" controls preload="metadata"
+           style="width: 100%; border-radius: 10px;"></video>
+    """, unsafe_allow_html=True)
 
 
 def file_to_base64(file_path):
     """Convertir un fichier en base64 (pour CV PDF)"""
     try:
         with open(file_path, "rb") as f:
-            return f"data:application/pdf;base64,{base64.b64encode(f.read()).decode()}"
+            data = f.read()
+        count_read(len(data))
+        return f"data:application/pdf;base64,{base64.b64encode(data).decode()}"
     except:
         return None
 
@@ -380,22 +296,18 @@ DEFAULT_CONFIG = {
 }
 
 
+@timed("load_config")
 def load_config():
-    """Charger la configuration depuis le fichier"""
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return DEFAULT_CONFIG
-    return DEFAULT_CONFIG
+    """Configuration partagée entre sessions (lecture seule), re-parsée seulement si le fichier a changé"""
+    return get_config_cache(CONFIG_FILE).get(DEFAULT_CONFIG)
 
 
 def save_config(config):
-    """Sauvegarder la configuration dans le fichier"""
+    """Sauvegarder la configuration (écriture atomique sous verrou) et mettre à jour le cache"""
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        # Les data URIs collées à la main rejoignent aussi le stockage de médias
+        migrate_config(config)
+        get_config_cache(CONFIG_FILE).save(config)
         return True
     except:
         return False
@@ -649,9 +561,10 @@ def admin_login():
                 st.error("❌ Mot de passe incorrect")
 
 
-def admin_panel():
+def admin_panel(config):
     """Panel d'administration avec analytics détaillés"""
-    config = load_config()
+    # Copie à l'écriture : les formulaires modifient config, pas la version partagée
+    config = copy.deepcopy(config)
 
     st.title("⚙️ Administration du Portfolio")
 
@@ -659,7 +572,7 @@ def admin_panel():
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
         if st.button("👤 Voir le Portfolio"):
-            st.session_state.current_page = "main"
+            navigate("main")
             st.rerun()
     with col2:
         if st.button("🚪 Déconnexion"):
@@ -669,14 +582,17 @@ def admin_panel():
     st.markdown("---")
 
     # Onglets d'administration avec Analytics améliorés
-    tab0, tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+    tab0, tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
         ["📊 Analytics", "⏱️ Sessions Détaillées", "👤 Profil", "📊 Statistiques", "📝 À propos", "🛠️ Compétences",
-         "📁 Projets"])
+         "📁 Projets", "🚀 Performance"])
 
-    with tab0:
+    with tab0, timed("Onglet Analytics"):
         st.markdown("### 📈 Tableau de bord Analytics")
 
-        analytics = load_analytics()
+        # Écrire les visites encore en file pour afficher des chiffres à jour
+        get_writer().flush()
+        store = get_store()
+        summary = store.summary()
 
         # Métriques principales
         col1, col2, col3, col4 = st.columns(4)
@@ -684,89 +600,143 @@ def admin_panel():
         with col1:
             st.metric(
                 label="🌍 Visites totales",
-                value=analytics["total_visits"],
-                delta=f"+{analytics['daily_visits'].get(str(date.today()), 0)} aujourd'hui"
+                value=summary["total_visits"],
+                delta=f"+{summary['today_visits']} aujourd'hui"
             )
 
         with col2:
             st.metric(
                 label="👥 Visiteurs uniques",
-                value=analytics["unique_visitors"]
+                value=summary["unique_visitors"]
             )
 
         with col3:
-            portfolio_views = analytics["page_views"].get("portfolio", 0)
+            portfolio_views = summary["page_views"].get("portfolio", 0)
             st.metric(
                 label="🏠 Vues Portfolio",
                 value=portfolio_views
             )
 
         with col4:
-            project_views = analytics["page_views"].get("project_details", 0)
+            project_views = summary["page_views"].get("project_details", 0)
             st.metric(
                 label="📁 Vues Projets",
                 value=project_views
             )
 
+        # Mode sketch : uniques estimés en mémoire fixe, avec leur marge d'erreur
+        unique_estimates = store.sketch_uniques()
+        if unique_estimates:
+            col_today, col_week, col_all = st.columns(3)
+            for column, label, key in ((col_today, "👤 Uniques aujourd'hui", "today"),
+                                       (col_week, "👥 Uniques 7 jours", "week"),
+                                       (col_all, "🌍 Uniques (historique)", "all")):
+                estimate, margin = unique_estimates[key]
+                with column:
+                    st.metric(label=label, value=f"≈ {estimate}", delta=f"± {margin}", delta_color="off",
+                              help="Estimation HyperLogLog, marge à ~95 %")
+
         st.markdown("---")
 
+        # Période des graphiques (7 derniers jours par défaut)
+        today = date.today()
+        selected_range = st.date_input(
+            "📆 Période", value=(today - timedelta(days=6), today), max_value=today, key="analytics_range"
+        )
+        if len(selected_range) == 2:
+            range_start, range_end = selected_range
+        else:
+            # Sélection en cours (une seule date choisie) : période d'un jour
+            range_start = range_end = selected_range[0] if selected_range else today
+
         # Graphiques
         col_chart1, col_chart2 = st.columns(2)
 
         with col_chart1:
-            st.markdown("**📅 Visites par jour (7 derniers jours)**")
-            if analytics["daily_visits"]:
-                # Prendre les 7 derniers jours
-                recent_days = list(analytics["daily_visits"].items())[-7:]
-                if recent_days:
-                    days = [day for day, _ in recent_days]
-                    visits = [visits for _, visits in recent_days]
-
-                    # Créer un graphique simple
-                    chart_data = {"Date": days, "Visites": visits}
-                    st.bar_chart(chart_data, x="Date", y="Visites")
-                else:
-                    st.info("Pas encore de données")
+            st.markdown(f"**📅 Visites par jour ({range_start} → {range_end})**")
+            # Série quotidienne indexée : coût proportionnel à la période, pas à l'historique
+            range_days = store.visits_by_day(range_start, range_end)
+            if any(visits for _, visits in range_days):
+                chart_data = {
+                    "Date": [day for day, _ in range_days],
+                    "Visites": [visits for _, visits in range_days]
+                }
+                st.bar_chart(chart_data, x="Date", y="Visites")
             else:
-                st.info("Aucune visite enregistrée")
+                st.info("Aucune visite sur la période")
 
         with col_chart2:
             st.markdown("**📊 Projets les plus vus**")
-            if analytics["project_views"]:
+            # Classement lu dans les compteurs par projet, déjà triables ;
+            # en mode sketch, top-K Space-Saving (vues surestimées au plus de l'erreur)
+            sketch_top = store.sketch_top_projects(10)
+            if sketch_top is not None:
+                top_projects = [(project_key, views) for project_key, views, _ in sketch_top]
+            else:
+                top_projects = store.top_projects(10)
+            if top_projects:
                 project_stats = []
                 config_projects = config.get("projects", {})
 
-                for project_key, views in analytics["project_views"].items():
+                for project_key, views in top_projects:
                     project_title = config_projects.get(project_key, {}).get("title", project_key)
                     project_stats.append({
                         "Projet": project_title[:20] + "..." if len(project_title) > 20 else project_title,
                         "Vues": views
                     })
 
-                # Trier par nombre de vues
-                project_stats.sort(key=lambda x: x["Vues"], reverse=True)
-
-                if project_stats:
-                    st.bar_chart(project_stats, x="Projet", y="Vues")
-                else:
-                    st.info("Aucune vue de projet")
+                st.bar_chart(project_stats, x="Projet", y="Vues")
+                if sketch_top:
+                    max_error = max(error for _, _, error in sketch_top)
+                    st.caption(f"Estimation Space-Saving : chaque valeur surestime au plus de {max_error} vues")
             else:
                 st.info("Aucun projet consulté")
 
+        st.markdown("**🕐 Visites par heure (24 dernières heures)**")
+        recent_hours = store.hourly_visits(24)
+        if any(visits for _, visits in recent_hours):
+            chart_data = {
+                "Heure": [hour[-2:] + "h" for hour, _ in recent_hours],
+                "Visites": [visits for _, visits in recent_hours]
+            }
+            st.bar_chart(chart_data, x="Heure", y="Visites")
+        else:
+            st.info("Aucune visite sur les dernières 24 heures")
+
+        st.markdown("**🗓️ Visites par jour de semaine et heure (période sélectionnée)**")
+        heatmap = store.visit_heatmap(range_start, range_end)
+        if any(map(any, heatmap)):
+            heatmap_data = [
+                {"Jour": WEEKDAY_LABELS[weekday], "Heure": f"{hour:02d}h", "Visites": visits}
+                for weekday, row in enumerate(heatmap) for hour, visits in enumerate(row)
+            ]
+            st.vega_lite_chart(heatmap_data, {
+                "mark": "rect",
+                "encoding": {
+                    "x": {"field": "Heure", "type": "ordinal"},
+                    "y": {"field": "Jour", "type": "ordinal", "sort": list(WEEKDAY_LABELS)},
+                    "color": {"field": "Visites", "type": "quantitative"},
+                    "tooltip": [{"field": "Jour"}, {"field": "Heure"}, {"field": "Visites"}]
+                }
+            }, use_container_width=True)
+        else:
+            st.info("Aucune visite sur la période")
+
         st.markdown("---")
 
         # Détails des visiteurs avec timestamps exacts
         st.markdown("**👥 Détails des visiteurs (avec temps exact)**")
-        if analytics["visitors"]:
+        recent_visitors = paginated_browse("visitors", store.browse_visitors, VISITOR_SORT_LABELS, 15)
+        if recent_visitors:
             visitor_data = []
-            for visitor_id, data in list(analytics["visitors"].items())[-15:]:  # 15 derniers
-                # Calculer le temps total passé
-                total_time = calculate_total_time_for_visitor(visitor_id)
+            for visitor_id, data in recent_visitors:
+                # Temps total tenu à jour à la clôture de chaque session
+                total_time = format_duration(data.get("total_seconds", 0))
 
                 visitor_data.append({
                     "ID Visiteur": visitor_id,
-                    "Première visite": data["first_visit"],  # Maintenant avec heure exacte
-                    "Dernière visite": data.get("last_visit", data["first_visit"]),  # Avec heure exacte
+                    "Première visite": format_timestamp(data["first_visit"]),
+                    "Dernière visite": format_timestamp(data.get("last_visit", data["first_visit"])),
                     "Nb visites": data["total_visits"],
                     "Pages vues": len(data.get("pages_visited", [])),
                     "Temps total": total_time
@@ -779,6 +749,33 @@ def admin_panel():
         else:
             st.info("Aucune donnée de visiteur")
 
+        # Export des données brutes pour analyse externe
+        st.markdown("---")
+        st.markdown("**📤 Export des données**")
+        col_table, col_format, col_archives = st.columns(3)
+        with col_table:
+            export_kind = st.selectbox("Table", list(EXPORT_LABELS), format_func=EXPORT_LABELS.get)
+        with col_format:
+            export_format = st.selectbox("Format", available_formats(), format_func=str.upper)
+        with col_archives:
+            include_archives = st.checkbox("Inclure les archives")
+
+        if st.button("⚙️ Préparer l'export"):
+            get_writer().flush()
+            file_name = f"portfolio_{export_kind}.{export_format}"
+            # Fichier propre à cette requête : deux exports simultanés ne s'écrasent pas
+            fd, export_path = tempfile.mkstemp(prefix=f"portfolio_{export_kind}_", suffix=f".{export_format}")
+            os.close(fd)
+            try:
+                with st.spinner("Export en cours..."):
+                    # Écrit par lots sur disque, sans copie complète des analytics en mémoire
+                    row_count = export_table(store, export_kind, export_path, export_format, include_archives)
+                # download_button lit le fichier tout de suite : il peut être supprimé ensuite
+                with open(export_path, "rb") as f:
+                    st.download_button(f"⬇️ Télécharger {file_name} ({row_count} lignes)", f, file_name=file_name)
+            finally:
+                os.remove(export_path)
+
         # Bouton de réinitialisation CORRIGÉ
         st.markdown("---")
 
@@ -800,16 +797,7 @@ def admin_panel():
 
             with col_confirm:
                 if st.button("✅ Oui, réinitialiser", type="primary"):
-                    empty_analytics = {
-                        "total_visits": 0,
-                        "unique_visitors": 0,
-                        "daily_visits": {},
-                        "page_views": {"portfolio": 0, "project_details": 0},
-                        "project_views": {},
-                        "visitors": {},
-                        "sessions": {}
-                    }
-                    if save_analytics(empty_analytics):
+                    if save_analytics(empty_analytics()):
                         st.success("✅ Analytics réinitialisées avec succès !")
                         st.session_state.confirm_reset_analytics = False
                         st.rerun()
@@ -822,24 +810,27 @@ def admin_panel():
                     st.session_state.confirm_reset_analytics = False
                     st.rerun()
 
-    with tab1:
+    with tab1, timed("Onglet Sessions"):
         st.markdown("### ⏱️ Sessions Détaillées")
 
-        analytics = load_analytics()
-        sessions = analytics.get("sessions", {})
+        store = get_store()
+        session_stats = store.session_stats()
+        # Les sessions ouvertes sont enregistrées à leur clôture (inactivité)
+        st.caption(f"🟢 Sessions en cours : {get_tracker().active_sessions()}")
 
-        if sessions:
-            st.markdown(f"**📊 Total des sessions : {len(sessions)}**")
+        if session_stats["total_sessions"]:
+            st.markdown(f"**📊 Total des sessions : {session_stats['total_sessions']}**")
 
-            # Tableau détaillé des sessions
+            # Tableau détaillé des sessions, trié et paginé
+            session_rows = paginated_browse("sessions", store.browse_sessions, SESSION_SORT_LABELS, 20)
             session_data = []
-            for session_id, session_info in list(sessions.items())[-20:]:  # 20 dernières sessions
+            for session_id, session_info in session_rows:
                 session_data.append({
                     "Session ID": session_id[-16:],  # Derniers 16 caractères
                     "Visiteur": session_info["visitor_id"],
-                    "Début": session_info["start_time"],
-                    "Fin": session_info["end_time"],
-                    "Durée": session_info["duration"],
+                    "Début": format_timestamp(session_info["start_time"]),
+                    "Fin": format_timestamp(session_info["end_time"]),
+                    "Durée": format_duration(session_info["duration_seconds"]),
                     "Pages vues": session_info["total_page_views"]
                 })
 
@@ -850,28 +841,24 @@ def admin_panel():
                 st.markdown("---")
                 st.markdown("**🔍 Détails d'une session**")
 
-                session_ids = [s["Session ID"] for s in session_data]
-                selected_session = st.selectbox("Sélectionner une session", session_ids)
+                # Options = identifiants complets, affichés tronqués
+                selected_session = st.selectbox(
+                    "Sélectionner une session", [session_id for session_id, _ in session_rows],
+                    format_func=lambda session_id: session_id[-16:]
+                )
 
                 if selected_session:
-                    # Trouver la session complète
-                    full_session_id = None
-                    for sid in sessions.keys():
-                        if sid.endswith(selected_session):
-                            full_session_id = sid
-                            break
-
-                    if full_session_id:
-                        session_details = sessions[full_session_id]
+                    session_details = store.get_session(selected_session)
 
+                    if session_details:
                         col1, col2 = st.columns(2)
 
                         with col1:
                             st.markdown("**📋 Informations de session**")
                             st.write(f"**Visiteur :** {session_details['visitor_id']}")
-                            st.write(f"**Début :** {session_details['start_time']}")
-                            st.write(f"**Fin :** {session_details['end_time']}")
-                            st.write(f"**Durée totale :** {session_details['duration']}")
+                            st.write(f"**Début :** {format_timestamp(session_details['start_time'])}")
+                            st.write(f"**Fin :** {format_timestamp(session_details['end_time'])}")
+                            st.write(f"**Durée totale :** {format_duration(session_details['duration_seconds'])}")
                             st.write(f"**Pages visitées :** {session_details['total_page_views']}")
 
                         with col2:
@@ -879,7 +866,7 @@ def admin_panel():
                             if session_details.get("page_views"):
                                 for i, page_view in enumerate(session_details["page_views"], 1):
                                     page_name = page_view["page"]
-                                    timestamp = page_view["timestamp"]
+                                    timestamp = format_timestamp(page_view["timestamp"])
                                     project = page_view.get("project_key", "")
 
                                     if project:
@@ -893,53 +880,43 @@ def admin_panel():
             st.markdown("---")
             st.markdown("**📈 Statistiques des sessions**")
 
-            if sessions:
-                total_sessions = len(sessions)
+            total_sessions = session_stats["total_sessions"]
+            valid_sessions = session_stats["timed_sessions"]
 
-                # Calculer durée moyenne
-                total_seconds = 0
-                valid_sessions = 0
+            if valid_sessions > 0:
+                avg_seconds = session_stats["total_seconds"] // valid_sessions
+                avg_minutes = avg_seconds // 60
+                avg_seconds_remainder = avg_seconds % 60
 
-                for session_info in sessions.values():
-                    duration_str = session_info.get("duration", "0s")
-                    try:
-                        if "h" in duration_str:
-                            parts = duration_str.replace("h", "").replace("m", "").replace("s", "").split()
-                            if len(parts) >= 3:
-                                total_seconds += int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                                valid_sessions += 1
-                        elif "m" in duration_str:
-                            parts = duration_str.replace("m", "").replace("s", "").split()
-                            if len(parts) >= 2:
-                                total_seconds += int(parts[0]) * 60 + int(parts[1])
-                                valid_sessions += 1
-                        elif "s" in duration_str:
-                            seconds = int(duration_str.replace("s", ""))
-                            total_seconds += seconds
-                            valid_sessions += 1
-                    except:
-                        continue
+                col_stat1, col_stat2, col_stat3 = st.columns(3)
 
-                if valid_sessions > 0:
-                    avg_seconds = total_seconds // valid_sessions
-                    avg_minutes = avg_seconds // 60
-                    avg_seconds_remainder = avg_seconds % 60
+                with col_stat1:
+                    st.metric("🕐 Durée moyenne", f"{avg_minutes}m {avg_seconds_remainder}s")
 
-                    col_stat1, col_stat2, col_stat3 = st.columns(3)
+                with col_stat2:
+                    avg_pages = session_stats["total_page_views"] / total_sessions
+                    st.metric("📄 Pages/session", f"{avg_pages:.1f}")
 
-                    with col_stat1:
-                        st.metric("🕐 Durée moyenne", f"{avg_minutes}m {avg_seconds_remainder}s")
+                with col_stat3:
+                    st.metric("📊 Sessions totales", total_sessions)
 
-                    with col_stat2:
-                        avg_pages = sum(s.get("total_page_views", 0) for s in sessions.values()) / len(sessions)
-                        st.metric("📄 Pages/session", f"{avg_pages:.1f}")
+                # Distribution des durées, calculée sur les colonnes des sessions
+                percentiles, histogram = store.session_distribution()
+                if percentiles:
+                    col_p50, col_p90, col_p99 = st.columns(3)
+                    for column, percentile in ((col_p50, 50), (col_p90, 90), (col_p99, 99)):
+                        with column:
+                            st.metric(f"⏳ Durée p{percentile}", format_duration(percentiles[percentile]))
 
-                    with col_stat3:
-                        st.metric("📊 Sessions totales", total_sessions)
+                    st.markdown("**📊 Répartition des durées de session**")
+                    st.bar_chart(
+                        {"Durée": [label for label, _ in histogram], "Sessions": [count for _, count in histogram]},
+                        x="Durée", y="Sessions"
+                    )
         else:
             st.info("Aucune session enregistrée pour le moment")
 
-    with tab2:
+    with tab2, timed("Onglet Profil"):
         st.markdown("### Configuration du Profil")
 
         col1, col2 = st.columns(2)
@@ -960,12 +937,10 @@ def admin_panel():
 
             if profile_upload:
                 # Sauvegarder l'image
-                saved_path = save_uploaded_file(profile_upload, IMAGES_FOLDER)
-                if saved_path:
-                    base64_image = image_to_base64(saved_path)
-                    if base64_image:
-                        config["profile"]["profile_image"] = base64_image
-                        st.success("✅ Image sauvegardée !")
+                media_ref = save_uploaded_file(profile_upload)
+                if media_ref:
+                    config["profile"]["profile_image"] = media_ref
+                    st.success("✅ Image sauvegardée !")
 
             # Option URL alternative
             config["profile"]["profile_image"] = st.text_input(
@@ -987,14 +962,14 @@ def admin_panel():
             )
 
             if cv_upload:
-                saved_cv_path = save_uploaded_file(cv_upload, UPLOAD_FOLDER)
-                if saved_cv_path:
-                    # Créer un lien vers le fichier local
-                    config["profile"]["resume_link"] = saved_cv_path
+                cv_ref = save_uploaded_file(cv_upload)
+                if cv_ref:
+                    # Lien vers le fichier servi par le stockage de médias
+                    config["profile"]["resume_link"] = cv_ref
                     st.success("✅ CV sauvegardé !")
 
                     # Aperçu du CV
-                    with open(saved_cv_path, "rb") as pdf_file:
+                    with open(media_source(cv_ref), "rb") as pdf_file:
                         pdf_bytes = pdf_file.read()
                         st.download_button(
                             label="📄 Télécharger le CV uploadé",
@@ -1025,12 +1000,10 @@ def admin_panel():
             )
 
             if linkedin_icon_upload:
-                saved_path = save_uploaded_file(linkedin_icon_upload, IMAGES_FOLDER)
-                if saved_path:
-                    base64_icon = image_to_base64(saved_path)
-                    if base64_icon:
-                        config["profile"]["linkedin_icon"] = base64_icon
-                        st.success("✅ Icône LinkedIn sauvegardée !")
+                media_ref = save_uploaded_file(linkedin_icon_upload)
+                if media_ref:
+                    config["profile"]["linkedin_icon"] = media_ref
+                    st.success("✅ Icône LinkedIn sauvegardée !")
 
             # Option URL/émoji alternatif
             config["profile"]["linkedin_icon"] = st.text_input(
@@ -1043,10 +1016,9 @@ def admin_panel():
 
             # Aperçu de l'icône LinkedIn
             if config["profile"].get("linkedin_icon"):
-                if config["profile"]["linkedin_icon"].startswith("http") or config["profile"][
-                    "linkedin_icon"].startswith("data:"):
+                if is_image_source(config["profile"]["linkedin_icon"]):
                     try:
-                        st.image(config["profile"]["linkedin_icon"], caption="Aperçu LinkedIn", width=40)
+                        st.image(media_source(config["profile"]["linkedin_icon"], 40), caption="Aperçu LinkedIn", width=40)
                     except:
                         st.write(f"Icône LinkedIn: {config['profile']['linkedin_icon']}")
                 else:
@@ -1062,12 +1034,10 @@ def admin_panel():
             )
 
             if github_icon_upload:
-                saved_path = save_uploaded_file(github_icon_upload, IMAGES_FOLDER)
-                if saved_path:
-                    base64_icon = image_to_base64(saved_path)
-                    if base64_icon:
-                        config["profile"]["github_icon"] = base64_icon
-                        st.success("✅ Icône GitHub sauvegardée !")
+                media_ref = save_uploaded_file(github_icon_upload)
+                if media_ref:
+                    config["profile"]["github_icon"] = media_ref
+                    st.success("✅ Icône GitHub sauvegardée !")
 
             # Option URL/émoji alternatif
             config["profile"]["github_icon"] = st.text_input(
@@ -1080,10 +1050,9 @@ def admin_panel():
 
             # Aperçu de l'icône GitHub
             if config["profile"].get("github_icon"):
-                if config["profile"]["github_icon"].startswith("http") or config["profile"]["github_icon"].startswith(
-                        "data:"):
+                if is_image_source(config["profile"]["github_icon"]):
                     try:
-                        st.image(config["profile"]["github_icon"], caption="Aperçu GitHub", width=40)
+                        st.image(media_source(config["profile"]["github_icon"], 40), caption="Aperçu GitHub", width=40)
                     except:
                         st.write(f"Icône GitHub: {config['profile']['github_icon']}")
                 else:
@@ -1093,11 +1062,12 @@ def admin_panel():
         if config["profile"]["profile_image"] and config["profile"][
             "profile_image"] != "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==":
             try:
-                st.image(config["profile"]["profile_image"], caption="Aperçu de l'image de profil", width=150)
+                st.image(media_source(config["profile"]["profile_image"], 150), caption="Aperçu de l'image de profil",
+                         width=150)
             except:
                 st.warning("⚠️ Image invalide")
 
-    with tab3:
+    with tab3, timed("Onglet Statistiques"):
         st.markdown("### Configuration des Statistiques")
 
         for i, stat in enumerate(config["stats"]):
@@ -1119,12 +1089,10 @@ def admin_panel():
                 )
 
                 if icon_upload:
-                    saved_path = save_uploaded_file(icon_upload, IMAGES_FOLDER)
-                    if saved_path:
-                        base64_icon = image_to_base64(saved_path)
-                        if base64_icon:
-                            config["stats"][i]["icon"] = base64_icon
-                            st.success("✅ Icône sauvegardée !")
+                    media_ref = save_uploaded_file(icon_upload)
+                    if media_ref:
+                        config["stats"][i]["icon"] = media_ref
+                        st.success("✅ Icône sauvegardée !")
 
             with col4:
                 # Option émoji/URL alternative
@@ -1141,9 +1109,9 @@ def admin_panel():
 
             # Aperçu de l'icône
             if stat["icon"]:
-                if stat["icon"].startswith("http") or stat["icon"].startswith("data:"):
+                if is_image_source(stat["icon"]):
                     try:
-                        st.image(stat["icon"], caption=f"Aperçu icône {i + 1}", width=50)
+                        st.image(media_source(stat["icon"], 50), caption=f"Aperçu icône {i + 1}", width=50)
                     except:
                         st.write(f"Icône: {stat['icon']}")
                 else:
@@ -1178,7 +1146,7 @@ def admin_panel():
                     else:
                         st.error("❌ Erreur lors de la sauvegarde")
 
-    with tab4:
+    with tab4, timed("Onglet À propos"):
         st.markdown("### Configuration À propos")
 
         config["about"]["description"] = st.text_area("Description principale", value=config["about"]["description"],
@@ -1222,7 +1190,7 @@ def admin_panel():
 
         config["about"]["conclusion"] = st.text_area("Conclusion", value=config["about"]["conclusion"], height=100)
 
-    with tab5:
+    with tab5, timed("Onglet Compétences"):
         st.markdown("### Configuration des Compétences")
 
         for i, skill in enumerate(config["skills"]):
@@ -1247,7 +1215,7 @@ def admin_panel():
             else:
                 st.error("❌ Erreur lors de la sauvegarde")
 
-    with tab6:
+    with tab6, timed("Onglet Projets"):
         st.markdown("### Gestion des Projets")
 
         # Liste des projets
@@ -1310,19 +1278,17 @@ def admin_panel():
                 )
 
                 if uploaded_images:
-                    for uploaded_img in uploaded_images:
-                        saved_path = save_uploaded_file(uploaded_img, IMAGES_FOLDER)
-                        if saved_path:
-                            base64_img = image_to_base64(saved_path)
-                            if base64_img and base64_img not in project["presentation_images"]:
-                                project["presentation_images"].append(base64_img)
+                    # Lot traité en parallèle ; référence par contenu : un doublon donne la même référence
+                    for media_ref in ingest_uploads(uploaded_images):
+                        if media_ref and media_ref not in project["presentation_images"]:
+                            project["presentation_images"].append(media_ref)
                     st.success(f"✅ {len(uploaded_images)} image(s) ajoutée(s) !")
 
                 # Gestion des images existantes
                 for i, img_url in enumerate(project["presentation_images"]):
                     col_img, col_btn = st.columns([4, 1])
                     with col_img:
-                        st.image(img_url, caption=f"Image {i + 1}", width=100)
+                        st.image(media_source(img_url, 100), caption=f"Image {i + 1}", width=100)
                     with col_btn:
                         if st.button("🗑️", key=f"del_img_{selected_project}_{i}"):
                             project["presentation_images"].pop(i)
@@ -1343,15 +1309,13 @@ def admin_panel():
                     )
 
                     if video_upload:
-                        saved_video_path = save_uploaded_file(video_upload, VIDEOS_FOLDER)
-                        if saved_video_path:
-                            project["local_video"] = saved_video_path
+                        video_ref = save_uploaded_file(video_upload)
+                        if video_ref:
+                            project["local_video"] = video_ref
                             st.success("✅ Vidéo sauvegardée !")
 
                             # Aperçu vidéo locale
-                            with open(saved_video_path, "rb") as video_file:
-                                video_bytes = video_file.read()
-                                st.video(video_bytes)
+                            video_player(video_ref)
 
                 with col_vid2:
                     # Option 2: ID YouTube
@@ -1403,6 +1367,46 @@ def admin_panel():
                         st.success("✅ Projet supprimé !")
                         st.rerun()
 
+    with tab7:
+        st.markdown("### 🚀 Performance du rendu")
+        st.caption("Mesures du processus courant, sur les 512 derniers appels de chaque fonction")
+
+        reruns = rerun_stats()
+        if reruns:
+            st.markdown(f"**🔁 Reruns mesurés : {reruns['reruns']}**")
+            col_duration, col_read, col_written = st.columns(3)
+            with col_duration:
+                st.metric("⏱️ Rerun p50 / p95", f"{reruns['duration'][50]:.0f} / {reruns['duration'][95]:.0f} ms")
+            with col_read:
+                st.metric("📥 Lu par rerun (p50 / p95)",
+                          f"{reruns['read'][50] / 1024:.1f} / {reruns['read'][95] / 1024:.1f} Ko")
+            with col_written:
+                st.metric("📤 Écrit par rerun (p50 / p95)",
+                          f"{reruns['written'][50] / 1024:.1f} / {reruns['written'][95] / 1024:.1f} Ko")
+            st.caption(
+                f"Dernier rerun : {reruns['last']['duration']:.0f} ms, {reruns['last']['read'] / 1024:.1f} Ko lus, "
+                f"{reruns['last']['written'] / 1024:.1f} Ko écrits — hors reruns (écriture différée, compaction) : "
+                f"{reruns['background']['read'] / 1024:.1f} Ko lus, {reruns['background']['written'] / 1024:.1f} Ko écrits"
+            )
+
+        timings = timing_stats()
+        if timings:
+            st.markdown("**⏱️ Temps par fonction (ms)**")
+            st.dataframe([{
+                "Fonction": entry["name"],
+                "Appels": entry["calls"],
+                "p50": round(entry["p50"], 2),
+                "p95": round(entry["p95"], 2),
+                "p99": round(entry["p99"], 2),
+                "Dernier": round(entry["last"], 2)
+            } for entry in timings], use_container_width=True)
+        else:
+            st.info("Aucune mesure pour le moment")
+
+        if st.button("🔄 Réinitialiser les mesures"):
+            reset_timings()
+            st.rerun()
+
     # Bouton de sauvegarde
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -1414,9 +1418,8 @@ def admin_panel():
                 st.error("❌ Erreur lors de la sauvegarde")
 
 
-def main_page():
-    """Page principale du portfolio"""
-    config = load_config()
+def build_main_page(config):
+    """HTML de l'en-tête et de la barre de statistiques"""
     profile = config["profile"]
 
     # En-tête principal avec layout exact comme l'image
@@ -1424,41 +1427,41 @@ def main_page():
     github_icon = profile.get("github_icon", "🔗")
 
     # Gestion des icônes sociales
-    if linkedin_icon.startswith("http") or linkedin_icon.startswith("data:"):
-        linkedin_display = f'<img src="{linkedin_icon}" style="width: 20px; height: 20px;">'
+    if is_image_source(linkedin_icon):
+        linkedin_display = f'<img src="{media_url(linkedin_icon, 20)}" style="width: 20px; height: 20px;">'
     else:
         linkedin_display = linkedin_icon
 
-    if github_icon.startswith("http") or github_icon.startswith("data:"):
-        github_display = f'<img src="{github_icon}" style="width: 20px; height: 20px;">'
+    if is_image_source(github_icon):
+        github_display = f'<img src="{media_url(github_icon, 20)}" style="width: 20px; height: 20px;">'
     else:
         github_display = github_icon
 
-    st.markdown(f"""
+    header_html = f"""
     <div class="header-container">
         <div class="intro-text">
             <div class="id-number">{profile['id_number']}</div>
             <div class="greeting">{profile['greeting']}</div>
             <h1>{profile['name']}</h1>
             <h2>{profile['title']}</h2>
-            <a href="{profile['resume_link']}" class="resume-button"> CV ↓</a>
+            <a href="{media_url(profile['resume_link'])}" class="resume-button"> CV ↓</a>
             <div class="social-icons">
                 <a href="{profile['linkedin_url']}" class="social-icon linkedin" title="LinkedIn">{linkedin_display}</a>
                 <a href="{profile['github_url']}" class="social-icon github" title="GitHub">{github_display}</a>
             </div>
         </div>
         <div class="profile-image-container">
-            <img src="{profile['profile_image']}" class="profile-image" alt="Profile">
+            <img src="{media_url(profile['profile_image'], 350)}" class="profile-image" alt="Profile">
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
 
     # Barre de statistiques avec components.html pour garantir le rendu
     stats_items = ""
     for stat in config["stats"]:
         # Gestion des icônes (émoji ou image uploadée)
-        if stat["icon"].startswith("http") or stat["icon"].startswith("data:"):
-            icon_display = f'<img src="{stat["icon"]}" style="width: 20px; height: 20px;">'
+        if is_image_source(stat["icon"]):
+            icon_display = f'<img src="{media_url(stat["icon"], 20)}" style="width: 20px; height: 20px;">'
         else:
             icon_display = stat["icon"]
 
@@ -1543,54 +1546,74 @@ def main_page():
         </div>
     </div>
     """
+    return header_html, stats_html
+
+
+@timed("main_page")
+def main_page(config):
+    """Page principale du portfolio"""
+    header_html, stats_html = cached_fragment(config, "main_page", build_main_page)
+    st.markdown(header_html, unsafe_allow_html=True)
 
     # Utiliser components.html pour garantir le rendu HTML
     components.html(stats_html, height=200)
 
 
-def about_section():
-    """Section À propos"""
-    config = load_config()
+def build_about_section(config):
+    """HTML de la description, des listes d'outils et d'expertises et de la conclusion"""
     about = config["about"]
 
-    st.markdown('<div class="about-section">', unsafe_allow_html=True)
-    st.markdown(
-        '<h2 style="text-align: center; color: #333; margin-bottom: 2rem;">À propos <span style="color: #667eea;">De moi</span></h2>',
-        unsafe_allow_html=True)
-    st.markdown('<div style="max-width: 800px; margin: 0 auto;">', unsafe_allow_html=True)
-
-    st.markdown(f"""
+    description_html = f"""
     <p style="text-align: center; color: #666; line-height: 1.6; margin-bottom: 2rem;">
         {about['description']}
     </p>
-    """, unsafe_allow_html=True)
+    """
 
-    st.markdown('<h3 style="color: #333; margin-bottom: 1rem;">Outils et technologies:</h3>', unsafe_allow_html=True)
     tools_html = '<ul style="color: #666; line-height: 1.8;">'
     for tool in about['tools']:
         tools_html += f'<li>{tool}</li>'
     tools_html += '</ul>'
-    st.markdown(tools_html, unsafe_allow_html=True)
 
-    st.markdown('<h3 style="color: #333; margin: 2rem 0 1rem 0;">Domaines d\'expertise:</h3>', unsafe_allow_html=True)
     expertise_html = '<ul style="color: #666; line-height: 1.8;">'
     for exp in about['expertise']:
         expertise_html += f'<li>{exp}</li>'
     expertise_html += '</ul>'
-    st.markdown(expertise_html, unsafe_allow_html=True)
 
-    st.markdown(f"""
+    conclusion_html = f"""
     <p style="text-align: center; color: #666; line-height: 1.6; margin-top: 2rem; font-style: italic;">
         {about['conclusion']}
     </p>
-    """, unsafe_allow_html=True)
+    """
+    return description_html, tools_html, expertise_html, conclusion_html
+
+
+@timed("about_section")
+def about_section(config):
+    """Section À propos"""
+    description_html, tools_html, expertise_html, conclusion_html = cached_fragment(
+        config, "about_section", build_about_section)
+
+    st.markdown('<div class="about-section">', unsafe_allow_html=True)
+    st.markdown(
+        '<h2 style="text-align: center; color: #333; margin-bottom: 2rem;">À propos <span style="color: #667eea;">De moi</span></h2>',
+        unsafe_allow_html=True)
+    st.markdown('<div style="max-width: 800px; margin: 0 auto;">', unsafe_allow_html=True)
+
+    st.markdown(description_html, unsafe_allow_html=True)
+
+    st.markdown('<h3 style="color: #333; margin-bottom: 1rem;">Outils et technologies:</h3>', unsafe_allow_html=True)
+    st.markdown(tools_html, unsafe_allow_html=True)
+
+    st.markdown('<h3 style="color: #333; margin: 2rem 0 1rem 0;">Domaines d\'expertise:</h3>', unsafe_allow_html=True)
+    st.markdown(expertise_html, unsafe_allow_html=True)
+
+    st.markdown(conclusion_html, unsafe_allow_html=True)
 
     st.markdown('</div></div>', unsafe_allow_html=True)
 
 
-def skills_section():
-    """Section compétences"""
-    config = load_config()
+def build_skills_section(config):
+    """HTML du titre et des badges de compétences"""
     skills = config["skills"]
 
     skills_html = '''
@@ -1600,27 +1623,20 @@ def skills_section():
     for skill in skills:
         skills_html += f'<div class="skill-badge">{skill}</div>'
     skills_html += '</div>'
+    return skills_html
 
-    st.markdown(skills_html, unsafe_allow_html=True)
-
-
-def projects_section():
-    """Section projets"""
-    config = load_config()
-    projects = config["projects"]
 
-    st.markdown("""
-    <h2 style="text-align: center; color: #333; margin: 3rem 0 2rem 0;">Mes <span style="color: #667eea;">Projets</span></h2>
-    """, unsafe_allow_html=True)
+@timed("skills_section")
+def skills_section(config):
+    """Section compétences"""
+    st.markdown(cached_fragment(config, "skills_section", build_skills_section), unsafe_allow_html=True)
 
-    # Affichage des projets (3 par ligne)
-    project_items = list(projects.items())
-    cols = st.columns(3)
 
-    for i, (project_key, project) in enumerate(project_items):
-        col_idx = i % 3
-        with cols[col_idx]:
-            st.markdown(f"""
+def build_project_cards(config):
+    """HTML de la carte de chaque projet : liste de (clé du projet, HTML)"""
+    cards = []
+    for project_key, project in config["projects"].items():
+        cards.append((project_key, f"""
             <div class="project-card">
                 <div style="background: {project['card_gradient']}; height: 150px; border-radius: 10px; margin-bottom: 1rem; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold; font-size: 1.2rem;">
                     {project['card_label']}
@@ -1631,21 +1647,39 @@ def projects_section():
                     {project['description'][:150]}...
                 </p>
             </div>
-            """, unsafe_allow_html=True)
+            """))
+    return cards
+
+
+@timed("projects_section")
+def projects_section(config):
+    """Section projets"""
+    project_cards = cached_fragment(config, "project_cards", build_project_cards)
+
+    st.markdown("""
+    <h2 style="text-align: center; color: #333; margin: 3rem 0 2rem 0;">Mes <span style="color: #667eea;">Projets</span></h2>
+    """, unsafe_allow_html=True)
+
+    # Affichage des projets (3 par ligne)
+    cols = st.columns(3)
+
+    for i, (project_key, card_html) in enumerate(project_cards):
+        col_idx = i % 3
+        with cols[col_idx]:
+            st.markdown(card_html, unsafe_allow_html=True)
 
             # Bouton corrigé avec clé unique et gestion directe
             button_key = f"see_work_{project_key}_{i}"
             if st.button("Voir Mon Travail", key=button_key):
                 # Forcer la mise à jour immédiate des états
-                st.session_state.current_page = "project_detail"
-                st.session_state.selected_project = project_key
+                navigate("project_detail", project_key)
                 # Forcer le rechargement immédiat
                 st.rerun()
 
 
-def project_detail_page():
+@timed("project_detail_page")
+def project_detail_page(config):
     """Page de détail d'un projet"""
-    config = load_config()
     projects = config["projects"]
 
     project_key = st.session_state.get("selected_project", list(projects.keys())[0])
@@ -1657,7 +1691,7 @@ def project_detail_page():
 
     # Bouton retour
     if st.button("← Retour au portfolio"):
-        st.session_state.current_page = "main"
+        navigate("main")
         st.rerun()
 
     # Titre principal
@@ -1710,7 +1744,7 @@ def project_detail_page():
 
             # Image actuelle
             st.image(
-                project['presentation_images'][current_index],
+                media_source(project['presentation_images'][current_index], CAROUSEL_WIDTH),
                 use_container_width=True,
                 caption=f"Image {current_index + 1} sur {total_images}"
             )
@@ -1762,11 +1796,13 @@ def project_detail_page():
         st.markdown("### Video du Projet")
 
         # Priorité à la vidéo locale si elle existe
-        if project.get("local_video") and os.path.exists(project["local_video"]):
+        local_video = project.get("local_video")
+        if is_ref(local_video) and os.path.exists(media_path(local_video)):
+            video_player(local_video)
+        elif local_video and os.path.exists(local_video):
+            # Chemin d'un upload antérieur au stockage de médias (voir `python media_store.py migrate`)
             try:
-                with open(project["local_video"], "rb") as video_file:
-                    video_bytes = video_file.read()
-                    st.video(video_bytes)
+                st.video(local_video)
             except:
                 st.error("⚠️ Erreur lors du chargement de la vidéo locale")
         # Sinon afficher YouTube si disponible
@@ -1791,39 +1827,43 @@ if "current_page" not in st.session_state:
 if "admin_logged_in" not in st.session_state:
     st.session_state.admin_logged_in = False
 
-# Navigation principale
-if st.session_state.current_page == "main":
-    # Bouton d'accès admin (discret)
-    if st.sidebar.button("🔐 Admin"):
-        st.session_state.current_page = "admin"
-        st.rerun()
+# Navigation principale, mesurée rerun par rerun (durée, octets lus/écrits)
+with rerun():
+    # Une seule lecture (un stat) de la configuration par rerun, passée aux sections
+    config = load_config()
+
+    if st.session_state.current_page == "main":
+        # Bouton d'accès admin (discret)
+        if st.sidebar.button("🔐 Admin"):
+            navigate("admin")
+            st.rerun()
 
-    # Tracker la visite de la page principale
-    track_visit("portfolio")
+        # Tracker la visite de la page principale (une fois par navigation)
+        track_visit("portfolio")
 
-    main_page()
-    about_section()
-    skills_section()
-    projects_section()
+        main_page(config)
+        about_section(config)
+        skills_section(config)
+        projects_section(config)
 
-elif st.session_state.current_page == "project_detail":
-    # Bouton d'accès admin (discret)
-    if st.sidebar.button("🔐 Admin"):
-        st.session_state.current_page = "admin"
-        st.rerun()
+    elif st.session_state.current_page == "project_detail":
+        # Bouton d'accès admin (discret)
+        if st.sidebar.button("🔐 Admin"):
+            navigate("admin")
+            st.rerun()
 
-    # Tracker la visite de la page projet
-    selected_project = st.session_state.get("selected_project")
-    track_visit("project_details", selected_project)
+        # Tracker la visite de la page projet (pas les reruns du carrousel)
+        selected_project = st.session_state.get("selected_project")
+        track_visit("project_details", selected_project)
 
-    project_detail_page()
+        project_detail_page(config)
 
-elif st.session_state.current_page == "admin":
-    if not st.session_state.admin_logged_in:
-        admin_login()
-    else:
-        admin_panel()
+    elif st.session_state.current_page == "admin":
+        if not st.session_state.admin_logged_in:
+            admin_login()
+        else:
+            admin_panel(config)
 
-# Hook pour terminer la session quand l'utilisateur quitte (optionnel)
-# Note: Ce code s'exécute à chaque interaction, mais la session se termine naturellement
-# quand l'utilisateur ferme l'onglet ou navigue ailleurs
\ No newline at end of file
+# Fin de session : chaque visite repousse l'échéance d'inactivité de la session ;
+# le balayeur de analytics_sessions la clôt et l'enregistre quand l'utilisateur
+# ferme l'onglet ou cesse d'interagir
\ No newline at end of file
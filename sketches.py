@@ -0,0 +1,116 @@
+"""Sketches probabilistes à taille fixe pour les analytics à fort trafic.
+
+- ``HyperLogLog`` estime un nombre d'éléments distincts (visiteurs uniques)
+  avec 2^precision registres d'un octet, quel que soit le trafic. Erreur
+  relative type : 1.04 / sqrt(2^precision), soit ~1.6 % pour precision=12.
+  Deux sketches se fusionnent (max des registres) : l'union de 7 sketches
+  quotidiens donne les uniques de la semaine.
+- ``SpaceSaving`` suit les ``capacity`` éléments les plus fréquents (top
+  projets). Chaque compteur surestime au plus de son ``error`` : la vraie
+  valeur est dans ``[count - error, count]``.
+
+Les deux se sérialisent en JSON (``to_json`` / ``from_json``).
+"""
+import base64
+import hashlib
+import heapq
+import math
+import zlib
+
+HLL_PRECISION = 12
+SPACE_SAVING_CAPACITY = 50
+
+
+def _hash64(item):
+    return int.from_bytes(hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Estimateur de cardinalité HyperLogLog"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, item):
+        """Ajouter un élément (idempotent)"""
+        x = _hash64(item)
+        index = x >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rank = rest_bits - (x & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Union avec un autre sketch de même précision (en place)"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Nombre estimé d'éléments distincts"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Petites cardinalités : comptage linéaire, plus précis
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        """Erreur relative type (un écart-type)"""
+        return 1.04 / math.sqrt(self.size)
+
+    def to_json(self):
+        registers = base64.b64encode(zlib.compress(bytes(self.registers))).decode("ascii")
+        return {"p": self.precision, "registers": registers}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["p"], zlib.decompress(base64.b64decode(data["registers"])))
+
+
+class SpaceSaving:
+    """Top-K approché en mémoire fixe (algorithme Space-Saving)"""
+
+    def __init__(self, capacity=SPACE_SAVING_CAPACITY, counters=None, total=0):
+        self.capacity = capacity
+        # élément -> [compte estimé, surestimation maximale]
+        self.counters = counters if counters is not None else {}
+        self.total = total
+
+    def add(self, item, count=1):
+        """Compter count occurrences de item"""
+        self.total += count
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            # L'élément le moins compté cède sa place ; son compte devient la
+            # borne d'erreur du nouvel arrivant
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + count, floor]
+
+    def top(self, limit=10):
+        """Éléments les plus fréquents : liste de (élément, compte estimé, erreur max)"""
+        return heapq.nlargest(
+            limit, ((item, count, error) for item, (count, error) in self.counters.items()),
+            key=lambda entry: entry[1]
+        )
+
+    @property
+    def error_bound(self):
+        """Surestimation maximale de n'importe quel compteur (total / capacité)"""
+        return self.total // self.capacity
+
+    def to_json(self):
+        return {"capacity": self.capacity, "total": self.total, "counters": self.counters}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["capacity"], {item: list(counter) for item, counter in data["counters"].items()},
+                   data["total"])
@@ -0,0 +1,98 @@
+"""Écritures atomiques et verrous de fichiers pour la configuration et les analytics.
+
+Les fichiers JSON sont écrits dans un fichier temporaire du même dossier,
+synchronisés sur disque (fsync) puis renommés sur la cible : un lecteur voit
+toujours l'ancienne ou la nouvelle version complète, jamais un fichier tronqué.
+
+Les verrous ``flock`` portent sur un fichier ``.lock`` dédié et chaque
+acquisition ouvre son propre descripteur : ils excluent donc aussi bien les
+threads d'un même processus (une session Streamlit = un thread) que plusieurs
+processus derrière un load balancer. Sans ``fcntl`` (Windows), un verrou de
+thread par fichier prend le relais.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+
+from perf import count_written
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(lock_path):
+    key = os.path.abspath(lock_path)
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.RLock()
+        return _thread_locks[key]
+
+
+@contextlib.contextmanager
+def file_lock(lock_path, shared=False):
+    """Verrou exclusif (ou partagé) entre threads et processus sur lock_path"""
+    if fcntl is None:
+        with _thread_lock(lock_path):
+            yield
+        return
+
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fsync_directory(path):
+    """Rendre durable un renommage dans le dossier de path (POSIX uniquement)"""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path, data):
+    """Écrire data dans path via fichier temporaire + fsync + rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(path)
+    count_written(len(data))
+
+
+def atomic_write_json(path, data, indent=2):
+    """Sérialiser data en JSON et l'écrire atomiquement dans path"""
+    atomic_write_bytes(path, json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8"))
+
+
+def append_durable(path, data):
+    """Ajouter des octets à la fin de path et les synchroniser sur disque"""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    count_written(len(data))
@@ -0,0 +1,225 @@
+"""Jeux de données synthétiques pour les benchmarks.
+
+``generate_analytics`` écrit un ``portfolio_analytics.json`` (schéma v2)
+cohérent : visiteurs, sessions avec leur parcours, agrégats quotidiens et
+horaires, totaux par visiteur. Le fichier est écrit entrée par entrée : les
+sessions sont tirées deux fois de suite du même générateur pseudo-aléatoire
+(même graine), une fois pour les agrégats, une fois pour l'écriture. Seuls
+quelques tableaux d'entiers par visiteur restent en mémoire, ce qui permet
+d'atteindre le million de sessions.
+
+``generate_config`` écrit un ``portfolio_config.json`` de N projets dont les
+images de présentation sont intégrées en base64, comme celles uploadées
+depuis l'admin (contenu aléatoire : seule la taille compte).
+
+    python benchmark.py generate --size 100k --projects 100 --dir bench_data
+"""
+import base64
+import json
+import os
+import random
+import time
+from array import array
+from datetime import datetime
+
+from analytics_store import SCHEMA_VERSION, empty_session_stats, format_timestamp
+from storage import atomic_write_json
+
+# Tailles prédéfinies : nombre de visiteurs et de sessions
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PROJECT_COUNTS = (3, 100, 1000)
+
+PAGE_BITS = {"portfolio": 1, "project_details": 2}
+
+
+def project_key(index):
+    return f"project_{index:04d}"
+
+
+def visitor_key(index):
+    # Même longueur que les identifiants réels (8 caractères hexadécimaux), sans collision
+    return f"{index:08x}"
+
+
+def _iter_sessions(visitors, sessions, projects, days, seed, end):
+    """Sessions déterministes : (index, visiteur, début, fin, [(page, ts, projet)])
+
+    Les débuts sont répartis sur `days` jours, un créneau distinct par session ;
+    chaque visiteur reçoit au moins une session (sessions consécutives d'un même
+    visiteur)."""
+    rng = random.Random(seed)
+    span = days * 86400
+    first = end - span
+    slot = span / sessions
+    for index in range(sessions):
+        start = first + int(index * slot) + rng.randrange(max(1, int(slot)))
+        visitor = index * visitors // sessions
+        page_count = 1 + min(int(rng.expovariate(0.5)), 30)
+        gap = rng.randint(5, 90)
+        page_views = [("portfolio", start, None)]
+        for position in range(1, page_count):
+            if rng.random() < 0.8:
+                # Popularité des projets très concentrée (loi de Pareto)
+                project = min(int(rng.paretovariate(1.16)) - 1, projects - 1)
+                page_views.append(("project_details", start + position * gap, project_key(project)))
+            else:
+                page_views.append(("portfolio", start + position * gap, None))
+        end_time = page_views[-1][1] + rng.randint(5, 120)
+        yield index, visitor, start, end_time, page_views
+
+
+def _write_entry(f, key, value, first):
+    """Écrire une entrée d'objet JSON indentée comme atomic_write_json (indent=2)"""
+    if not first:
+        f.write(",\n")
+    f.write(f"    {json.dumps(key)}: " + json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+
+
+def generate_analytics(path, visitors, sessions=None, projects=3, days=90, seed=0, end=None):
+    """Écrire un snapshot d'analytics synthétique ; retourne le nombre de visites"""
+    sessions = sessions or visitors
+    if sessions < visitors:
+        raise ValueError("Il faut au moins une session par visiteur")
+    end = int(end or time.time())
+    args = (visitors, sessions, projects, days, seed, end)
+
+    # Passe 1 : agrégats globaux et par visiteur
+    first_visit = array("q", [0]) * visitors
+    last_visit = array("q", [0]) * visitors
+    last_seen = array("q", [0]) * visitors
+    total_visits = array("q", [0]) * visitors
+    total_seconds = array("q", [0]) * visitors
+    session_count = array("q", [0]) * visitors
+    pages_seen = array("b", [0]) * visitors
+    starts = array("q", [0]) * sessions
+    rollups = {key: {} for key in ("daily_visits", "hourly_visits", "page_views", "project_views",
+                                   "daily_page_views", "daily_project_views")}
+    buckets = {}
+    visit_count = 0
+    for index, visitor, start, end_time, page_views in _iter_sessions(*args):
+        starts[index] = start
+        if not session_count[visitor]:
+            first_visit[visitor] = start
+        session_count[visitor] += 1
+        total_seconds[visitor] += end_time - start
+        last_seen[visitor] = max(last_seen[visitor], end_time)
+        for page, ts, project in page_views:
+            hour_start = ts - ts % 3600
+            keys = buckets.get(hour_start)
+            if keys is None:
+                moment = datetime.fromtimestamp(hour_start)
+                keys = buckets[hour_start] = (moment.strftime("%Y-%m-%d"), moment.strftime("%Y-%m-%d %H"))
+            day, hour = keys
+            visit_count += 1
+            total_visits[visitor] += 1
+            last_visit[visitor] = ts
+            pages_seen[visitor] |= PAGE_BITS[page]
+            rollups["daily_visits"][day] = rollups["daily_visits"].get(day, 0) + 1
+            rollups["hourly_visits"][hour] = rollups["hourly_visits"].get(hour, 0) + 1
+            rollups["page_views"][page] = rollups["page_views"].get(page, 0) + 1
+            day_pages = rollups["daily_page_views"].setdefault(day, {})
+            day_pages[page] = day_pages.get(page, 0) + 1
+            if project:
+                rollups["project_views"][project] = rollups["project_views"].get(project, 0) + 1
+                day_projects = rollups["daily_project_views"].setdefault(day, {})
+                day_projects[project] = day_projects.get(project, 0) + 1
+
+    def session_id(index):
+        return f"{visitor_key(index * visitors // sessions)}_{format_timestamp(starts[index])}"
+
+    # Passe 2 : écriture entrée par entrée
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        header = {"schema_version": SCHEMA_VERSION, "total_visits": visit_count, "unique_visitors": visitors}
+        for position, (key, value) in enumerate(header.items()):
+            _write_entry(f, key, value, position == 0)
+        for key in ("daily_visits", "page_views", "project_views"):
+            _write_entry(f, key, rollups[key], False)
+
+        f.write(',\n    "visitors": {\n')
+        first_session = 0
+        for visitor in range(visitors):
+            # Sessions du visiteur : indices consécutifs (voir _iter_sessions)
+            last_session = first_session + session_count[visitor]
+            _write_entry(f, visitor_key(visitor), {
+                "first_visit": first_visit[visitor],
+                "total_visits": total_visits[visitor],
+                "pages_visited": [page for page, bit in PAGE_BITS.items() if pages_seen[visitor] & bit],
+                "total_seconds": total_seconds[visitor],
+                "session_count": session_count[visitor],
+                "sessions": [session_id(index) for index in range(first_session, last_session)],
+                "last_visit": last_visit[visitor],
+                "last_seen": last_seen[visitor]
+            }, visitor == 0)
+            first_session = last_session
+        f.write("\n    },\n")
+
+        f.write('    "sessions": {\n')
+        for index, visitor, start, end_time, page_views in _iter_sessions(*args):
+            _write_entry(f, session_id(index), {
+                "visitor_id": visitor_key(visitor),
+                "start_time": start,
+                "end_time": end_time,
+                "duration_seconds": end_time - start,
+                "page_views": [{"page": page, "timestamp": ts, "project_key": project}
+                               for page, ts, project in page_views],
+                "total_page_views": len(page_views)
+            }, index == 0)
+        f.write("\n    }")
+
+        for key in ("hourly_visits", "daily_page_views", "daily_project_views"):
+            _write_entry(f, key, rollups[key], False)
+        _write_entry(f, "archived_visitors", {}, False)
+        _write_entry(f, "archived_sessions", empty_session_stats(), False)
+        _write_entry(f, "event_log_generation", 0, False)
+        f.write("\n}")
+    os.replace(tmp_path, path)
+    return visit_count
+
+
+def _embedded_image(rng, size):
+    return "data:image/jpeg;base64," + base64.b64encode(rng.randbytes(size)).decode("ascii")
+
+
+def generate_config(path, projects, images_per_project=2, image_kb=50, seed=0):
+    """Écrire une configuration de `projects` projets avec images intégrées en base64"""
+    rng = random.Random(seed)
+    config = {
+        "profile": {
+            "id_number": "",
+            "greeting": "Hello, I am",
+            "name": "Jeu de données synthétique",
+            "title": "Data Scientist",
+            "profile_image": _embedded_image(rng, image_kb * 1024),
+            "resume_link": "#",
+            "linkedin_url": "#",
+            "github_url": "#"
+        },
+        "about": {
+            "description": "Portfolio généré pour les benchmarks.",
+            "tools": [f"🔹 Outil {index}" for index in range(3)],
+            "expertise": [f"🔹 Expertise {index}" for index in range(3)],
+            "conclusion": "Fin."
+        },
+        "skills": ["MACHINE LEARNING", "PYTHON", "SQL", "NUMPY", "PANDAS"],
+        "stats": [{"number": str(projects), "label": "Projets", "icon": "📁", "background": "#3776ab"}],
+        "projects": {}
+    }
+    for index in range(projects):
+        config["projects"][project_key(index)] = {
+            "title": f"Projet synthétique {index}",
+            "domain": rng.choice(["Healthcare", "Finance", "Retail", "Hospitality"]),
+            "badge": "ML Project",
+            "description": "Description du projet. " * 20,
+            "situation": "Situation.",
+            "task": "Tâche.",
+            "action": "Action.",
+            "result": "Résultat.",
+            "youtube_id": "",
+            "presentation_images": [_embedded_image(rng, image_kb * 1024) for _ in range(images_per_project)],
+            "card_gradient": "linear-gradient(45deg, #87CEEB, #4682B4)",
+            "card_label": f"PROJET {index}"
+        }
+    atomic_write_json(path, config)
+    return config
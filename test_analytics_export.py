@@ -0,0 +1,26 @@
+"""Tests de l'export des analytics : ``python -m pytest``"""
+import time
+
+import analytics_report
+from analytics_report import log_generation
+from analytics_store import JsonAnalyticsStore, visit_event
+
+
+def _fail_stream(*args, **kwargs):
+    raise AssertionError("snapshot parcouru en entier")
+
+
+def test_log_generation_read_from_tail_with_sketches(tmp_path, monkeypatch):
+    store = JsonAnalyticsStore(str(tmp_path / "analytics.json"), sketches=True)
+    now = int(time.time())
+    store.record_events([visit_event("v1", ts=now), visit_event("v2", ts=now)])
+    assert store.compact()
+    store.record_events([visit_event("v1", ts=now)])
+    assert store.compact()
+    assert "sketches" in store.load_snapshot()
+
+    monkeypatch.setattr(analytics_report, "stream_snapshot", _fail_stream)
+    assert log_generation(store.snapshot_path) == store.load_snapshot()["event_log_generation"] > 0
+
+    store.save(store.load_snapshot())
+    assert log_generation(store.snapshot_path) == store.load_snapshot()["event_log_generation"]
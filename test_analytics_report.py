@@ -0,0 +1,28 @@
+"""Tests du rapport hors ligne : ``python -m pytest``"""
+import time
+
+from analytics_report import AnalyticsReport
+from analytics_store import JsonAnalyticsStore, visit_event
+
+
+def _session(start, seconds, page_views):
+    return {"visitor_id": "v1", "start_time": start, "end_time": start + seconds, "duration_seconds": seconds,
+            "page_views": [{"page": "portfolio", "timestamp": start, "project_key": None}] * page_views,
+            "total_page_views": page_views}
+
+
+def test_session_in_snapshot_and_log_counted_once(tmp_path):
+    store = JsonAnalyticsStore(str(tmp_path / "analytics.json"))
+    now = int(time.time()) - 600
+    store.record_events([visit_event("v1", ts=now)])
+    store.record_session("s1", _session(now, 30, 1))
+    assert store.compact()
+    # Mises à jour restées dans le journal : la dernière l'emporte
+    store.record_session("s1", _session(now, 60, 2))
+    store.record_session("s1", _session(now, 90, 3))
+
+    stats = AnalyticsReport().read_store(store.snapshot_path).results()["session_stats"]
+    assert stats["total_sessions"] == 1
+    assert stats["total_seconds"] == 90
+    assert stats["total_page_views"] == 3
+    assert stats["total_sessions"] == store.session_stats()["total_sessions"]
@@ -0,0 +1,56 @@
+"""Tests du store d'analytics : ``python -m pytest``"""
+import time
+
+from analytics_store import apply_event, empty_analytics, visit_event
+
+# Récents : la rétention n'archive pas ces visites
+EARLY = int(time.time()) - 3600
+LATE = EARLY + 600
+
+
+def test_out_of_order_visits_keep_visit_bounds():
+    analytics = empty_analytics()
+    apply_event(analytics, visit_event("v1", ts=LATE))
+    apply_event(analytics, visit_event("v1", ts=EARLY))
+
+    visitor = analytics["visitors"]["v1"]
+    assert visitor["first_visit"] == EARLY
+    assert visitor["last_visit"] == LATE
+    assert visitor["total_visits"] == 2
+
+
+def test_out_of_order_visits_sqlite(tmp_path):
+    from analytics_sqlite import SqliteAnalyticsStore
+
+    store = SqliteAnalyticsStore(str(tmp_path / "analytics.db"))
+    store.record_events([visit_event("v1", ts=LATE), visit_event("v1", ts=EARLY)])
+
+    visitor = store.get_visitor("v1")
+    assert visitor["first_visit"] == EARLY
+    assert visitor["last_visit"] == LATE
+
+
+def test_browse_indexes_follow_compaction(tmp_path):
+    from analytics_index import BrowseIndexes
+    from analytics_store import JsonAnalyticsStore
+
+    store = JsonAnalyticsStore(str(tmp_path / "analytics.json"))
+    store.record_events([visit_event(f"v{i}", ts=EARLY + i) for i in range(20)])
+    store.record_session("s1", {"visitor_id": "v1", "start_time": EARLY, "end_time": EARLY + 5,
+                                "duration_seconds": 5, "page_views": [], "total_page_views": 0})
+    assert store.browse_sessions()[0][0][0] == "s1"
+    store.compact()
+    store.record_events([visit_event("v3", ts=LATE)])
+    store.compact()
+    store.save(dict(store.load_snapshot(), visitors={
+        visitor_id: visitor for visitor_id, visitor in store.load_snapshot()["visitors"].items() if visitor_id != "v5"
+    }))
+
+    store.browse_visitors()
+    fresh = BrowseIndexes(store._view())
+    indexes = store._view_state["indexes"]
+    for field, index in indexes.visitors.items():
+        assert index.entries == fresh.visitors[field].entries
+    for field, index in indexes.sessions.items():
+        assert index.entries == fresh.sessions[field].entries
+    assert store.browse_visitors()[0][0][0] == "v3"